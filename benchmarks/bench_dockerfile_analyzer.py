@@ -0,0 +1,73 @@
+"""
+Measure in-process Dockerfile analysis on a generated multi-stage file, and
+compare indexed rule dispatch with running every rule over every instruction.
+
+Usage:
+    PYTHONPATH=. python benchmarks/bench_dockerfile_analyzer.py [--lines 1000] [--runs 200]
+"""
+import argparse
+import time
+
+from server.dockerfile_analyzer import AnalysisContext, engine, parse_dockerfile
+
+BLOCK = [
+    "FROM python:3.12-slim AS stage{n}",
+    "WORKDIR /app",
+    "ENV APP_HOME=/app PORT=8080",
+    "COPY requirements.txt .",
+    "RUN apt-get update && \\",
+    "    apt-get install -y --no-install-recommends curl && \\",
+    "    rm -rf /var/lib/apt/lists/*",
+    "RUN <<EOF",
+    "pip install -r requirements.txt",
+    "EOF",
+    "ADD app.py /app/",
+    "USER app",
+    'CMD ["python", "app.py"]',
+]
+
+
+def generate(lines: int) -> str:
+    out, n = [], 0
+    while len(out) < lines:
+        out.extend(line.format(n=n) for line in BLOCK)
+        n += 1
+    return "\n".join(out[:lines]) + "\n"
+
+
+def run_all_rules(parsed):
+    ctx = AnalysisContext(parsed)
+    hits = 0
+    for ins in parsed.instructions:
+        for rule in engine.rules:
+            if ins.cmd in rule.instructions and rule.check(ins, ctx):
+                hits += 1
+        engine._track(ins, ctx)
+    return hits
+
+
+def timed(label: str, func, runs: int):
+    func()
+    start = time.perf_counter()
+    for _ in range(runs):
+        func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:>16}: {elapsed / runs * 1e3:7.3f} ms/file")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--lines", type=int, default=1000)
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+    text = generate(args.lines)
+    parsed = parse_dockerfile(text)
+    print(f"{args.lines} lines, {len(parsed.instructions)} instructions, {len(parsed.stages)} stages, {len(engine.rules)} rules")
+    timed("parse", lambda: parse_dockerfile(text), args.runs)
+    timed("rules (indexed)", lambda: engine.analyze(parsed), args.runs)
+    timed("rules (scan all)", lambda: run_all_rules(parsed), args.runs)
+    timed("parse + analyze", lambda: engine.analyze(parse_dockerfile(text)), args.runs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,390 @@
+"""
+Load-test the server in process with an offline stand-in for the Brave MCP
+agent: tasks_send, tasks_get, JSON-RPC batches and SSE subscriptions at a fixed
+concurrency, reporting throughput, p50/p95/p99 latency and memory.
+
+No OpenAI or Brave credentials are needed. Search latency and failure rate are
+simulated (see ``offline_agent.py``) and seeded, so runs are repeatable. Save a
+run with ``--output`` and compare a later one with ``--compare``; the comparison
+exits with status 1 when a p95 latency or a throughput regresses by more than
+``--tolerance``.
+
+Usage:
+    PYTHONPATH=. python benchmarks/bench_load.py [--tasks 500] [--concurrency 32] [--latency 0.2]
+        [--failure-rate 0.05] [--output run.json] [--compare baseline.json]
+    PYTHONPATH=. python benchmarks/bench_load.py --serve 8080   # offline server for the shell tests
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+# Largest JSON-RPC batch the server accepts by default (A2A_JSONRPC_MAX_BATCH)
+MAX_BATCH = 100
+
+
+def configure_env(args):
+    """Offline settings; must run before the server modules are imported."""
+    os.environ.setdefault("A2A_BEARER_TOKEN", "bench-token")
+    os.environ.setdefault("OPENAI_API_KEY", "offline")
+    os.environ.setdefault("LOGFIRE_SEND_TO_LOGFIRE", "if-token-present")
+    os.environ["BRAVE_MCP_POOL_SIZE"] = str(args.pool_size)
+    os.environ["BRAVE_SEARCH_CACHE_PATH"] = ""
+    if not args.cache:
+        # Every task reaches the stand-in agent; identical in-flight searches are still shared
+        os.environ["BRAVE_SEARCH_CACHE_ENTRIES"] = "0"
+        os.environ["A2A_RESULT_CACHE_ENTRIES"] = "0"
+
+
+def boot(args):
+    """Import the app with the offline agent installed and logging kept off the console."""
+    import logfire
+    from offline_agent import install
+    from server.agent import app
+
+    logfire.configure(send_to_logfire=False, console=False)
+    offline = install(args.latency, args.jitter, args.failure_rate, args.seed)
+    return app, offline
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return peak_rss_mb()
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(int(round(fraction * len(ordered) + 0.5)) - 1, 0))]
+
+
+class Recorder:
+    """Latency samples, error counts and wall time per operation."""
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.wall: Dict[str, float] = {}
+
+    def add(self, op: str, seconds: float):
+        self.samples.setdefault(op, []).append(seconds)
+
+    def error(self, op: str):
+        self.errors[op] = self.errors.get(op, 0) + 1
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        results = {}
+        for op in sorted(set(self.samples) | set(self.errors)):
+            ordered = sorted(self.samples.get(op, []))
+            wall = self.wall.get(op, 0.0)
+            results[op] = {
+                "count": len(ordered),
+                "errors": self.errors.get(op, 0),
+                "throughput": round(len(ordered) / wall, 2) if wall else 0.0,
+                "p50_ms": round(percentile(ordered, 0.50) * 1000, 3),
+                "p95_ms": round(percentile(ordered, 0.95) * 1000, 3),
+                "p99_ms": round(percentile(ordered, 0.99) * 1000, 3),
+                "max_ms": round(ordered[-1] * 1000, 3) if ordered else 0.0,
+            }
+        return results
+
+
+def rpc(method: str, params: Dict[str, Any], id: int = 1) -> Dict[str, Any]:
+    return {"jsonrpc": "2.0", "id": id, "method": method, "params": params}
+
+
+async def drive(count: int, concurrency: int, op: Callable[[int], Awaitable[None]]) -> float:
+    """Run ``op(0..count-1)`` on ``concurrency`` workers; returns the wall time."""
+    counter = iter(range(count))
+
+    async def worker():
+        for i in counter:
+            await op(i)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.perf_counter() - started
+
+
+async def phase_send(client, recorder: Recorder, texts: List[str], concurrency: int) -> List[str]:
+    ids: List[str] = []
+
+    async def op(i: int):
+        started = time.perf_counter()
+        try:
+            resp = await client.post("/", json=rpc("tasks_send", {"raw_text": texts[i]}, i))
+            body = resp.json()
+            ids.append(body["result"]["result"]["task"]["id"])
+        except Exception:
+            recorder.error("tasks_send")
+            return
+        recorder.add("tasks_send", time.perf_counter() - started)
+
+    recorder.wall["tasks_send"] = await drive(len(texts), concurrency, op)
+    return ids
+
+
+async def wait_for_tasks(client, recorder: Recorder, ids: List[str], started: float, timeout: float) -> Dict[str, int]:
+    """Poll with batched tasks_get until every task is terminal; record server-side durations."""
+    pending = set(ids)
+    states: Dict[str, int] = {}
+    deadline = time.perf_counter() + timeout
+    while pending and time.perf_counter() < deadline:
+        batch = list(pending)[:MAX_BATCH]
+        resp = await client.post("/", json=[rpc("tasks_get", {"id": task_id}, n) for n, task_id in enumerate(batch)])
+        # Batch responses come back in request order
+        for task_id, answer in zip(batch, resp.json()):
+            transitions = answer.get("result", {}).get("transitions", [])
+            if transitions and transitions[-1]["state"] in ("completed", "failed", "cancelled"):
+                pending.discard(task_id)
+                state = transitions[-1]["state"]
+                states[state] = states.get(state, 0) + 1
+                if state == "completed":
+                    recorder.add("task_e2e", transitions[-1]["timestamp"] - transitions[0]["timestamp"])
+                else:
+                    recorder.error("task_e2e")
+        if pending:
+            await asyncio.sleep(0.05)
+    recorder.wall["task_e2e"] = time.perf_counter() - started
+    states["unfinished"] = len(pending)
+    return states
+
+
+async def phase_get(client, recorder: Recorder, ids: List[str], count: int, concurrency: int, rng: random.Random):
+    picks = [rng.choice(ids) for _ in range(count)]
+
+    async def op(i: int):
+        started = time.perf_counter()
+        try:
+            resp = await client.post("/", json=rpc("tasks_get", {"id": picks[i]}, i))
+            ok = resp.status_code == 200 and "error" not in resp.json()
+        except Exception:
+            ok = False
+        if not ok:
+            recorder.error("tasks_get")
+            return
+        recorder.add("tasks_get", time.perf_counter() - started)
+
+    recorder.wall["tasks_get"] = await drive(count, concurrency, op)
+
+
+async def phase_batch(client, recorder: Recorder, ids: List[str], count: int, size: int, concurrency: int,
+                      rng: random.Random):
+    async def op(i: int):
+        batch = [rpc("tasks_get", {"id": rng.choice(ids)}, n) for n in range(size)]
+        started = time.perf_counter()
+        try:
+            resp = await client.post("/", json=batch)
+            ok = resp.status_code == 200 and not any("error" in answer for answer in resp.json())
+        except Exception:
+            ok = False
+        if not ok:
+            recorder.error("batch_get")
+            return
+        recorder.add("batch_get", time.perf_counter() - started)
+
+    recorder.wall["batch_get"] = await drive(count, concurrency, op)
+
+
+async def phase_sse(client, recorder: Recorder, texts: List[str], concurrency: int):
+    async def op(i: int):
+        started = time.perf_counter()
+        first_event = first_part = None
+        try:
+            async with client.stream("POST", "/a2a/tasks/sendSubscribe", json={"raw_text": texts[i]},
+                                     headers={"Accept": "text/event-stream"}) as resp:
+                async for line in resp.aiter_lines():
+                    if first_event is None and line.startswith("data:"):
+                        first_event = time.perf_counter() - started
+                    elif first_part is None and line == "event: part":
+                        first_part = time.perf_counter() - started
+                    elif line == "event: close":
+                        break
+        except Exception:
+            recorder.error("sse_complete")
+            return
+        if first_event is None:
+            recorder.error("sse_complete")
+            return
+        recorder.add("sse_first_event", first_event)
+        if first_part is not None:
+            recorder.add("sse_first_part", first_part)
+        recorder.add("sse_complete", time.perf_counter() - started)
+
+    wall = await drive(len(texts), concurrency, op)
+    for op_name in ("sse_first_event", "sse_first_part", "sse_complete"):
+        recorder.wall[op_name] = wall
+
+
+def workload(count: int, distinct: int, offset: int = 0) -> List[str]:
+    """Dockerfiles that differ by a label, so the result cache sees ``distinct`` configurations."""
+    with open("shared/sample.Dockerfile") as f:
+        sample = f.read()
+    return [f'{sample}\nLABEL bench.id="{offset + i % distinct}"\n' for i in range(count)]
+
+
+async def run(args, base_url: str) -> Dict[str, Any]:
+    import httpx
+
+    rng = random.Random(args.seed)
+    recorder = Recorder()
+    memory = {"rss_start_mb": round(rss_mb(), 1)}
+    headers = {"Authorization": f"Bearer {os.environ['A2A_BEARER_TOKEN']}"}
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, limits=limits, timeout=args.timeout) as client:
+        started = time.perf_counter()
+        ids = await phase_send(client, recorder, workload(args.tasks, args.distinct or args.tasks), args.concurrency)
+        states = await wait_for_tasks(client, recorder, ids, started, args.timeout)
+        memory["rss_after_tasks_mb"] = round(rss_mb(), 1)
+        if ids:
+            await phase_get(client, recorder, ids, args.gets, args.concurrency, rng)
+            await phase_batch(client, recorder, ids, args.batches, args.batch_size, args.concurrency, rng)
+        # Fresh configurations, so subscribers watch the analysis run instead of a cache replay
+        sse_texts = workload(args.sse, args.distinct or args.sse, offset=args.tasks)
+        await phase_sse(client, recorder, sse_texts, args.concurrency)
+        stats = (await client.get("/stats")).json()
+    memory["rss_end_mb"] = round(rss_mb(), 1)
+    memory["rss_peak_mb"] = round(peak_rss_mb(), 1)
+    memory["task_store_bytes"] = stats["task_store"]["estimated_bytes"]
+    return {
+        "results": recorder.summary(),
+        "task_states": states,
+        "memory": memory,
+        "stats": {key: stats[key] for key in ("search_flight", "mcp_pool", "result_cache", "task_store")},
+    }
+
+
+def start_server(app, port: int):
+    """Serve ``app`` with uvicorn on a background thread; returns the server and its port."""
+    import uvicorn
+
+    # Keep idle client connections open between phases instead of racing uvicorn's 5s default
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan="on",
+                                           timeout_keep_alive=300))
+    thread = threading.Thread(target=server.run, name="bench-server", daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError("Server failed to start")
+        time.sleep(0.05)
+    return server, thread, server.servers[0].sockets[0].getsockname()[1]
+
+
+def print_results(report: Dict[str, Any]):
+    print(f"{'operation':<16} {'count':>7} {'errors':>6} {'ops/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for op, r in report["results"].items():
+        print(f"{op:<16} {r['count']:>7} {r['errors']:>6} {r['throughput']:>9.1f} {r['p50_ms']:>9.2f} "
+              f"{r['p95_ms']:>9.2f} {r['p99_ms']:>9.2f} {r['max_ms']:>9.2f}")
+    print("task states:", report["task_states"])
+    print("memory:", report["memory"])
+    print("offline agent:", report["offline_agent"])
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Print p95 and throughput changes against ``baseline``; returns the regressions."""
+    regressions = []
+    differing = sorted(k for k in ("tasks", "concurrency", "latency", "failure_rate", "cache", "pool_size")
+                       if report["config"].get(k) != baseline["config"].get(k))
+    if differing:
+        print(f"warning: baseline was run with different settings: {', '.join(differing)}")
+    print(f"{'operation':<16} {'p95 ms':>9} {'base':>9} {'change':>8} {'ops/s':>9} {'base':>9} {'change':>8}")
+    for op, current in report["results"].items():
+        base = baseline["results"].get(op)
+        if base is None:
+            continue
+        p95_change = current["p95_ms"] / base["p95_ms"] - 1 if base["p95_ms"] else 0.0
+        rate_change = current["throughput"] / base["throughput"] - 1 if base["throughput"] else 0.0
+        flag = ""
+        if p95_change > tolerance or rate_change < -tolerance:
+            regressions.append(op)
+            flag = "  REGRESSED"
+        print(f"{op:<16} {current['p95_ms']:>9.2f} {base['p95_ms']:>9.2f} {p95_change:>+8.1%} "
+              f"{current['throughput']:>9.1f} {base['throughput']:>9.1f} {rate_change:>+8.1%}{flag}")
+    return regressions
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=500, help="tasks_send calls (each task is awaited)")
+    parser.add_argument("--gets", type=int, default=2000, help="tasks_get calls")
+    parser.add_argument("--batches", type=int, default=200, help="JSON-RPC batch calls")
+    parser.add_argument("--batch-size", type=int, default=20, help="tasks_get requests per batch")
+    parser.add_argument("--sse", type=int, default=100, help="sendSubscribe streams")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--distinct", type=int, default=0, help="distinct Dockerfiles per phase (0: all distinct)")
+    parser.add_argument("--latency", type=float, default=0.2, help="mean simulated search seconds")
+    parser.add_argument("--jitter", type=float, default=0.05, help="simulated search jitter, seconds")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="fraction of searches that fail")
+    parser.add_argument("--pool-size", type=int, default=4, help="MCP sessions (BRAVE_MCP_POOL_SIZE)")
+    parser.add_argument("--cache", action="store_true", help="keep the search and result caches enabled")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=120.0, help="seconds to wait for requests and tasks")
+    parser.add_argument("--output", help="save the report as JSON")
+    parser.add_argument("--compare", help="baseline report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p95/throughput regression")
+    parser.add_argument("--serve", type=int, metavar="PORT", help="only run the offline server on PORT")
+    args = parser.parse_args()
+
+    configure_env(args)
+    app, offline = boot(args)
+    if args.serve is not None:
+        import uvicorn
+        uvicorn.run(app, host="0.0.0.0", port=args.serve)
+        return
+
+    server, thread, port = start_server(app, 0)
+    try:
+        report = asyncio.run(run(args, f"http://127.0.0.1:{port}"))
+    finally:
+        server.should_exit = True
+        thread.join(timeout=30)
+    report = {
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "compare", "serve")},
+        "git": git_revision(),
+        "timestamp": time.time(),
+        "offline_agent": {"calls": offline.calls, "failures": offline.failures},
+        **report,
+    }
+    print_results(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"saved {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print(f"regressed: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Compare encoding a tasks/get response with a large artifact: stdlib
+``json`` on ``.dict()`` output against ``server.serialization.dumps``.
+
+Usage:
+    PYTHONPATH=. python benchmarks/bench_serialization.py [--artifact-kb 256] [--rounds 200]
+"""
+import argparse
+import json
+import time
+import uuid
+
+from shared.models import Artifact, Part
+from server import serialization
+
+
+def make_response(artifact_kb: int):
+    line = "RUN apt-get update && apt-get install -y --no-install-recommends curl\n"
+    patched = line * (artifact_kb * 1024 // len(line))
+    artifact = Artifact(
+        artifact_id=str(uuid.uuid4()),
+        type="data",
+        parts=[Part(part_id=str(uuid.uuid4()), type="data", content={
+            "patched_text": patched,
+            "diff_json": {"added": patched.splitlines()[:500]},
+            "issues_fixed": [f"DL{3000 + i}" for i in range(50)],
+        })],
+        metadata={"name": "docker_fix_result"},
+    )
+    transitions = [{"state": s, "timestamp": time.time()} for s in ("submitted", "working", "completed")]
+    return artifact, transitions
+
+
+def bench(label: str, encode, rounds: int):
+    encode()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        size = len(encode())
+    elapsed = time.perf_counter() - start
+    print(f"{label:>22}: {elapsed / rounds * 1e3:7.3f} ms/response  ({size / 1024:.0f} KiB)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--artifact-kb", type=int, default=256)
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+    artifact, transitions = make_response(args.artifact_kb)
+    content = artifact.model_dump(mode="json")
+
+    def stdlib():
+        body = {"jsonrpc": "2.0", "id": 1, "result": {"transitions": transitions, "artifacts": [artifact.dict()]}}
+        return json.dumps(body, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    def fast_model():
+        return serialization.dumps({"jsonrpc": "2.0", "id": 1, "result": {"transitions": transitions, "artifacts": [artifact]}})
+
+    def fast_dict():
+        return serialization.dumps({"jsonrpc": "2.0", "id": 1, "result": {"transitions": transitions, "artifacts": [content]}})
+
+    print(f"fast encoder: {'orjson' if serialization.FAST_JSON else 'stdlib json'}")
+    bench("stdlib + .dict()", stdlib, args.rounds)
+    bench("dumps + model", fast_model, args.rounds)
+    bench("dumps + stored dict", fast_dict, args.rounds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Compare per-task memory and tasks/get latency of the TaskStore record layout
+against the previous pydantic-model layout.
+
+Usage:
+    PYTHONPATH=. python benchmarks/bench_task_store.py [--tasks 20000] [--gets 20000]
+"""
+import argparse
+import gc
+import random
+import time
+import tracemalloc
+import uuid
+
+from shared.models import Artifact, DockerConfig, Part, Task, TaskHistory, TaskStore
+
+DOCKERFILE = open("shared/sample.Dockerfile").read()
+
+
+class PydanticTaskStore:
+    """The previous layout: a ``Task`` and ``TaskHistory`` model per task."""
+    def __init__(self):
+        self.tasks = {}
+        self.history = {}
+
+    def create_task(self, task: Task):
+        self.tasks[task.id] = task
+        self.history[task.id] = TaskHistory(transitions=[{"state": task.state, "timestamp": time.time()}])
+
+    def transition(self, task_id: str, state: str):
+        self.tasks[task_id].state = state
+        self.history[task_id].transitions.append({"state": state, "timestamp": time.time()})
+
+    def add_artifact(self, task_id: str, artifact: Artifact):
+        self.history[task_id].artifacts.append(artifact)
+
+    def describe(self, task_id: str, history_length: int = 0):
+        task = self.tasks[task_id]
+        history = self.history[task_id]
+        transitions = history.transitions[history_length:] if history_length else history.transitions
+        return {"task": task.dict(), "transitions": transitions, "artifacts": [a.dict() for a in history.artifacts]}
+
+
+def make_artifact(i: int) -> Artifact:
+    return Artifact(
+        artifact_id=str(uuid.uuid4()),
+        type="data",
+        parts=[Part(part_id=str(uuid.uuid4()), type="data", content={"patched_text": DOCKERFILE, "issues_fixed": [f"DL{i % 9000}"]})],
+        metadata={"name": "docker_fix_result"},
+    )
+
+
+def fill(store, n: int):
+    # Share the payload strings like the server does, so only bookkeeping is compared
+    ids = []
+    for i in range(n):
+        task = Task(id=str(uuid.uuid4()), state="submitted", docker_config=DockerConfig(raw_text=DOCKERFILE))
+        store.create_task(task)
+        store.transition(task.id, "working")
+        store.add_artifact(task.id, make_artifact(i))
+        store.transition(task.id, "completed")
+        ids.append(task.id)
+    return ids
+
+
+def measure(label: str, factory, n: int, gets: int):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    store = factory()
+    ids = fill(store, n)
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    sample = [random.choice(ids) for _ in range(gets)]
+    start = time.perf_counter()
+    for task_id in sample:
+        store.describe(task_id)
+    elapsed = time.perf_counter() - start
+    print(f"{label:>10}: {used / n:8.0f} bytes/task  {elapsed / gets * 1e6:7.2f} us/tasks_get")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=20000)
+    parser.add_argument("--gets", type=int, default=20000)
+    args = parser.parse_args()
+    measure("pydantic", PydanticTaskStore, args.tasks, args.gets)
+    measure("records", TaskStore, args.tasks, args.gets)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Deterministic stand-ins for the pydantic_ai ``Agent`` and the Brave MCP server,
+so the server can run without OpenAI or Brave credentials.
+
+``install()`` must be called before the app starts: it points the MCP session
+pool and the one-off fallback agent at the stand-ins.
+"""
+import asyncio
+import random
+from contextlib import asynccontextmanager
+
+SEARCH_RESULT = (
+    "Pin base image versions; run as a non-root USER; use COPY instead of ADD; "
+    "clean package manager caches; do not store secrets in ENV or ARG."
+)
+
+
+class OfflineResult:
+    def __init__(self, data: str):
+        self.data = data
+
+
+class OfflineMCPServer:
+    """Async context manager with the ``list_tools`` health check the session pool uses."""
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def list_tools(self):
+        return [{"name": "brave_web_search"}]
+
+
+class OfflineAgent:
+    """
+    Answers every query with a fixed result after a simulated delay.
+
+    Args:
+        latency (float): Mean seconds per search.
+        jitter (float): Delays are drawn uniformly from ``latency ± jitter``.
+        failure_rate (float): Fraction of searches that raise instead of answering.
+        rng (random.Random): Seeded source of delays and failures, shared by every agent.
+    """
+    def __init__(self, latency: float, jitter: float, failure_rate: float, rng: random.Random):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.rng = rng
+        self.calls = 0
+        self.failures = 0
+
+    async def run(self, query: str) -> OfflineResult:
+        self.calls += 1
+        delay = max(self.latency + self.rng.uniform(-self.jitter, self.jitter), 0.0)
+        fail = self.rng.random() < self.failure_rate
+        await asyncio.sleep(delay)
+        if fail:
+            self.failures += 1
+            raise RuntimeError("offline agent: simulated search failure")
+        return OfflineResult(f"{SEARCH_RESULT} (query: {query})")
+
+    @asynccontextmanager
+    async def run_mcp_servers(self):
+        yield
+
+
+def install(latency: float = 0.2, jitter: float = 0.05, failure_rate: float = 0.0, seed: int = 0) -> OfflineAgent:
+    """
+    Replace the Brave MCP sessions with ``OfflineAgent`` stand-ins.
+
+    Returns:
+        OfflineAgent: The agent every session answers with, for call counters.
+    """
+    import server.brave_mcp_client as brave_mcp_client
+
+    offline = OfflineAgent(latency, jitter, failure_rate, random.Random(seed))
+    brave_mcp_client.brave_pool.factory = lambda: (OfflineMCPServer(), offline)
+    brave_mcp_client.agent = offline
+    return offline
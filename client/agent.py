@@ -1,9 +1,14 @@
 print('CLIENT AGENT LOADED')
+import hashlib
 import os
+import random
+import time
 import logfire
 import requests
 import json
 from shared.models import DockerConfig
+from card_cache import DEFAULT_CACHE_DIR, AgentCardCache, parse_max_age
+from sse import ArtifactEvent, PartEvent, StateEvent, parse_sse, to_task_event
 
 try:
     from fastapi import FastAPI
@@ -45,18 +50,41 @@ class A2AClient:
     Attributes:
         server_url (str): The URL of the agent server.
         bearer_token (str): Bearer token for authentication.
+        card_cache (Optional[AgentCardCache]): On-disk agent card cache, None if disabled.
         agent_card (dict): Validated agent card metadata from the server.
     """
-    def __init__(self, server_url: str):
+    def __init__(self, server_url: str, card_cache: AgentCardCache = None):
         self.server_url = server_url
         self.bearer_token = os.getenv("A2A_BEARER_TOKEN", "test-token")
+        # One session so calls reuse a keep-alive connection
+        self.session = requests.Session()
+        if card_cache is None and os.getenv("A2A_CARD_CACHE", "true").lower() != "false":
+            card_cache = AgentCardCache(os.getenv("A2A_CARD_CACHE_DIR", DEFAULT_CACHE_DIR))
+        self.card_cache = card_cache
         self.agent_card = self.fetch_and_validate_server_agent_card()
 
     def fetch_and_validate_server_agent_card(self):
-        """Fetch and validate the server's agent card."""
+        """
+        Fetch and validate the server's agent card.
+
+        A cached card within its ``max-age`` is used without a request; an
+        expired one is revalidated with its ETag.
+        """
         url = self.server_url.rstrip('/') + '/.well-known/agent.json'
+        cached = self.card_cache.load(self.server_url) if self.card_cache else None
+        if cached and self.card_cache.is_fresh(cached):
+            logfire.info("agent_card_cache_hit", url=url)
+            return cached["card"]
+        headers = {"If-None-Match": cached["etag"]} if cached and cached.get("etag") else {}
         try:
-            resp = requests.get(url, timeout=5)
+            resp = self.session.get(url, timeout=5, headers=headers)
+            if resp.status_code == 304 and cached:
+                logfire.info("agent_card_revalidated", url=url)
+                self.card_cache.store(
+                    self.server_url, cached["card"], resp.headers.get("ETag", cached["etag"]),
+                    parse_max_age(resp.headers.get("Cache-Control")),
+                )
+                return cached["card"]
             resp.raise_for_status()
             card = resp.json()
             required_fields = [
@@ -70,6 +98,10 @@ class A2AClient:
                 )
             logfire.info("agent_card_validated", card=card)
             logfire.info("green_log", event="agent_card_validated", card=card)
+            if self.card_cache:
+                self.card_cache.store(
+                    self.server_url, card, resp.headers.get("ETag"), parse_max_age(resp.headers.get("Cache-Control"))
+                )
             return card
         except Exception as e:
             logfire.error(
@@ -92,7 +124,7 @@ class A2AClient:
         logfire.info("green_log", event="send_dockerfile", payload=rpc_payload)
         headers = {"Authorization": f"Bearer {self.bearer_token}"}
         try:
-            resp = requests.post(f"{self.server_url}/", json=rpc_payload, headers=headers)
+            resp = self.session.post(f"{self.server_url}/", json=rpc_payload, headers=headers)
             resp.raise_for_status()
             result = resp.json()
             if "error" in result:
@@ -118,3 +150,231 @@ class A2AClient:
             logfire.error("client_exception", error=str(e))
             green_log({"event": "client_exception", "error": str(e)})
             return {"error": str(e)}
+
+    def get_task(self, task_id: str, history_length: int = 0):
+        """
+        Fetch the current state, transitions and artifacts of a task via ``tasks_get``.
+
+        Returns:
+            dict: The ``tasks_get`` result, or ``{"error": ...}`` on failure.
+        """
+        rpc_payload = {
+            "jsonrpc": "2.0",
+            "method": "tasks_get",
+            "params": {"id": task_id, "historyLength": history_length},
+            "id": 1
+        }
+        headers = {"Authorization": f"Bearer {self.bearer_token}"}
+        try:
+            resp = self.session.post(f"{self.server_url}/", json=rpc_payload, headers=headers)
+            resp.raise_for_status()
+            result = resp.json()
+            if "error" in result:
+                logfire.error("client_jsonrpc_error", error=result["error"])
+                return {"error": result["error"]}
+            return result.get("result")
+        except Exception as e:
+            logfire.error("client_exception", error=str(e))
+            return {"error": str(e)}
+
+    def wait_for_task(self, task_id: str, poll_interval: float = 1.0, timeout: float = 300.0):
+        """
+        Poll ``tasks_get`` until the task reaches a terminal state.
+
+        Args:
+            task_id (str): The task to wait for.
+            poll_interval (float): Seconds between polls.
+            timeout (float): Maximum seconds to wait.
+
+        Returns:
+            dict: The final ``tasks_get`` result, or ``{"error": ...}``.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            result = self.get_task(task_id)
+            if "error" in result:
+                return result
+            state = result["task"]["state"]
+            if state in ("completed", "failed", "cancelled"):
+                logfire.info("task_finished", task_id=task_id, state=state)
+                return result
+            if time.monotonic() >= deadline:
+                return {"error": f"Timed out waiting for task {task_id} (state: {state})"}
+            time.sleep(poll_interval)
+
+    def resubscribe(self, task_id: str, history_length: int = 0, artifact_offset: int = 0, part_offset: int = None):
+        """
+        Call ``tasks_resubscribe`` to fetch what was missed after ``history_length``
+        transitions, ``artifact_offset`` artifacts and ``part_offset`` parts.
+
+        Returns:
+            dict: ``{"stream_url", "transitions", "artifacts", "parts"}``, or ``{"error": ...}``.
+        """
+        params = {"id": task_id, "historyLength": history_length, "artifactOffset": artifact_offset}
+        if part_offset is not None:
+            params["partOffset"] = part_offset
+        rpc_payload = {
+            "jsonrpc": "2.0",
+            "method": "tasks_resubscribe",
+            "params": params,
+            "id": 1
+        }
+        headers = {"Authorization": f"Bearer {self.bearer_token}"}
+        try:
+            resp = self.session.post(f"{self.server_url}/", json=rpc_payload, headers=headers)
+            resp.raise_for_status()
+            result = resp.json()
+            if "error" in result:
+                logfire.error("client_jsonrpc_error", error=result["error"])
+                return {"error": result["error"]}
+            return result.get("result")
+        except Exception as e:
+            logfire.error("client_exception", error=str(e))
+            return {"error": str(e)}
+
+    def _rpc(self, method: str, params: dict):
+        rpc_payload = {"jsonrpc": "2.0", "method": method, "params": params, "id": 1}
+        headers = {"Authorization": f"Bearer {self.bearer_token}"}
+        resp = self.session.post(f"{self.server_url}/", json=rpc_payload, headers=headers)
+        resp.raise_for_status()
+        result = resp.json()
+        if "error" in result:
+            return {"error": result["error"]}
+        return result.get("result")
+
+    def upload_file(self, path: str, chunk_size: int = 256 * 1024, max_retries: int = 5):
+        """
+        Submit a large file through a resumable chunked upload instead of inlining it in ``tasks_send``.
+
+        Chunks are read from disk one at a time and sent with their SHA-256.
+        After a failed chunk the client asks the server for the resume offset
+        and continues from there.
+
+        Returns:
+            dict: The ``tasks_send``-style result of finalizing the upload, or ``{"error": ...}``.
+        """
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        size = os.path.getsize(path)
+        try:
+            created = self._rpc("uploads_create", {"size": size, "sha256": digest.hexdigest()})
+            if "error" in created:
+                return created
+            upload_id = created["result"]["upload_id"]
+            chunk_size = min(chunk_size, created["result"]["max_chunk"])
+            headers = {"Authorization": f"Bearer {self.bearer_token}"}
+            offset, failures = 0, 0
+            with open(path, "rb") as f:
+                while offset < size:
+                    f.seek(offset)
+                    chunk = f.read(chunk_size)
+                    headers["X-Chunk-SHA256"] = hashlib.sha256(chunk).hexdigest()
+                    try:
+                        resp = self.session.put(f"{self.server_url}/upload/chunk", data=chunk, headers=headers,
+                                                params={"upload_id": upload_id, "offset": offset}, timeout=30)
+                        if resp.status_code in (400, 409, 429) or resp.status_code >= 500:
+                            raise requests.exceptions.RequestException(f"HTTP {resp.status_code}: {resp.text}")
+                        resp.raise_for_status()
+                        offset = resp.json()["offset"]
+                        failures = 0
+                        continue
+                    except requests.exceptions.HTTPError:
+                        raise
+                    except requests.exceptions.RequestException as e:
+                        failures += 1
+                        logfire.info("client_upload_chunk_retry", upload_id=upload_id, offset=offset, error=str(e))
+                        if failures > max_retries:
+                            return {"error": f"Upload {upload_id} failed at offset {offset}: {e}"}
+                        time.sleep(min(2 ** (failures - 1), 10) * random.uniform(0.5, 1.0))
+                    status = self._rpc("uploads_status", {"upload_id": upload_id})
+                    if "error" in status:
+                        return status
+                    offset = status["result"]["offset"]
+            logfire.info("client_upload_complete", upload_id=upload_id, size=size)
+            return self._rpc("uploads_finalize", {"upload_id": upload_id})
+        except Exception as e:
+            logfire.error("client_exception", error=str(e))
+            return {"error": str(e)}
+
+    def stream_task(self, task_id: str = None, dockerfile_text: str = None, max_reconnects: int = 5,
+                    read_timeout: float = 60.0):
+        """
+        Stream a task's state transitions, artifacts and artifact parts as typed events.
+
+        Opens ``/a2a/tasks/sendSubscribe`` for a new Dockerfile or an existing
+        ``task_id``. If the connection drops, the missed events are fetched
+        with ``tasks_resubscribe`` from the last seen position. The stream is
+        then reopened with ``Last-Event-ID``, so history is never downloaded
+        twice.
+
+        Args:
+            task_id (str): An existing task to follow.
+            dockerfile_text (str): Content to submit as a new task instead.
+            max_reconnects (int): Consecutive failed reconnects before giving up.
+            read_timeout (float): Seconds without data (including heartbeats) before reconnecting.
+
+        Yields:
+            StateEvent | ArtifactEvent | PartEvent: Events in order, ending with a terminal state.
+        """
+        if task_id is None and dockerfile_text is None:
+            raise ValueError("stream_task needs task_id or dockerfile_text")
+        headers = {"Authorization": f"Bearer {self.bearer_token}", "Accept": "text/event-stream"}
+        body = {"task_id": task_id} if task_id else {"raw_text": dockerfile_text}
+        seen = (0, 0, 0)
+        failures = 0
+        while True:
+            if seen != (0, 0, 0):
+                headers["Last-Event-ID"] = ".".join(str(n) for n in seen)
+            try:
+                with self.session.post(f"{self.server_url}/a2a/tasks/sendSubscribe", json=body, headers=headers,
+                                       stream=True, timeout=(5, read_timeout)) as resp:
+                    resp.raise_for_status()
+                    for message in parse_sse(resp.iter_lines(chunk_size=None)):
+                        if message.event == "close":
+                            return
+                        if message.event == "dropped":
+                            # The server dropped us as a slow consumer; resume below
+                            break
+                        event = to_task_event(message)
+                        if event is None:
+                            continue
+                        failures = 0
+                        task_id = event.task_id
+                        body = {"task_id": task_id}
+                        seen = event.cursor
+                        yield event
+            except requests.exceptions.HTTPError:
+                raise
+            except requests.exceptions.RequestException as e:
+                logfire.info("client_stream_disconnected", task_id=task_id, error=str(e))
+            if task_id is None:
+                raise ConnectionError("Stream failed before the task id was known")
+            failures += 1
+            if failures > max_reconnects:
+                raise ConnectionError(f"Gave up resuming the stream of task {task_id}")
+            time.sleep(min(2 ** (failures - 1), 10) * random.uniform(0.5, 1.0))
+            missed = self.resubscribe(task_id, history_length=seen[0], artifact_offset=seen[1], part_offset=seen[2])
+            if "error" in missed:
+                logfire.error("client_resubscribe_failed", task_id=task_id, error=missed["error"])
+                continue
+            transitions = missed["transitions"]
+            # Artifacts are recorded before the final transition, so replay them ahead of it
+            terminal = transitions.pop() if transitions and transitions[-1]["state"] in ("completed", "failed", "cancelled") else None
+            for transition in transitions:
+                seen = (seen[0] + 1, seen[1], seen[2])
+                yield StateEvent(task_id=task_id, state=transition["state"], timestamp=transition.get("timestamp"),
+                                 error=transition.get("error"), cursor=seen)
+            for missed_part in missed.get("parts", []):
+                seen = (seen[0], seen[1], missed_part["seq"])
+                yield PartEvent(task_id=task_id, artifact_id=missed_part["artifact_id"], part=missed_part["part"], cursor=seen)
+            for artifact in missed["artifacts"]:
+                seen = (seen[0], seen[1] + 1, seen[2] + len(artifact["parts"]))
+                yield ArtifactEvent(task_id=task_id, artifact=artifact, cursor=seen)
+            logfire.info("client_stream_resumed", task_id=task_id, cursor=seen)
+            if terminal is not None:
+                seen = (seen[0] + 1, seen[1], seen[2])
+                yield StateEvent(task_id=task_id, state=terminal["state"], timestamp=terminal.get("timestamp"),
+                                 error=terminal.get("error"), cursor=seen)
+                return
@@ -0,0 +1,285 @@
+import asyncio
+import fnmatch
+import os
+import random
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+import httpx
+import logfire
+
+# Task states after which the server makes no further transitions
+TERMINAL_STATES = ("completed", "failed", "cancelled")
+# JSON-RPC error the server returns when its task queue is full
+QUEUE_FULL = -32003
+# Calls per JSON-RPC batch; matches the server's default A2A_JSONRPC_MAX_BATCH
+MAX_BATCH = 100
+# Methods that must not run twice: a retry after the request reached the server
+# could create a second task
+NON_IDEMPOTENT_METHODS = frozenset(("tasks_send",))
+# Raised before any bytes of the request were sent, so retrying cannot duplicate it
+_NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+DEFAULT_PATTERNS = ("Dockerfile", "Dockerfile.*", "*.Dockerfile", "*.dockerfile",
+                    "docker-compose*.yml", "docker-compose*.yaml", "compose.yml", "compose.yaml")
+
+
+class RetryableError(Exception):
+    """A request failed in a way that may succeed when retried."""
+
+
+class AsyncA2AClient:
+    """
+    Async JSON-RPC client for the security agent, built on one pooled
+    ``httpx.AsyncClient`` so requests reuse keep-alive connections.
+
+    Failed requests (network errors, 5xx, 429 and a full server queue) are
+    retried with exponential backoff and jitter. Calls in
+    ``NON_IDEMPOTENT_METHODS`` are only retried when the request was never
+    sent (connection errors) or the server turned it away with a full queue.
+    Use it as an async context manager so the connection pool is closed.
+
+    Args:
+        server_url (str): The URL of the agent server.
+        bearer_token (Optional[str]): Bearer token; defaults to ``A2A_BEARER_TOKEN``.
+        max_connections (int): Size of the HTTP connection pool.
+        max_retries (int): Retries after the first failed attempt.
+        backoff_base (float): Initial retry delay in seconds.
+        backoff_max (float): Upper bound for the retry delay.
+        timeout (float): HTTP request timeout in seconds.
+        http2 (bool): Use HTTP/2 (requires the ``h2`` package).
+        transport (Optional[httpx.AsyncBaseTransport]): Custom transport, e.g. for tests.
+    """
+    def __init__(self, server_url: str, bearer_token: Optional[str] = None, max_connections: int = 20,
+                 max_retries: int = 5, backoff_base: float = 0.5, backoff_max: float = 10.0,
+                 timeout: float = 30.0, http2: bool = False,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.server_url = server_url.rstrip("/")
+        self.bearer_token = bearer_token or os.getenv("A2A_BEARER_TOKEN", "test-token")
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retries = 0
+        self._client = httpx.AsyncClient(
+            base_url=self.server_url,
+            headers={"Authorization": f"Bearer {self.bearer_token}"},
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            http2=http2,
+            transport=transport,
+        )
+        self._next_id = 0
+
+    async def __aenter__(self) -> "AsyncA2AClient":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        await self._client.aclose()
+
+    def _request(self, method: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        self._next_id += 1
+        return {"jsonrpc": "2.0", "id": self._next_id, "method": method, "params": params}
+
+    async def _post(self, payload: Any, idempotent: bool = True) -> Any:
+        """
+        POST a JSON-RPC request or batch, retrying transient failures.
+
+        Args:
+            payload: The request or batch.
+            idempotent (bool): False if running the request twice has side
+                effects; it is then only retried when it cannot have reached
+                the server's handler.
+        """
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self.retries += 1
+                delay = min(self.backoff_base * 2 ** (attempt - 1), self.backoff_max)
+                await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+            try:
+                resp = await self._client.post("/", json=payload)
+            except _NOT_SENT_ERRORS as e:
+                error = str(e) or type(e).__name__
+            except httpx.TransportError as e:
+                if not idempotent:
+                    raise
+                error = str(e) or type(e).__name__
+            else:
+                if resp.status_code >= 500 or resp.status_code == 429:
+                    if not idempotent:
+                        resp.raise_for_status()
+                    error = f"HTTP {resp.status_code}"
+                else:
+                    resp.raise_for_status()
+                    body = resp.json()
+                    err = body.get("error") if isinstance(body, dict) else None
+                    if not (isinstance(err, dict) and err.get("code") == QUEUE_FULL):
+                        return body
+                    error = err.get("message") or "queue full"
+            logfire.info("client_request_retry", attempt=attempt + 1, error=error)
+        raise RetryableError(f"Giving up after {self.max_retries + 1} attempts: {error}")
+
+    async def call(self, method: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Make one JSON-RPC call.
+
+        Returns:
+            dict: The ``result``, or ``{"error": ...}`` for a JSON-RPC error.
+        """
+        body = await self._post(self._request(method, params), idempotent=method not in NON_IDEMPOTENT_METHODS)
+        if "error" in body:
+            return {"error": body["error"]}
+        return body.get("result")
+
+    async def send_dockerfile(self, dockerfile_text: str) -> Dict[str, Any]:
+        return await self.call("tasks_send", {"raw_text": dockerfile_text})
+
+    async def get_task(self, task_id: str, history_length: int = 0) -> Dict[str, Any]:
+        return await self.call("tasks_get", {"id": task_id, "historyLength": history_length})
+
+    async def get_tasks(self, task_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Fetch many tasks with batched ``tasks_get`` calls; returns results keyed by task id."""
+        results = {}
+        for start in range(0, len(task_ids), MAX_BATCH):
+            chunk = task_ids[start:start + MAX_BATCH]
+            batch = [self._request("tasks_get", {"id": task_id}) for task_id in chunk]
+            responses = await self._post(batch)
+            by_id = {r.get("id"): r for r in responses} if isinstance(responses, list) else {}
+            for req, task_id in zip(batch, chunk):
+                response = by_id.get(req["id"], {"error": responses})
+                results[task_id] = {"error": response["error"]} if "error" in response else response["result"]
+        return results
+
+
+class TaskPoller:
+    """
+    Waits for many tasks at once by polling them together with one batched
+    ``tasks_get`` request per interval, instead of one poll loop per task.
+
+    Args:
+        client (AsyncA2AClient): Client used for the batched polls.
+        interval (float): Seconds between polls.
+    """
+    def __init__(self, client: AsyncA2AClient, interval: float = 0.5):
+        self.client = client
+        self.interval = interval
+        self._waiting: Dict[str, asyncio.Future] = {}
+        self._runner: Optional[asyncio.Task] = None
+
+    async def wait(self, task_id: str) -> Dict[str, Any]:
+        """Return the final ``tasks_get`` result of a task, or ``{"error": ...}``."""
+        future = self._waiting.get(task_id)
+        if future is None:
+            future = self._waiting[task_id] = asyncio.get_running_loop().create_future()
+        if self._runner is None or self._runner.done():
+            self._runner = asyncio.create_task(self._run())
+        return await future
+
+    async def _run(self):
+        while self._waiting:
+            await asyncio.sleep(self.interval)
+            task_ids = list(self._waiting)
+            try:
+                results = await self.client.get_tasks(task_ids)
+            except RetryableError as e:
+                results = {task_id: {"error": str(e)} for task_id in task_ids}
+            for task_id, result in results.items():
+                if "error" in result or result["task"]["state"] in TERMINAL_STATES:
+                    future = self._waiting.pop(task_id)
+                    if not future.done():
+                        future.set_result(result)
+
+
+def find_dockerfiles(root: str, patterns: Iterable[str] = DEFAULT_PATTERNS) -> List[str]:
+    """Walk ``root`` and return the paths whose file name matches one of ``patterns``."""
+    patterns = tuple(patterns)
+    found = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+        for name in filenames:
+            if any(fnmatch.fnmatch(name, pattern) for pattern in patterns):
+                found.append(os.path.join(dirpath, name))
+    return sorted(found)
+
+
+def patched_text(result: Dict[str, Any]) -> Optional[str]:
+    for artifact in result.get("artifacts", []):
+        for part in artifact.get("parts", []):
+            content = part.get("content")
+            if isinstance(content, dict) and "patched_text" in content:
+                return content["patched_text"]
+    return None
+
+
+async def submit_many(client: AsyncA2AClient, paths: List[str], output_dir: Optional[str] = None,
+                      root: Optional[str] = None, concurrency: int = 32,
+                      poll_interval: float = 0.5) -> Dict[str, Any]:
+    """
+    Submit Dockerfiles in parallel and write each patched result as it completes.
+
+    At most ``concurrency`` files are in flight (submitted but not finished)
+    at a time. Results are written to ``output_dir`` under the file's path
+    relative to ``root``, or to the deepest directory shared by all ``paths``
+    when no root is given, so files with the same name in different
+    directories do not overwrite each other.
+
+    Returns:
+        dict: Summary with counts, throughput, latency percentiles and the
+        error of every file that failed.
+    """
+    if root is None and paths:
+        root = os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in paths])
+    poller = TaskPoller(client, interval=poll_interval)
+    limit = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    failures: Dict[str, str] = {}
+
+    async def process(path: str):
+        async with limit:
+            started = time.monotonic()
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    text = f.read()
+                sent = await client.send_dockerfile(text)
+                if "error" in sent:
+                    raise RuntimeError(sent["error"])
+                task_id = sent["result"]["task"]["id"]
+                result = await poller.wait(task_id)
+                if "error" in result:
+                    raise RuntimeError(result["error"])
+                if result["task"]["state"] != "completed":
+                    raise RuntimeError(f"task {task_id} {result['task']['state']}")
+                patched = patched_text(result)
+                if output_dir is not None and patched is not None:
+                    relative = os.path.relpath(os.path.abspath(path), os.path.abspath(root))
+                    target = os.path.join(output_dir, relative)
+                    os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+                    with open(target, "w", encoding="utf-8") as f:
+                        f.write(patched)
+                latencies.append(time.monotonic() - started)
+                logfire.info("bulk_file_completed", path=path, task_id=task_id)
+            except Exception as e:
+                failures[path] = str(e)
+                logfire.error("bulk_file_failed", path=path, error=str(e))
+
+    started = time.monotonic()
+    await asyncio.gather(*(process(path) for path in paths))
+    elapsed = time.monotonic() - started
+    latencies.sort()
+
+    def pct(p: float) -> float:
+        return latencies[min(int(p * len(latencies)), len(latencies) - 1)] if latencies else 0.0
+
+    return {
+        "files": len(paths),
+        "completed": len(latencies),
+        "failed": len(failures),
+        "failures": failures,
+        "elapsed": elapsed,
+        "throughput": len(latencies) / elapsed if elapsed else 0.0,
+        "latency_p50": pct(0.5),
+        "latency_p95": pct(0.95),
+        "latency_max": latencies[-1] if latencies else 0.0,
+        "retries": client.retries,
+    }
@@ -0,0 +1,72 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+from typing import Any, Dict, Optional
+
+import logfire
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "a2a", "agent_cards")
+
+
+def parse_max_age(cache_control: Optional[str]) -> int:
+    """Return the ``max-age`` of a Cache-Control header, or 0 when absent or ``no-cache``/``no-store``."""
+    if not cache_control:
+        return 0
+    directives = cache_control.lower()
+    if "no-store" in directives or "no-cache" in directives:
+        return 0
+    match = re.search(r"max-age=(\d+)", directives)
+    return int(match.group(1)) if match else 0
+
+
+class AgentCardCache:
+    """
+    On-disk cache of agent cards, keyed by server URL.
+
+    Each entry stores the card with the ETag and ``max-age`` the server sent.
+    A card younger than its ``max-age`` is used without any request; an older
+    one is revalidated with ``If-None-Match`` so an unchanged card costs an
+    empty 304 response.
+
+    Args:
+        directory (str): Directory holding one JSON file per server URL.
+    """
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR):
+        self.directory = directory
+
+    def _path(self, server_url: str) -> str:
+        key = hashlib.sha256(server_url.rstrip("/").encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{key}.json")
+
+    def load(self, server_url: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(server_url), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def store(self, server_url: str, card: Dict[str, Any], etag: Optional[str], max_age: int):
+        entry = {
+            "url": server_url.rstrip("/"),
+            "card": card,
+            "etag": etag,
+            "max_age": max_age,
+            "fetched_at": time.time(),
+        }
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".card-")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, self._path(server_url))
+        except OSError as e:
+            # A read-only home directory only costs us the cache
+            logfire.error("agent_card_cache_write_failed", error=str(e), url=server_url)
+
+    @staticmethod
+    def is_fresh(entry: Dict[str, Any], now: Optional[float] = None) -> bool:
+        now = time.time() if now is None else now
+        return now - entry.get("fetched_at", 0) < entry.get("max_age", 0)
@@ -1,11 +1,44 @@
 import argparse
+import asyncio
 from agent import A2AClient
+from sse import ArtifactEvent, PartEvent
+from async_client import AsyncA2AClient, find_dockerfiles, submit_many
 import logfire
 import json
+import sys
 
 logfire.configure(service_name="client_main")
 
 
+def run_bulk(args) -> int:
+    """
+    Submit every Dockerfile under ``--dir`` or listed in ``--file-list`` in
+    parallel and print a throughput/latency summary.
+
+    Returns:
+        int: Process exit code; 1 if any file failed.
+    """
+    if args.dir:
+        paths = find_dockerfiles(args.dir)
+        root = args.dir
+    else:
+        with open(args.file_list, "r") as f:
+            paths = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+        root = None
+    logfire.info("client_bulk_start", files=len(paths), concurrency=args.concurrency)
+
+    async def run():
+        async with AsyncA2AClient(args.server_url, max_connections=args.concurrency) as client:
+            return await submit_many(
+                client, paths, output_dir=args.output_dir, root=root, concurrency=args.concurrency
+            )
+
+    summary = asyncio.run(run())
+    logfire.info("client_bulk_summary", **{k: v for k, v in summary.items() if k != "failures"})
+    print(json.dumps(summary, indent=2))
+    return 1 if summary["failed"] else 0
+
+
 def main():
     """
     Main entry point for the A2A Dockerfile Security Client.
@@ -13,11 +46,43 @@ def main():
     parser = argparse.ArgumentParser(
         description="A2A Dockerfile Security Client"
     )
-    parser.add_argument(
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument(
         "--dockerfile",
         type=str,
         help="Path to Dockerfile or Compose YAML",
-        required=True,
+    )
+    source.add_argument(
+        "--dir",
+        type=str,
+        help="Directory tree to scan for Dockerfiles and Compose files (bulk mode)",
+    )
+    source.add_argument(
+        "--file-list",
+        type=str,
+        help="File with one Dockerfile path per line (bulk mode)",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Follow the task over server-sent events instead of polling",
+    )
+    parser.add_argument(
+        "--upload",
+        action="store_true",
+        help="Send the file through a resumable chunked upload (for large Compose bundles)",
+    )
+    parser.add_argument(
+        "--output-dir",
+        type=str,
+        default=None,
+        help="Bulk mode: directory where patched files are written",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=32,
+        help="Bulk mode: maximum files in flight at once",
     )
     parser.add_argument(
         "--server-url",
@@ -27,6 +92,14 @@ def main():
     )
     args = parser.parse_args()
 
+    if args.dir or args.file_list:
+        try:
+            code = run_bulk(args)
+        except Exception as e:
+            logfire.error("client_bulk_exception", error=str(e))
+            code = 1
+        sys.exit(code)
+
     try:
         try:
             with open(args.dockerfile, "r") as f:
@@ -40,7 +113,24 @@ def main():
 
         try:
             client = A2AClient(args.server_url)
-            result = client.send_dockerfile(dockerfile_text)
+            if args.stream:
+                # Follow the task over SSE instead of polling tasks_get
+                for event in client.stream_task(dockerfile_text=dockerfile_text):
+                    if isinstance(event, ArtifactEvent):
+                        for part in event.artifact.get("parts", []):
+                            content = part.get("content")
+                            if isinstance(content, dict) and "patched_text" in content:
+                                print(content["patched_text"])
+                    elif isinstance(event, PartEvent):
+                        # Findings, best practices and diff hunks arrive while the task runs
+                        logfire.info("client_task_part", task_id=event.task_id, content=event.part.get("content"))
+                    else:
+                        logfire.info("client_task_state", task_id=event.task_id, state=event.state)
+                return
+            if args.upload:
+                result = client.upload_file(args.dockerfile)
+            else:
+                result = client.send_dockerfile(dockerfile_text)
             if isinstance(result, dict) and "error" in result:
                 logfire.error("client_send_dockerfile_error", error=result["error"])
                 logfire.info(
@@ -50,6 +140,17 @@ def main():
                 )
             else:
                 logfire.info("client_send_dockerfile_success", result=result)
+                task_id = result["result"]["task"]["id"]
+                final = client.wait_for_task(task_id)
+                if "error" in final:
+                    logfire.error("client_wait_for_task_error", task_id=task_id, error=final["error"])
+                    return
+                for artifact in final.get("artifacts", []):
+                    for part in artifact.get("parts", []):
+                        content = part.get("content")
+                        if isinstance(content, dict) and "patched_text" in content:
+                            print(content["patched_text"])
+                logfire.info("client_task_result", task_id=task_id, state=final["task"]["state"])
         except Exception as e:
             import traceback
             tb = traceback.format_exc()
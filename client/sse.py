@@ -0,0 +1,129 @@
+import json
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple, Union
+
+from pydantic import BaseModel, Field
+
+
+class SSEMessage(BaseModel):
+    """
+    One server-sent event as parsed from the stream.
+
+    Attributes:
+        event (str): Event type; ``message`` when the server sent none.
+        data (str): The event data, with multi-line data joined by newlines.
+        id (Optional[str]): The event id, if the server sent one.
+    """
+    event: str = "message"
+    data: str = ""
+    id: Optional[str] = None
+
+
+class StateEvent(BaseModel):
+    """
+    A task state transition received over the stream.
+
+    Attributes:
+        task_id (str): The task that changed state.
+        state (str): The new state.
+        timestamp (Optional[float]): When the transition happened.
+        error (Optional[str]): Failure reason for ``failed`` transitions.
+        cursor (Tuple[int, int, int]): Transitions, artifacts and parts received so far, including this one.
+    """
+    task_id: str
+    state: str
+    timestamp: Optional[float] = None
+    error: Optional[str] = None
+    cursor: Tuple[int, int, int] = Field((0, 0, 0), description="(transitions, artifacts, parts) seen so far.")
+
+
+class ArtifactEvent(BaseModel):
+    """
+    An artifact produced by a task, received over the stream.
+
+    Attributes:
+        task_id (str): The task that produced the artifact.
+        artifact (Dict[str, Any]): The artifact, as returned by ``tasks_get``.
+        cursor (Tuple[int, int, int]): Transitions, artifacts and parts received so far, including this one.
+    """
+    task_id: str
+    artifact: Dict[str, Any]
+    cursor: Tuple[int, int, int] = Field((0, 0, 0), description="(transitions, artifacts, parts) seen so far.")
+
+
+class PartEvent(BaseModel):
+    """
+    A part appended to an artifact while its task is running.
+
+    Analysis results stream this way: each finding, best practice and diff
+    hunk arrives as a data part whose ``content["kind"]`` says which it is.
+
+    Attributes:
+        task_id (str): The task that produced the part.
+        artifact_id (str): The artifact the part was appended to.
+        part (Dict[str, Any]): The part, with ``part_id``, ``type`` and ``content``.
+        cursor (Tuple[int, int, int]): Transitions, artifacts and parts received so far, including this one.
+    """
+    task_id: str
+    artifact_id: str
+    part: Dict[str, Any]
+    cursor: Tuple[int, int, int] = Field((0, 0, 0), description="(transitions, artifacts, parts) seen so far.")
+
+
+def parse_sse(lines: Iterable[Union[bytes, str]]) -> Iterator[SSEMessage]:
+    """
+    Incrementally parse server-sent events from an iterable of lines.
+
+    Comment lines (heartbeats) are skipped; an event is yielded at each blank
+    line that follows at least one ``data`` field.
+    """
+    event, data, event_id = None, [], None
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        line = line.rstrip("\r\n")
+        if not line:
+            if data:
+                yield SSEMessage(event=event or "message", data="\n".join(data), id=event_id)
+            event, data, event_id = None, [], None
+            continue
+        if line.startswith(":"):
+            continue
+        field, _, value = line.partition(":")
+        if value.startswith(" "):
+            value = value[1:]
+        if field == "data":
+            data.append(value)
+        elif field == "event":
+            event = value
+        elif field == "id":
+            event_id = value
+    if data:
+        yield SSEMessage(event=event or "message", data="\n".join(data), id=event_id)
+
+
+def parse_cursor(event_id: Optional[str]) -> Optional[Tuple[int, int, int]]:
+    """Parse the server's ``"<transitions>.<artifacts>.<parts>"`` event id."""
+    if not event_id:
+        return None
+    try:
+        fields = [int(f) for f in event_id.split(".")]
+    except ValueError:
+        return None
+    fields += [0] * (3 - len(fields))
+    return fields[0], fields[1], fields[2]
+
+
+def to_task_event(message: SSEMessage) -> Optional[Union[StateEvent, ArtifactEvent, PartEvent]]:
+    """Convert a parsed SSE message into a typed task event; control events return None."""
+    if message.event not in ("message", "artifact", "part"):
+        return None
+    payload = json.loads(message.data)
+    cursor = parse_cursor(message.id) or (0, 0, 0)
+    if message.event == "artifact":
+        return ArtifactEvent(task_id=payload["task_id"], artifact=payload["artifact"], cursor=cursor)
+    if message.event == "part":
+        return PartEvent(task_id=payload["task_id"], artifact_id=payload["artifact_id"], part=payload["part"], cursor=cursor)
+    return StateEvent(
+        task_id=payload["task_id"], state=payload["state"], timestamp=payload.get("timestamp"),
+        error=payload.get("error"), cursor=cursor,
+    )
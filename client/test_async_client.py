@@ -0,0 +1,97 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from async_client import QUEUE_FULL, AsyncA2AClient, RetryableError, submit_many
+
+
+def make_client(handler) -> AsyncA2AClient:
+    return AsyncA2AClient("http://agent", max_retries=2, backoff_base=0, transport=httpx.MockTransport(handler))
+
+
+def run(client: AsyncA2AClient, coro_fn):
+    async def main():
+        async with client:
+            return await coro_fn(client)
+    return asyncio.run(main())
+
+
+def test_send_is_not_retried_after_the_request_may_have_arrived():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        raise httpx.ReadError("connection reset", request=request)
+
+    with pytest.raises(httpx.ReadError):
+        run(make_client(handler), lambda c: c.send_dockerfile("FROM alpine:3.19"))
+    assert len(calls) == 1
+
+
+def test_send_is_retried_when_not_sent_or_queue_full():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) == 1:
+            raise httpx.ConnectError("refused", request=request)
+        rpc_id = json.loads(request.content)["id"]
+        if len(calls) == 2:
+            return httpx.Response(200, json={"jsonrpc": "2.0", "id": rpc_id,
+                                             "error": {"code": QUEUE_FULL, "message": "full"}})
+        return httpx.Response(200, json={"jsonrpc": "2.0", "id": rpc_id, "result": {"result": {"task": {"id": "t"}}}})
+
+    client = make_client(handler)
+    assert run(client, lambda c: c.send_dockerfile("FROM alpine:3.19")) == {"result": {"task": {"id": "t"}}}
+    assert len(calls) == 3 and client.retries == 2
+
+
+def test_get_is_retried_on_server_errors():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(503)
+
+    with pytest.raises(RetryableError, match="HTTP 503"):
+        run(make_client(handler), lambda c: c.get_task("t"))
+    assert len(calls) == 3
+
+
+def test_string_error_is_returned_not_raised():
+    def handler(request):
+        return httpx.Response(200, json={"error": "boom"})
+
+    assert run(make_client(handler), lambda c: c.send_dockerfile("FROM x")) == {"error": "boom"}
+
+
+def test_file_list_keeps_directories_and_reports_failures(tmp_path):
+    for name in ("a", "b", "c"):
+        (tmp_path / name).mkdir()
+        (tmp_path / name / "Dockerfile").write_text(f"FROM {name}\n")
+    out = tmp_path / "out"
+    tasks = {}
+
+    def handler(request):
+        body = json.loads(request.content)
+        if isinstance(body, list):
+            return httpx.Response(200, json=[
+                {"jsonrpc": "2.0", "id": call["id"], "result": tasks[call["params"]["id"]]} for call in body
+            ])
+        text = body["params"]["raw_text"]
+        if text == "FROM c\n":
+            return httpx.Response(200, json={"jsonrpc": "2.0", "id": body["id"], "error": {"code": -32603, "message": "bad"}})
+        task_id = f"task-{len(tasks)}"
+        tasks[task_id] = {
+            "task": {"id": task_id, "state": "completed"},
+            "artifacts": [{"parts": [{"content": {"patched_text": text + "USER app\n"}}]}],
+        }
+        return httpx.Response(200, json={"jsonrpc": "2.0", "id": body["id"], "result": {"result": {"task": {"id": task_id}}}})
+
+    paths = [str(tmp_path / name / "Dockerfile") for name in ("a", "b", "c")]
+    summary = run(make_client(handler), lambda c: submit_many(c, paths, output_dir=str(out), poll_interval=0.01))
+    assert (out / "a" / "Dockerfile").read_text() == "FROM a\nUSER app\n"
+    assert (out / "b" / "Dockerfile").read_text() == "FROM b\nUSER app\n"
+    assert summary["completed"] == 2 and summary["failed"] == 1 and paths[2] in summary["failures"]
@@ -0,0 +1,30 @@
+from card_cache import AgentCardCache, parse_max_age
+
+
+def test_parse_max_age():
+    assert parse_max_age("public, max-age=300") == 300
+    assert parse_max_age("max-age=300, no-cache") == 0
+    assert parse_max_age("no-store") == 0
+    assert parse_max_age("public") == 0
+    assert parse_max_age(None) == 0
+    assert parse_max_age("") == 0
+
+
+def test_cached_card_is_fresh_until_max_age(tmp_path):
+    cache = AgentCardCache(str(tmp_path))
+    cache.store("http://agent/", {"name": "a"}, '"v1"', 60)
+    entry = cache.load("http://agent")
+    assert entry["card"] == {"name": "a"} and entry["etag"] == '"v1"'
+    assert cache.is_fresh(entry, now=entry["fetched_at"] + 59)
+    assert not cache.is_fresh(entry, now=entry["fetched_at"] + 60)
+    assert not cache.is_fresh({"card": {}, "fetched_at": entry["fetched_at"]}, now=entry["fetched_at"])
+
+
+def test_corrupt_or_missing_entries_are_misses(tmp_path):
+    cache = AgentCardCache(str(tmp_path))
+    assert cache.load("http://agent") is None
+    with open(cache._path("http://agent"), "w") as f:
+        f.write('{"card": {"name"')
+    assert cache.load("http://agent") is None
+    cache.store("http://agent", {"name": "b"}, None, 0)
+    assert cache.load("http://agent")["card"] == {"name": "b"}
@@ -0,0 +1,34 @@
+from sse import ArtifactEvent, PartEvent, StateEvent, parse_sse, to_task_event
+
+
+def test_parse_sse_stream_into_typed_events():
+    raw = [
+        b'id: 1.0',
+        b'data: {"task_id": "t", "state": "submitted", "timestamp": 1.0}',
+        b'',
+        b': keep-alive',
+        b'',
+        b'id: 1.1.0',
+        b'event: artifact',
+        b'data: {"task_id": "t",',
+        b'data:  "artifact": {"artifact_id": "a", "parts": []}}',
+        b'',
+        b'id: 1.1.1',
+        b'event: part',
+        b'data: {"task_id": "t", "artifact_id": "a", "part": {"part_id": "p", "type": "data", "content": {"kind": "finding"}}}',
+        b'',
+        b'event: close',
+        b'data: null',
+        b'',
+    ]
+    messages = list(parse_sse(raw))
+    assert [m.event for m in messages] == ["message", "artifact", "part", "close"]
+    state = to_task_event(messages[0])
+    assert isinstance(state, StateEvent) and state.state == "submitted" and state.cursor == (1, 0, 0)
+    artifact = to_task_event(messages[1])
+    assert isinstance(artifact, ArtifactEvent) and artifact.artifact["artifact_id"] == "a"
+    assert artifact.cursor == (1, 1, 0)
+    part = to_task_event(messages[2])
+    assert isinstance(part, PartEvent) and part.artifact_id == "a" and part.part["content"]["kind"] == "finding"
+    assert part.cursor == (1, 1, 1)
+    assert to_task_event(messages[3]) is None
@@ -1,38 +1,49 @@
+import hashlib
 import os
 import logfire
-import json
 import traceback
 import uuid
 from typing import Any
 from fastapi import FastAPI, Request, Depends, status, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from shared.models import (
     DockerConfig, DockerFixResult, TaskStore, TaskHistory, SendTaskRequest,
-    SendTaskResponse, Task, PushNotificationEndpoint, Artifact, Part
+    SendTaskResponse, Task, PushNotificationEndpoint, Artifact, Part, TERMINAL_STATES
 )
 from server.send_subscribe_sse import router as sse_router
-from server.jsonrpc_dispatch import jsonrpc_async_dispatch
-from server.brave_mcp_client import web_search
-from server.upload_stub import router as upload_stub_router
+from server.jsonrpc_dispatch import jsonrpc_async_dispatch, jsonrpc_method
+from server.brave_mcp_client import brave_pool, search_cache, search_flight
+from server.uploads import UploadError, router as upload_router, upload_manager
+from server.task_store import task_store
+from server.task_runner import task_runner, resume_unfinished_tasks
+from server.event_bus import event_bus
+from server.push_delivery import push_delivery
+from server.retention import retention_sweeper
+from server.pipeline import analyze_docker_config, result_cache_stats
+from server.serialization import FastJSONResponse, dumps, to_jsonable
+from server.log_policy import log_policy
+from server import metrics
 
 # --- JSON-RPC: Push Notification Set ---
+@jsonrpc_method()
 async def tasks_pushNotification_set(id: str, endpoint: str, token: str = None):
-    if id not in task_store.tasks:
+    if id not in task_store:
         logfire.error("push_notification_set_unknown_id", task_id=id)
         return {"error": {"code": -32001, "message": "Task id unknown"}}
-    task_store.push_endpoints[id] = PushNotificationEndpoint(endpoint=endpoint, token=token)
+    task_store.set_push_endpoint(id, PushNotificationEndpoint(endpoint=endpoint, token=token))
     logfire.info("push_notification_set", task_id=id, endpoint=endpoint)
     return {"result": "Push endpoint set"}
 
 # --- JSON-RPC: Push Notification Get ---
+@jsonrpc_method()
 async def tasks_pushNotification_get(id: str):
-    endpoint = task_store.push_endpoints.get(id)
+    endpoint = task_store.get_push_endpoint(id)
     if not endpoint:
         logfire.error("push_notification_get_unknown_id", task_id=id)
         return {"error": {"code": -32001, "message": "No push endpoint for task id"}}
-    logfire.info("push_notification_get", task_id=id, endpoint=endpoint.endpoint)
+    log_policy.info("push_notification_get", task_id=id, endpoint=endpoint.endpoint)
     return {"result": {"endpoint": endpoint.endpoint, "token": endpoint.token}}
 
 
@@ -54,21 +65,17 @@ from starlette.types import ASGIApp, Receive, Scope, Send
 
 class LogAllHeadersMiddleware:
     """
-    ASGI middleware that logs all HTTP request headers using logfire.
+    ASGI middleware that logs HTTP requests through ``log_policy``.
 
-    This middleware logs the path and headers of each HTTP request for observability and debugging.
-    It uses logfire for structured JSON logging.
+    Requests are logged as one sampled ``http_request`` event with only the
+    allow-listed headers, so the cost does not grow with request volume.
     """
     def __init__(self, app: ASGIApp):
         self.app = app
     async def __call__(self, scope: Scope, receive: Receive, send: Send):
-        if scope["type"] == "http":
-            import logfire
-            # Log the request path
-            logfire.info("asgi_middleware_test", path=scope.get("path"))
-            # Log all raw headers
-            headers = {k.decode(): v.decode() for k, v in scope.get("headers", [])}
-            logfire.info("asgi_raw_headers", path=scope.get("path"), headers=headers)
+        if scope["type"] == "http" and log_policy.should_log("info", "http_request"):
+            log_policy.emit("info", "http_request", path=scope.get("path"), method=scope.get("method"),
+                            headers=log_policy.headers(scope.get("headers", [])))
         try:
             await self.app(scope, receive, send)
         except Exception as e:
@@ -85,19 +92,97 @@ class LogAllHeadersMiddleware:
             await error_sender({"type": "http.response.start"})
             await error_sender({"type": "http.response.body"})
 
-app = FastAPI()
+from contextlib import asynccontextmanager
+from functools import lru_cache
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Start long-lived resources with the app and shut them down on exit.
+
+    Warms the Brave MCP session pool so tasks reuse running MCP servers
+    instead of spawning one per search, restores the persisted search cache and
+    starts the background task workers and push-notification delivery. Tasks
+    recovered from the durable task log are requeued, the retention sweeper
+    keeps finished tasks within the configured limits and idle uploads are
+    swept. The event-loop lag
+    monitor samples for ``/metrics`` while the app runs.
+    """
+    log_policy.start()
+    metrics.loop_lag_monitor.start()
+    search_cache.load()
+    await brave_pool.start()
+    await push_delivery.start()
+    task_runner.start()
+    resume_unfinished_tasks()
+    retention_sweeper.start()
+    upload_manager.start()
+    try:
+        yield
+    finally:
+        await upload_manager.stop()
+        await retention_sweeper.stop()
+        await task_runner.stop()
+        await push_delivery.stop()
+        await brave_pool.stop()
+        task_store.close()
+        search_cache.save()
+        await log_policy.stop()
+        await metrics.loop_lag_monitor.stop()
+
+app = FastAPI(lifespan=lifespan)
 
 @app.get("/healthz")
 async def health_check():
     return {"status": "ok"}
 
+@app.get("/stats")
+async def stats():
+    """Return cache, MCP pool, worker, SSE, push delivery and task store counters for quick inspection."""
+    return {
+        "search_cache": search_cache.stats(),
+        "result_cache": result_cache_stats(),
+        "search_flight": search_flight.stats(),
+        "mcp_pool": brave_pool.stats(),
+        "task_runner": task_runner.stats(),
+        "event_bus": event_bus.stats(),
+        "push_delivery": push_delivery.stats(),
+        "task_store": task_store.memory_stats(),
+        "log_policy": log_policy.stats(),
+        "uploads": upload_manager.stats(),
+    }
+
+# Gauges read from the stores at scrape time; the hot paths only update their own counters
+metrics.registry.callback("a2a_tasks", "Tasks held in memory by state.", task_store.state_counts, ("state",))
+metrics.registry.callback("a2a_task_queue_depth", "Tasks waiting for a worker.", lambda: task_runner.stats()["queued"])
+metrics.registry.callback("a2a_tasks_running", "Tasks being processed by a worker.", lambda: task_runner.stats()["running"])
+metrics.registry.callback("a2a_sse_subscribers", "Open SSE subscriptions.", event_bus.subscriber_count)
+metrics.registry.callback(
+    "a2a_sse_dropped_subscribers_total", "SSE subscribers dropped for falling behind.",
+    lambda: event_bus.dropped_subscribers, type="counter",
+)
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Return request, search, task, SSE and event-loop metrics in the Prometheus text format."""
+    return Response(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
+@lru_cache(maxsize=256)
+def accepts_json(accept: str) -> bool:
+    """Return True if an Accept header value allows a JSON response. Results are cached per header value."""
+    for val in accept.lower().split(','):
+        val = val.strip().split(';')[0]
+        if "application/json" in val or "*/*" in val or val == '':
+            return True
+    return False
+
 # Middleware to enforce Accept header for agent card endpoint
 @app.middleware("http")
 async def enforce_agent_card_accept_header(request: Request, call_next):
     """
     Middleware to enforce correct Accept header for the agent card endpoint.
-    Logs incoming headers and ensures that requests to /.well-known/agent.json
-    have an appropriate Accept header. Uses logfire for logging.
+    Ensures that requests to /.well-known/agent.json have an appropriate
+    Accept header. Uses logfire for logging.
 
     Args:
         request (Request): The incoming HTTP request.
@@ -106,16 +191,9 @@ async def enforce_agent_card_accept_header(request: Request, call_next):
     Returns:
         JSONResponse with 406 status if Accept header is invalid, otherwise the normal response.
     """
-    logfire.info("middleware_accept_debug", path=str(request.url.path), headers=dict(request.headers))
-    if request.url.path == "/.well-known/agent.json": 
-        accept = request.headers.get("accept", "application/json").lower()
-        allowed = False
-        for val in accept.split(','):
-            val = val.strip().split(';')[0]
-            if "application/json" in val or "*/*" in val or val == '':
-                allowed = True
-                break
-        if not allowed:
+    if request.url.path == "/.well-known/agent.json":
+        accept = request.headers.get("accept", "application/json")
+        if not accepts_json(accept):
             logfire.error("agent_card_invalid_accept", accept=accept)
             return JSONResponse(content={"error": "Not Acceptable"}, status_code=406)
     try:
@@ -139,56 +217,90 @@ logfire.info("asgi_middleware_registered")
 logfire.instrument_fastapi(app)
 
 from server.send_subscribe_sse import router as sse_router
-from server.upload_stub import router as upload_stub_router
 # Include the SSE router for server-sent events
 app.include_router(sse_router)
-app.include_router(upload_stub_router)
-app.include_router(upload_stub_router)
-# Import the shared task store for managing tasks
-from server.task_store import task_store
 
 
 # --- JSON-RPC streaming method for tasks/sendSubscribe ---
-from fastapi.responses import StreamingResponse
-import asyncio
+from server.send_subscribe_sse import event_stream_response, missed_parts
 
-def event_generator(task_id: str):
+# --- JSON-RPC: tasks_resubscribe ---
+@jsonrpc_method()
+def tasks_resubscribe(id: str, historyLength: int = 0, artifactOffset: int = 0, partOffset: int = None):
     """
-    Simulate a server-sent event (SSE) stream of status updates for a given task.
+    Return what a client missed after ``historyLength`` transitions and ``artifactOffset`` artifacts.
 
-    Args:
-        task_id (str): The ID of the task to stream updates for.
-
-    Yields:
-        str: SSE-formatted strings containing task state updates.
+    With ``partOffset`` (parts received so far, across all artifacts) the
+    result also lists ``parts`` appended to the first ``artifactOffset``
+    artifacts since then.
     """
-    states = ["submitted", "working", "completed"]
-    for state in states:
-        # Use time.sleep because this function is synchronous
-        import time
-        time.sleep(1)
-        event = {"task_id": task_id, "state": state}
-        yield f"data: {json.dumps(event)}\n\n"
-    yield "event: close\ndata: null\n\n"
-
-# --- JSON-RPC: tasks_resubscribe ---
-def tasks_resubscribe(id: str, historyLength: int = 0):
     trace_id = str(uuid.uuid4())
-    if id not in task_store.tasks:
+    if id not in task_store:
         logfire.error("task_resubscribe_not_found", trace_id=trace_id, task_id=id)
         return {"error": {"code": -32001, "message": "Task id unknown"}}
     stream_url = f"/stream/{id}"
-    history = task_store.history[id]
-    transitions = history.transitions[historyLength:] if historyLength else history.transitions
-    artifacts = history.artifacts if hasattr(history, 'artifacts') else []
-    logfire.info("task_resubscribe", trace_id=trace_id, task_id=id, stream_url=stream_url)
-    return {"stream_url": stream_url, "transitions": transitions, "artifacts": [a.dict() for a in artifacts]}
-
-# --- API stub for chunked uploads ---
-def chunked_upload_stub(*args, **kwargs):
-    trace_id = str(uuid.uuid4())
-    logfire.info("chunked_upload_stub_called", trace_id=trace_id)
-    return {"result": "not implemented"}
+    described = task_store.describe(id, historyLength)
+    artifacts = described["artifacts"]
+    missed, _ = missed_parts(artifacts, artifactOffset, partOffset)
+    log_policy.info("task_resubscribe", trace_id=trace_id, task_id=id, stream_url=stream_url)
+    return {
+        "stream_url": stream_url,
+        "transitions": described["transitions"],
+        "artifacts": artifacts[artifactOffset:],
+        "parts": [{"seq": seq, "artifact_id": artifact_id, "part": part} for seq, artifact_id, part in missed],
+    }
+
+# --- JSON-RPC: chunked uploads ---
+@jsonrpc_method()
+def uploads_create(size: int = None, sha256: str = None):
+    """Open a resumable upload; chunks go to ``PUT /upload/chunk?upload_id=...&offset=...``."""
+    try:
+        return {"result": upload_manager.create(size, sha256)}
+    except UploadError as e:
+        return {"error": e.to_error()}
+
+@jsonrpc_method()
+def uploads_status(upload_id: str):
+    """Return the offset an interrupted upload resumes from."""
+    try:
+        return {"result": upload_manager.status(upload_id)}
+    except UploadError as e:
+        return {"error": e.to_error()}
+
+@jsonrpc_method()
+async def uploads_finalize(upload_id: str, sha256: str = None):
+    """Check a complete upload and submit it as a task, like ``tasks_send``."""
+    if task_runner.full():
+        # Cheap early answer; the upload is kept either way
+        return {"error": {"code": -32003, "message": "Task queue full, retry later"}}
+    try:
+        raw_text = await upload_manager.read(upload_id, sha256)
+    except UploadError as e:
+        logfire.error("upload_finalize_failed", upload_id=upload_id, error=str(e))
+        return {"error": e.to_error()}
+    try:
+        response = await tasks_send(raw_text)
+    except BaseException:
+        upload_manager.release(upload_id)
+        raise
+    # Only a submitted task closes the upload, so a failed submit can be retried
+    if "result" in response:
+        upload_manager.commit(upload_id)
+    else:
+        upload_manager.release(upload_id)
+    return response
+
+@jsonrpc_method()
+def uploads_abort(upload_id: str):
+    try:
+        return {"result": upload_manager.abort(upload_id)}
+    except UploadError as e:
+        return {"error": e.to_error()}
+
+# Former stub name, kept for existing callers
+@jsonrpc_method()
+def chunked_upload_stub(size: int = None, sha256: str = None):
+    return uploads_create(size, sha256)
 
 # --- Bearer Token Auth Helpers ---
 def get_bearer_token():
@@ -204,13 +316,27 @@ def verify_bearer_auth(credentials: HTTPAuthorizationCredentials = Depends(HTTPB
 
 @app.post("/a2a/tasks/sendSubscribe")
 async def send_subscribe(request: Request, _auth: None = Depends(verify_bearer_auth)):
+    """
+    Subscribe to a task's events over SSE.
+
+    Accepts either ``task_id`` for an existing task or ``raw_text`` to submit a
+    new task and stream it from the start.
+    """
     req_data = await request.json()
     task_id = req_data.get("task_id")
+    if not task_id and req_data.get("raw_text"):
+        sent = await tasks_send(req_data["raw_text"])
+        if "error" in sent:
+            return JSONResponse(content={"error": sent["error"]}, status_code=503)
+        task_id = sent["result"]["task"]["id"]
     if not task_id:
         logfire.error("missing_task_id", error="No task_id provided for sendSubscribe")
         return JSONResponse(content={"error": "No task_id provided"}, status_code=400)
+    if task_id not in task_store:
+        logfire.error("send_subscribe_unknown_task", task_id=task_id)
+        return JSONResponse(content={"error": "Task id unknown"}, status_code=404)
     logfire.info("send_subscribe_started", task_id=task_id)
-    return StreamingResponse(event_generator(task_id), media_type="text/event-stream")
+    return event_stream_response(task_id, request)
 # --- End JSON-RPC streaming method ---
 
 def get_bearer_token():
@@ -223,34 +349,27 @@ def verify_bearer_auth(credentials: HTTPAuthorizationCredentials = Depends(HTTPB
             detail="Invalid or missing Bearer token",
         )
 
+# Chunk uploads are raw bodies outside JSON-RPC, so the router carries its own auth
+app.include_router(upload_router, dependencies=[Depends(verify_bearer_auth)])
+
 
 import uuid
 from shared.models import SendTaskRequest, SendTaskResponse, Task, DockerConfig, DockerFixResult
 
+@jsonrpc_method()
 async def tasks_send(raw_text: str):
+    """
+    Record a new task and queue it for background analysis.
+
+    Returns immediately with the task in the ``submitted`` state; progress is
+    available through ``tasks_get``, ``tasks_resubscribe`` or the SSE stream.
+    """
     try:
         req = SendTaskRequest(raw_text=raw_text)
         docker_config = DockerConfig(raw_text=req.raw_text)
-        hadolint_issues = ["DL3002: Use COPY instead of ADD"]
-        try:
-            logfire.info("starting search for best practices")
-            brave_search_result_text = await web_search("Dockerfile security best practices")
-            best_practices = [str(brave_search_result_text)]
-            logfire.info("brave_web_search_agent_used", result=brave_search_result_text)
-        except RuntimeError as e:
-            best_practices = [f"MCP Error: {str(e)}"]
-            logfire.error("brave_web_search_agent_failed", error=str(e), traceback=traceback.format_exc(), error_type=type(e).__name__)
-        except Exception as e:
-            best_practices = [f"Unexpected Error: {str(e)}"]
-            logfire.error("brave_web_search_agent_failed", error=str(e), traceback=traceback.format_exc(), error_type=type(e).__name__)
-        patched = docker_config.raw_text + "\n# Hardened by server agent\n# " + "\n# ".join(best_practices)
-        diff = {"added": ["# Hardened by server agent"] + [f"# {bp}" for bp in best_practices]}
-        result = DockerFixResult(
-            patched_text=patched,
-            diff_json=diff,
-            issues_fixed=hadolint_issues + best_practices,
-            issues_remaining=[]
-        )
+        if task_runner.full():
+            logfire.error("task_queue_full")
+            return {"error": {"code": -32003, "message": "Task queue full, retry later"}}
         # Create Task object
         task_id = str(uuid.uuid4())
         task = Task(
@@ -258,47 +377,54 @@ async def tasks_send(raw_text: str):
             state="submitted",
             docker_config=docker_config
         )
-        # Store task and history
-        task_store.tasks[task_id] = task
-        task_store.history[task_id] = TaskHistory(transitions=[{"state": "submitted"}])
+        # Store task and history, then hand it to the workers
+        task_store.create_task(task)
+        if not task_runner.submit(task_id):
+            task_store.transition(task_id, "failed", error="Task queue full")
+            return {"error": {"code": -32003, "message": "Task queue full, retry later"}}
         trace_id = str(uuid.uuid4())
-        logfire.info("task_stored", trace_id=trace_id, task_id=task_id)
-        return {"result": {"task": task.dict(), "patched": patched}}
+        log_policy.info("task_stored", trace_id=trace_id, task_id=task_id)
+        return {"result": {"task": to_jsonable(task)}}
     except Exception as e:
         logfire.error("server_exception", error=str(e), traceback=traceback.format_exc())
         return {"error": str(e)}
 
+@jsonrpc_method()
 def tasks_get(id: str, historyLength: int = 0):
     try:
-        if id not in task_store.tasks:
-            logfire.error("task_not_found", id=id)
-            return {"error": {"code": -32001, "message": "Task id unknown"}}
-        task = task_store.tasks[id]
-        history = task_store.history[id]
-        transitions = history.transitions[historyLength:] if historyLength else history.transitions
-        artifacts = history.artifacts if hasattr(history, 'artifacts') else []
+        result = task_store.describe(id, historyLength)
+        archived = result is None
+        if archived:
+            # Finished tasks evicted from memory may still be in the archive
+            stored = task_store.load_archived(id)
+            if stored is None:
+                logfire.error("task_not_found", id=id)
+                return {"error": {"code": -32001, "message": "Task id unknown"}}
+            task, history = stored["task"], stored["history"]
+            transitions = history.transitions[historyLength:] if historyLength else history.transitions
+            result = {"task": to_jsonable(task), "transitions": transitions, "artifacts": [to_jsonable(a) for a in history.artifacts], "archived": True}
         trace_id = str(uuid.uuid4())
-        logfire.info("task_retrieved", trace_id=trace_id, task_id=id, state=task.state)
-        return {"task": task.dict(), "transitions": transitions, "artifacts": [a.dict() for a in artifacts]}
+        log_policy.info("task_retrieved", trace_id=trace_id, task_id=id, state=result["task"]["state"], archived=archived)
+        return result
     except Exception as e:
         logfire.error("tasks_get_exception", error=str(e), id=id)
         return {"error": {"code": -32001, "message": str(e)}}
 
 # --- JSON-RPC method for task cancellation ---
+@jsonrpc_method()
 def tasks_cancel(id: str):
     try:
-        if id not in task_store.tasks:
+        if id not in task_store:
             logfire.error("task_not_found_cancel", id=id)
             return {"error": {"code": -32001, "message": "Task id unknown"}}
-        task = task_store.tasks[id]
-        # For PoC, allow cancellation only if state is not 'completed' or 'cancelled'
-        if getattr(task, 'state', None) in ["completed", "cancelled"]:
+        task = task_store.get_task(id)
+        # Only tasks that have not reached a terminal state can be cancelled
+        if task.state in TERMINAL_STATES:
             logfire.error("task_not_cancelable", id=id, state=task.state)
             return {"error": {"code": -32002, "message": "Task not cancelable"}}
-        # Set state to cancelled
-        task.state = "cancelled"
-        if hasattr(task_store.history[id], 'transitions'):
-            task_store.history[id].transitions.append({"state": "cancelled"})
+        # Set state to cancelled and stop the analysis if a worker is running it
+        task_store.transition(id, "cancelled")
+        task_runner.cancel(id)
         trace_id = str(uuid.uuid4())
         logfire.info("task_cancelled", trace_id=trace_id, task_id=id)
         return {"result": "Task cancelled"}
@@ -314,7 +440,10 @@ async def jsonrpc_entrypoint(request: Request, _auth: None = Depends(verify_bear
     try:
         req_data = await request.body()
         response = await jsonrpc_async_dispatch(req_data)
-        return JSONResponse(content=response, status_code=200)
+        if response is None:
+            # Only notifications were sent, so there is nothing to return
+            return Response(status_code=204)
+        return FastJSONResponse(content=response, status_code=200)
     except Exception as e:
         logfire.error("jsonrpc_entrypoint_exception", error=str(e))
         return JSONResponse(content={"error": str(e)}, status_code=500)
@@ -325,57 +454,23 @@ async def analyze_and_fix_docker(request: Request, _auth: None = Depends(verify_
     try:
         body = await request.json()
         docker_config = DockerConfig(**body)
-        hadolint_issues = ["DL3002: Use COPY instead of ADD"]
-        try:
-            logfire.info("starting search for best practices")
-            brave_search_result_text = await web_search("Dockerfile security best practices")
-            best_practices = [str(brave_search_result_text)]
-            logfire.info("brave_web_search_agent_used", result=brave_search_result_text)
-        except RuntimeError as e:
-            best_practices = [f"MCP Error: {str(e)}"]
-            logfire.error("brave_web_search_agent_failed", error=str(e), traceback=traceback.format_exc(), error_type=type(e).__name__)
-        except Exception as e:
-            best_practices = [f"Unexpected Error: {str(e)}"]
-            logfire.error("brave_web_search_agent_failed", error=str(e), traceback=traceback.format_exc(), error_type=type(e).__name__)
-        patched = docker_config.raw_text + "\n# Hardened by server agent\n# " + "\n# ".join(best_practices)
-        diff = {"added": ["# Hardened by server agent"] + [f"# {bp}" for bp in best_practices]}
-        result = DockerFixResult(
-            patched_text=patched,
-            diff_json=diff,
-            issues_fixed=hadolint_issues + best_practices,
-            issues_remaining=[]
-        )
-        logfire.info("analyze_and_fix_docker", input=docker_config.raw_text, output=result.dict(), brave_search=best_practices)
+        result = await analyze_docker_config(docker_config)
+        if log_policy.should_log("info", "analyze_and_fix_docker"):
+            log_policy.emit("info", "analyze_and_fix_docker", input=docker_config.raw_text, output=result.model_dump())
         # [blue_log] replaced by logfire.info or logfire.error"event": "analyze_and_fix_docker", "input": docker_config.raw_text, "output": result.dict(), "brave_search": best_practices})
-        return JSONResponse(content=result.dict())
+        # Encoded with orjson like the JSON-RPC responses
+        return FastJSONResponse(content=result)
     except Exception as e:
         logfire.error("server_exception", error=str(e), traceback=traceback.format_exc())
         # [blue_log] replaced by logfire.info or logfire.error"event": "server_exception", "error": str(e)})
         return JSONResponse(content={"error": str(e)}, status_code=500)
 
-from fastapi import Request, Depends
-
-def validate_accept_header(request: Request):
-    accept = request.headers.get("accept", "application/json").lower()
-    allowed = False
-    for val in accept.split(','):
-        val = val.strip().split(';')[0]
-        if "application/json" in val or "*/*" in val or val == '':
-            allowed = True
-            break
-    if not allowed:
-        logfire.error("agent_card_invalid_accept", accept=accept)
-        from fastapi import HTTPException
-        raise HTTPException(status_code=406, detail="Not Acceptable")
-
-@app.get("/.well-known/agent.json", response_class=JSONResponse)
-def agent_card(request: Request, _=Depends(validate_accept_header)):
-    card = {
+AGENT_CARD = {
         "name": "Docker Security Agent",
         "description": "Analyzes and hardens Dockerfiles via MCP tools.",
         "url": "http://server:8080",
         "version": "0.1.0",
-        "capabilities": {"streaming": True},
+        "capabilities": {"streaming": True, "pushNotifications": True},
         "authentication": {"schemes": ["None"]},
         "skills": [
             {
@@ -389,4 +484,26 @@ def agent_card(request: Request, _=Depends(validate_accept_header)):
         "defaultInputModes": ["application/json"],
         "defaultOutputModes": ["application/json"]
     }
-    return JSONResponse(content=card)
+# The card never changes while the server runs, so it is encoded and hashed once
+AGENT_CARD_BODY = dumps(AGENT_CARD)
+AGENT_CARD_ETAG = '"' + hashlib.sha256(AGENT_CARD_BODY).hexdigest()[:32] + '"'
+AGENT_CARD_HEADERS = {
+    "ETag": AGENT_CARD_ETAG,
+    "Cache-Control": f"public, max-age={int(os.getenv('A2A_AGENT_CARD_MAX_AGE', '300'))}",
+}
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Check an If-None-Match header against ``etag`` (weak comparison, as RFC 9110 requires for GET)."""
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+@app.get("/.well-known/agent.json", response_class=JSONResponse)
+def agent_card(request: Request):
+    # The Accept header is already enforced by enforce_agent_card_accept_header
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag_matches(if_none_match, AGENT_CARD_ETAG):
+        return Response(status_code=304, headers=AGENT_CARD_HEADERS)
+    return Response(content=AGENT_CARD_BODY, media_type="application/json", headers=AGENT_CARD_HEADERS)
@@ -1,30 +1,170 @@
+import hashlib
 import os
+import time
 from dotenv import load_dotenv
 from pydantic_ai.mcp import MCPServerStdio
 from pydantic_ai import Agent
 import logfire
+from server import metrics
+from server.log_policy import log_policy
+from server.mcp_session_pool import MCPSessionPool
+from server.search_cache import TTLLRUCache
 
 logfire.configure(service_name="brave_mcp_client")
 
 load_dotenv()
 
-brave_server = MCPServerStdio(
-    'npx', ['-y', '@modelcontextprotocol/server-brave-search'],
-    env={"BRAVE_API_KEY": os.getenv("BRAVE_API_KEY")}
+BRAVE_MODEL = "openai:gpt-4o-mini"
+BRAVE_SYSTEM_PROMPT = "You are an assistant with the ability to search the web with Brave and an expert in Cybersecurity Docker best practices"
+
+
+def make_brave_session():
+    """
+    Build a Brave MCP stdio server and an agent bound to it.
+
+    Returns:
+        tuple: ``(MCPServerStdio, Agent)`` pair used as one pooled session.
+    """
+    server = MCPServerStdio(
+        'npx', ['-y', '@modelcontextprotocol/server-brave-search'],
+        env={"BRAVE_API_KEY": os.getenv("BRAVE_API_KEY")}
+    )
+    return server, Agent(
+        model=BRAVE_MODEL,
+        system_prompt=BRAVE_SYSTEM_PROMPT,
+        mcp_servers=[server]
+    )
+
+
+# Fallback used when the pool is not running (scripts, tests without app lifespan)
+brave_server, agent = make_brave_session()
+
+brave_pool = MCPSessionPool(
+    make_brave_session,
+    size=int(os.getenv("BRAVE_MCP_POOL_SIZE", "2")),
+    health_interval=float(os.getenv("BRAVE_MCP_HEALTH_INTERVAL", "30")),
+    health_timeout=float(os.getenv("BRAVE_MCP_HEALTH_TIMEOUT", "5")),
+    checkout_timeout=float(os.getenv("BRAVE_MCP_CHECKOUT_TIMEOUT", "30")),
 )
-agent = Agent(
-    model="openai:gpt-4o-mini",
-    system_prompt="You are an assistant with the ability to search the web with Brave and an expert in Cybersecurity Docker best practices",
-    mcp_servers=[brave_server]
+
+search_cache = TTLLRUCache(
+    max_entries=int(os.getenv("BRAVE_SEARCH_CACHE_ENTRIES", "256")),
+    max_bytes=int(os.getenv("BRAVE_SEARCH_CACHE_BYTES", str(4 * 1024 * 1024))),
+    ttl=float(os.getenv("BRAVE_SEARCH_CACHE_TTL", "3600")),
+    path=os.getenv("BRAVE_SEARCH_CACHE_PATH") or None,
 )
 
 
+def search_cache_key(query: str) -> str:
+    """
+    Build the cache key for a query.
+
+    The query is case- and whitespace-normalized and combined with the model and
+    system prompt, so changing either of them never serves stale answers.
+    """
+    normalized = " ".join(query.lower().split())
+    material = "\x1f".join([BRAVE_MODEL, BRAVE_SYSTEM_PROMPT, normalized])
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
 import asyncio
 from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict
+
+
+class _Flight:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key into a single in-flight task.
+
+    The first caller for a key starts the work; later callers await the same
+    task. Results and exceptions are delivered to every waiter. A cancelled
+    waiter only detaches itself; the shared task is cancelled once no waiters
+    are left, and cancelling the shared task cancels every waiter. A call made
+    after the last waiter left starts a new task.
+    """
+    def __init__(self):
+        self._flights: Dict[str, _Flight] = {}
+        self.calls = 0
+        self.coalesced = 0
+        self.abandoned = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(fn()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda task, key=key, flight=flight: self._finish(key, flight))
+            self.calls += 1
+        else:
+            self.coalesced += 1
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                self.abandoned += 1
+                # Unregister before cancelling so a new caller starts a fresh task
+                # instead of joining the one being torn down
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+                flight.task.cancel()
+
+    def _finish(self, key: str, flight: _Flight):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if not flight.task.cancelled():
+            # Mark the exception as retrieved even when every waiter went away.
+            flight.task.exception()
+
+    def stats(self) -> Dict[str, int]:
+        """Return how many calls ran and how many were served by an in-flight call."""
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "abandoned": self.abandoned,
+            "in_flight": len(self._flights),
+        }
+
+
+search_flight = SingleFlight()
+
+
+async def _search_and_cache(query: str, key: str) -> str:
+    logfire.info("web_search_agent_start", query=query)
+    try:
+        if brave_pool.started:
+            async with brave_pool.checkout() as session_agent:
+                result = await session_agent.run(query)
+        else:
+            async with agent.run_mcp_servers():
+                result = await agent.run(query)
+        data = getattr(result, 'data', result)
+        if log_policy.should_log("info", "web_search_agent_success"):
+            log_policy.emit("info", "web_search_agent_success", query=query, response=str(data))
+    except Exception as e:
+        logfire.error("web_search_agent_error", error=str(e), query=query)
+        raise RuntimeError(f"web_search failed: {str(e)}")
+    data = data if isinstance(data, str) else str(data)
+    search_cache.set(key, data)
+    return data
+
 
 async def web_search(query: str) -> str:
     """
     Perform a web search using the Brave MCP agent and return the result.
+
+    Results are served from ``search_cache`` when available. On a miss,
+    concurrent callers with the same cache key share one search through
+    ``search_flight``. The search borrows a warm session from ``brave_pool``
+    when the pool is running; otherwise a one-off MCP server is started.
+
     Args:
         query (str): The search query to run via the Brave MCP agent.
     Returns:
@@ -32,12 +172,17 @@ async def web_search(query: str) -> str:
     Raises:
         RuntimeError: If the agent search fails or an exception occurs.
     """
-    logfire.info("web_search_agent_start", query=query)
+    started = time.perf_counter()
+    key = search_cache_key(query)
+    cached = search_cache.get(key)
+    if cached is not None:
+        log_policy.info("web_search_cache_hit", query=query)
+        metrics.web_search_duration.observe(time.perf_counter() - started, "hit")
+        return cached
     try:
-        async with agent.run_mcp_servers():
-            result = await agent.run(query)
-            logfire.info("web_search_agent_success", query=query, response=getattr(result, 'data', result))
-            return getattr(result, 'data', result)
-    except Exception as e:
-        logfire.error("web_search_agent_error", error=str(e), query=query)
-        raise RuntimeError(f"web_search failed: {str(e)}")
+        return await search_flight.do(key, lambda: _search_and_cache(query, key))
+    except Exception:
+        metrics.web_search_errors.inc()
+        raise
+    finally:
+        metrics.web_search_duration.observe(time.perf_counter() - started, "miss")
@@ -0,0 +1,228 @@
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import yaml
+
+from server.dockerfile_analyzer import Issue, analyze_dockerfile, image_tag
+
+# libyaml is several times faster on large compose files; fall back to the pure-Python loader
+_Loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+DANGEROUS_CAPABILITIES = frozenset(("ALL", "SYS_ADMIN", "NET_ADMIN", "SYS_PTRACE", "SYS_MODULE", "SYS_RAWIO", "DAC_READ_SEARCH"))
+SENSITIVE_HOST_PATHS = frozenset((
+    "/", "/var/run/docker.sock", "/run/docker.sock", "/etc", "/proc", "/sys", "/root", "/boot", "/dev",
+))
+
+
+class ComposeService:
+    """
+    One service of a docker-compose file.
+
+    Attributes:
+        name (str): Service name.
+        line (int): Line of the service key.
+        config (dict): The service mapping, with anchors and merge keys resolved.
+        lines (Dict[str, int]): Line of each setting written directly under the service.
+        image (Optional[str]): The ``image`` setting, if any.
+        build (Optional[Dict[str, Any]]): The ``build`` setting in long form, if any.
+        inline_offset (int): Lines before the first line of ``build.dockerfile_inline``.
+    """
+    __slots__ = ("name", "line", "config", "lines", "image", "build", "inline_offset")
+
+    def __init__(self, name: str, line: int, config: Dict[str, Any], lines: Dict[str, int], inline_offset: int = 0):
+        self.name = name
+        self.line = line
+        self.config = config
+        self.lines = lines
+        self.inline_offset = inline_offset
+        image = config.get("image")
+        self.image = str(image) if image is not None else None
+        build = config.get("build")
+        self.build = {"context": build} if isinstance(build, str) else build if isinstance(build, dict) else None
+
+    def line_of(self, key: str) -> int:
+        return self.lines.get(key, self.line)
+
+
+def _child(node: Optional[yaml.Node], name: str) -> Optional[yaml.Node]:
+    if isinstance(node, yaml.MappingNode):
+        for key, value in node.value:
+            if isinstance(key, yaml.ScalarNode) and key.value == name:
+                return value
+    return None
+
+
+def _key_lines(node: Optional[yaml.Node]) -> Dict[str, int]:
+    if not isinstance(node, yaml.MappingNode):
+        return {}
+    return {str(key.value): key.start_mark.line + 1 for key, _ in node.value if isinstance(key, yaml.ScalarNode)}
+
+
+def _inline_offset(node: Optional[yaml.Node]) -> int:
+    inline = _child(_child(node, "build"), "dockerfile_inline")
+    if inline is None:
+        return 0
+    # Block scalars (| and >) start on the line after their indicator
+    return inline.start_mark.line + (1 if inline.style in ("|", ">") else 0)
+
+
+def parse_compose(text: str) -> Optional[List[ComposeService]]:
+    """
+    Parse a docker-compose file into its services.
+
+    Returns:
+        Optional[List[ComposeService]]: Services in file order, or None if the
+        text is not YAML with a top-level ``services`` mapping.
+    """
+    if "services" not in text:
+        return None
+    loader = _Loader(text)
+    try:
+        root = loader.get_single_node()
+        if not isinstance(root, yaml.MappingNode):
+            return None
+        data = loader.construct_document(root)
+    except yaml.YAMLError:
+        return None
+    finally:
+        loader.dispose()
+    if not isinstance(data, dict) or not isinstance(data.get("services"), dict):
+        return None
+    nodes = {
+        str(key.value): (key.start_mark.line + 1, value)
+        for key, value in _child(root, "services").value
+        if isinstance(key, yaml.ScalarNode)
+    }
+    services = []
+    for name, config in data["services"].items():
+        line, node = nodes.get(str(name), (1, None))
+        services.append(ComposeService(
+            str(name), line, config if isinstance(config, dict) else {}, _key_lines(node), _inline_offset(node)
+        ))
+    return services
+
+
+class ComposeRule:
+    """
+    A check on one service setting, run only when the service sets it.
+
+    Args:
+        id (str): Rule id.
+        message (str): Message reported for violations.
+        keys (Tuple[str, ...]): Service settings the rule inspects.
+        check (Callable[[Any], bool]): Returns True if the setting's value is a violation.
+        severity (str): Severity of reported issues.
+    """
+    __slots__ = ("id", "message", "keys", "check", "severity")
+
+    def __init__(self, id: str, message: str, keys: Tuple[str, ...], check: Callable[[Any], bool],
+                 severity: str = "warning"):
+        self.id = id
+        self.message = message
+        self.keys = keys
+        self.check = check
+        self.severity = severity
+
+
+compose_rules: List[ComposeRule] = []
+
+
+def compose_rule(id: str, message: str, *keys: str, severity: str = "warning"):
+    """Decorator registering ``check(value) -> bool`` for the given service settings."""
+    def decorator(check: Callable[[Any], bool]):
+        compose_rules.append(ComposeRule(id, message, keys, check, severity))
+        return check
+    return decorator
+
+
+def _entries(value: Any) -> Iterable[Any]:
+    return value if isinstance(value, list) else ()
+
+
+@compose_rule("CMP001", "Do not run services privileged; it disables container isolation", "privileged", severity="error")
+def _privileged(value):
+    return value is True or str(value).lower() == "true"
+
+
+@compose_rule("CMP002", "Do not add broad capabilities such as ALL or SYS_ADMIN", "cap_add")
+def _dangerous_capabilities(value):
+    return any(str(cap).upper().removeprefix("CAP_") in DANGEROUS_CAPABILITIES for cap in _entries(value))
+
+
+@compose_rule("CMP003", "Do not run the service as root", "user")
+def _root_user(value):
+    return str(value).split(":")[0].strip() in ("root", "0")
+
+
+@compose_rule("CMP004", "Bind published ports to a host address such as 127.0.0.1", "ports", severity="info")
+def _ports_on_all_interfaces(value):
+    for port in _entries(value):
+        if isinstance(port, dict):
+            if port.get("published") is not None and not port.get("host_ip"):
+                return True
+        elif str(port).rsplit("/", 1)[0].count(":") < 2:
+            # "80" and "8080:80" publish on every interface; "127.0.0.1:8080:80" does not
+            return True
+    return False
+
+
+@compose_rule("CMP005", "Do not mount the Docker socket or sensitive host paths", "volumes", severity="error")
+def _sensitive_mounts(value):
+    for volume in _entries(value):
+        if isinstance(volume, dict):
+            source = volume.get("source") if volume.get("type", "bind") == "bind" else None
+        else:
+            parts = str(volume).split(":")
+            source = parts[0] if len(parts) > 1 else None
+        if source and (source.rstrip("/") or "/") in SENSITIVE_HOST_PATHS:
+            return True
+    return False
+
+
+@compose_rule("CMP006", "Do not share the host's network, PID or IPC namespace", "network_mode", "pid", "ipc", severity="error")
+def _host_namespace(value):
+    return str(value) == "host"
+
+
+@compose_rule("CMP007", "Do not disable seccomp or AppArmor confinement", "security_opt", severity="error")
+def _unconfined(value):
+    return any("unconfined" in str(opt) for opt in _entries(value))
+
+
+@compose_rule("CMP008", "Pin the image version; untagged and latest images change without notice", "image")
+def _unpinned_image(value):
+    image = str(value)
+    if image.startswith("$"):
+        return False
+    return image_tag(image)[1] in (None, "latest")
+
+
+def analyze_service(service: ComposeService, rules: Iterable[ComposeRule] = compose_rules) -> List[Issue]:
+    """
+    Check one service's runtime settings and its build.
+
+    An inline Dockerfile (``build.dockerfile_inline``) is checked with the
+    Dockerfile rules, with lines mapped into the compose file. A Dockerfile
+    referenced by path is not part of the input, so it is reported instead.
+
+    Returns:
+        List[Issue]: Violations ordered by line.
+    """
+    issues = []
+    for rule in rules:
+        for key in rule.keys:
+            if key in service.config and rule.check(service.config[key]):
+                issues.append(Issue(rule.id, rule.message, service.line_of(key), rule.severity))
+    build = service.build
+    if build is not None:
+        inline = build.get("dockerfile_inline")
+        if isinstance(inline, str):
+            offset = service.inline_offset
+            issues.extend(Issue(i.rule, i.message, offset + i.line, i.severity) for i in analyze_dockerfile(inline))
+        else:
+            dockerfile = build.get("dockerfile", "Dockerfile")
+            issues.append(Issue(
+                "CMP010", f"Build Dockerfile {dockerfile!s} is not part of the input; submit it to analyze it",
+                service.line_of("build"), "info",
+            ))
+    issues.sort(key=lambda issue: issue.line)
+    return issues
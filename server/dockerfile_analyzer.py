@@ -0,0 +1,421 @@
+import re
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Instructions whose arguments may carry heredocs (BuildKit syntax)
+HEREDOC_INSTRUCTIONS = frozenset(("RUN", "COPY", "ADD"))
+_HEREDOC = re.compile(r"<<(-?)([\"']?)([A-Za-z_][A-Za-z0-9_]*)\2")
+_DIRECTIVE = re.compile(r"#\s*([a-zA-Z]+)\s*=\s*(\S+)\s*$")
+_SPLIT = re.compile(r"(\S+)\s*(.*)", re.S)
+
+
+class Instruction:
+    """
+    One parsed Dockerfile instruction.
+
+    Attributes:
+        cmd (str): Upper-cased instruction keyword, e.g. ``RUN``.
+        args (str): Arguments with line continuations joined.
+        line (int): 1-based line where the instruction starts.
+        end_line (int): Last line of the instruction, including heredoc bodies.
+        stage (int): Index of the build stage, ``-1`` before the first ``FROM``.
+        heredocs (List[str]): Heredoc bodies attached to the instruction.
+    """
+    __slots__ = ("cmd", "args", "line", "end_line", "stage", "heredocs")
+
+    def __init__(self, cmd: str, args: str, line: int, end_line: int, stage: int, heredocs: Optional[List[str]] = None):
+        self.cmd = cmd
+        self.args = args
+        self.line = line
+        self.end_line = end_line
+        self.stage = stage
+        self.heredocs = heredocs or []
+
+    def __repr__(self) -> str:
+        return f"Instruction({self.cmd} {self.args!r}, line={self.line})"
+
+
+class Stage:
+    """
+    A build stage started by ``FROM``.
+
+    Attributes:
+        index (int): Position of the stage in the file.
+        image (str): Base image reference.
+        name (Optional[str]): Alias from ``FROM ... AS name``.
+        line (int): Line of the ``FROM`` instruction.
+    """
+    __slots__ = ("index", "image", "name", "line")
+
+    def __init__(self, index: int, image: str, name: Optional[str], line: int):
+        self.index = index
+        self.image = image
+        self.name = name
+        self.line = line
+
+
+class ParsedDockerfile:
+    def __init__(self, instructions: List[Instruction], stages: List[Stage], escape: str):
+        self.instructions = instructions
+        self.stages = stages
+        self.escape = escape
+
+
+def _parse_from(args: str) -> Tuple[str, Optional[str]]:
+    tokens = [t for t in args.split() if not t.startswith("--")]
+    image = tokens[0] if tokens else ""
+    name = tokens[2] if len(tokens) >= 3 and tokens[1].lower() == "as" else None
+    return image, name
+
+
+def parse_dockerfile(text: str) -> ParsedDockerfile:
+    """
+    Parse a Dockerfile into instructions in a single pass over its lines.
+
+    Handles parser directives (``# escape=``), line continuations, comments
+    inside continuations, BuildKit heredocs (``<<EOF`` / ``<<-EOF``) and
+    multi-stage builds.
+
+    Args:
+        text (str): The Dockerfile content.
+
+    Returns:
+        ParsedDockerfile: Instructions in file order plus the build stages.
+    """
+    lines = text.splitlines()
+    escape = "\\"
+    instructions: List[Instruction] = []
+    stages: List[Stage] = []
+    parts: List[str] = []
+    start = 0
+    directives_allowed = True
+    i = 0
+    while i < len(lines):
+        raw = lines[i]
+        stripped = raw.strip()
+        i += 1
+        if not parts:
+            if not stripped:
+                directives_allowed = False
+                continue
+            if stripped.startswith("#"):
+                match = _DIRECTIVE.match(stripped) if directives_allowed else None
+                if match and match.group(1).lower() == "escape" and match.group(2) in ("\\", "`"):
+                    escape = match.group(2)
+                elif not match:
+                    directives_allowed = False
+                continue
+            directives_allowed = False
+            start = i
+        elif not stripped or stripped.startswith("#"):
+            # Blank and comment lines inside a continuation are dropped
+            continue
+        body = raw.rstrip()
+        if body.endswith(escape):
+            parts.append(body[:-1].strip())
+            continue
+        parts.append(body.strip())
+        logical = " ".join(p for p in parts if p)
+        parts = []
+        match = _SPLIT.match(logical)
+        if match is None:
+            continue
+        cmd, args = match.group(1).upper(), match.group(2)
+        heredocs = []
+        if cmd in HEREDOC_INSTRUCTIONS and "<<" in args:
+            for strip_tabs, _, terminator in _HEREDOC.findall(args):
+                body_lines = []
+                while i < len(lines):
+                    line = lines[i]
+                    i += 1
+                    if (line.lstrip("\t") if strip_tabs else line) == terminator:
+                        break
+                    body_lines.append(line.lstrip("\t") if strip_tabs else line)
+                heredocs.append("\n".join(body_lines))
+        if cmd == "FROM":
+            image, name = _parse_from(args)
+            stages.append(Stage(len(stages), image, name, start))
+        instructions.append(Instruction(cmd, args, start, i, len(stages) - 1, heredocs))
+    return ParsedDockerfile(instructions, stages, escape)
+
+
+class Issue:
+    """
+    A rule violation.
+
+    Attributes:
+        rule (str): Rule id, hadolint-compatible where one exists.
+        message (str): Human-readable description.
+        line (int): Line of the offending instruction.
+        severity (str): ``error``, ``warning`` or ``info``.
+    """
+    __slots__ = ("rule", "message", "line", "severity")
+
+    def __init__(self, rule: str, message: str, line: int, severity: str):
+        self.rule = rule
+        self.message = message
+        self.line = line
+        self.severity = severity
+
+    def __str__(self) -> str:
+        return f"{self.rule}: {self.message} (line {self.line})"
+
+    def to_dict(self) -> Dict[str, object]:
+        return {"rule": self.rule, "message": self.message, "line": self.line, "severity": self.severity}
+
+
+class StageState:
+    """Per-stage facts tracked while analyzing: the current USER and SHELL."""
+    __slots__ = ("stage", "user", "user_line", "pipefail")
+
+    def __init__(self, stage: Stage):
+        self.stage = stage
+        self.user: Optional[str] = None
+        self.user_line = stage.line
+        self.pipefail = False
+
+
+class AnalysisContext:
+    """
+    State visible to rules during one analysis.
+
+    Attributes:
+        parsed (ParsedDockerfile): The file being analyzed.
+        stage (Optional[StageState]): The stage the current instruction belongs to.
+        aliases (set): Stage names defined so far, for ``COPY --from`` checks.
+        stages (List[StageState]): All stages seen so far.
+    """
+    def __init__(self, parsed: ParsedDockerfile):
+        self.parsed = parsed
+        self.stage: Optional[StageState] = None
+        self.aliases = set()
+        self.stages: List[StageState] = []
+
+
+class Rule:
+    """
+    A Dockerfile check that inspects only the instruction types it declares.
+
+    Args:
+        id (str): Rule id.
+        message (str): Message reported for violations.
+        instructions (Tuple[str, ...]): Instruction keywords the rule inspects.
+        check (Callable[[Instruction, AnalysisContext], bool]): Returns True on a violation.
+        severity (str): Severity of reported issues.
+    """
+    __slots__ = ("id", "message", "instructions", "check", "severity")
+
+    def __init__(self, id: str, message: str, instructions: Tuple[str, ...],
+                 check: Callable[[Instruction, AnalysisContext], bool], severity: str = "warning"):
+        self.id = id
+        self.message = message
+        self.instructions = instructions
+        self.check = check
+        self.severity = severity
+
+
+class FinalCheck:
+    """A whole-file check run once after every instruction has been seen."""
+    __slots__ = ("id", "message", "check", "severity")
+
+    def __init__(self, id: str, message: str, check: Callable[[AnalysisContext], Optional[int]], severity: str = "warning"):
+        self.id = id
+        self.message = message
+        self.check = check
+        self.severity = severity
+
+
+class RuleEngine:
+    """
+    Runs rules over a parsed Dockerfile.
+
+    Rules are indexed by the instruction types they declare, so each
+    instruction is only handed to the rules that inspect it. The engine keeps
+    the per-stage context (stage aliases, USER, SHELL) that rules read.
+    """
+    def __init__(self, rules: Iterable[Rule] = (), final_checks: Iterable[FinalCheck] = ()):
+        self.rules: List[Rule] = []
+        self.final_checks: List[FinalCheck] = list(final_checks)
+        self._index: Dict[str, List[Rule]] = {}
+        for rule in rules:
+            self.add(rule)
+
+    def add(self, rule: Rule):
+        self.rules.append(rule)
+        for cmd in rule.instructions:
+            self._index.setdefault(cmd, []).append(rule)
+
+    def rule(self, id: str, message: str, *instructions: str, severity: str = "warning"):
+        """Decorator registering ``check(instruction, context) -> bool`` as a rule."""
+        def decorator(check: Callable[[Instruction, AnalysisContext], bool]):
+            self.add(Rule(id, message, tuple(i.upper() for i in instructions), check, severity))
+            return check
+        return decorator
+
+    def final_check(self, id: str, message: str, severity: str = "warning"):
+        """Decorator registering ``check(context) -> Optional[line]`` as a whole-file check."""
+        def decorator(check: Callable[[AnalysisContext], Optional[int]]):
+            self.final_checks.append(FinalCheck(id, message, check, severity))
+            return check
+        return decorator
+
+    def _track(self, ins: Instruction, ctx: AnalysisContext):
+        if ins.cmd == "FROM":
+            ctx.stage = StageState(ctx.parsed.stages[ins.stage])
+            ctx.stages.append(ctx.stage)
+        elif ctx.stage is None:
+            return
+        elif ins.cmd == "USER":
+            ctx.stage.user = ins.args.split(":")[0].strip()
+            ctx.stage.user_line = ins.line
+        elif ins.cmd == "SHELL":
+            ctx.stage.pipefail = "pipefail" in ins.args
+
+    def analyze(self, parsed: ParsedDockerfile) -> List[Issue]:
+        ctx = AnalysisContext(parsed)
+        issues: List[Issue] = []
+        index = self._index
+        for ins in parsed.instructions:
+            for rule in index.get(ins.cmd, ()):
+                if rule.check(ins, ctx):
+                    issues.append(Issue(rule.id, rule.message, ins.line, rule.severity))
+            self._track(ins, ctx)
+            if ins.cmd == "FROM" and parsed.stages[ins.stage].name:
+                ctx.aliases.add(parsed.stages[ins.stage].name.lower())
+        for check in self.final_checks:
+            line = check.check(ctx)
+            if line is not None:
+                issues.append(Issue(check.id, check.message, line, check.severity))
+        return issues
+
+
+engine = RuleEngine()
+_SECRET_NAME = re.compile(r"(PASSWORD|PASSWD|SECRET|TOKEN|API_?KEY|PRIVATE_?KEY)", re.I)
+
+
+def image_tag(image: str) -> Tuple[str, Optional[str]]:
+    """Split an image reference into ``(name, tag)``; the tag is ``"@digest"`` for pinned digests and None when absent."""
+    if "@" in image:
+        return image, "@digest"
+    name, _, tag = image.rpartition(":")
+    if not name or "/" in tag:
+        return image, None
+    return name, tag
+
+
+def _run_text(ins: Instruction) -> str:
+    return "\n".join([ins.args] + ins.heredocs)
+
+
+@engine.rule("DL3006", "Always tag the version of an image explicitly", "FROM")
+def _untagged_image(ins, ctx):
+    image = ctx.parsed.stages[ins.stage].image
+    if image.lower() == "scratch" or image.startswith("$") or image.lower() in ctx.aliases:
+        return False
+    return image_tag(image)[1] is None
+
+
+@engine.rule("DL3007", "Using latest is prone to errors; pin the version explicitly", "FROM")
+def _latest_image(ins, ctx):
+    return image_tag(ctx.parsed.stages[ins.stage].image)[1] == "latest"
+
+
+@engine.rule("DL3020", "Use COPY instead of ADD for files and folders", "ADD")
+def _add_instead_of_copy(ins, ctx):
+    sources = [t for t in ins.args.split() if not t.startswith("--")][:-1]
+    return any(not re.match(r"https?://", s) and not s.endswith((".tar", ".tar.gz", ".tgz", ".tar.xz", ".tar.bz2")) for s in sources)
+
+
+@engine.rule("DL3004", "Do not use sudo; it has unpredictable TTY and signal behavior", "RUN")
+def _sudo(ins, ctx):
+    return re.search(r"(^|[;&|]\s*|\s)sudo\s", _run_text(ins)) is not None
+
+
+@engine.rule("DL3003", "Use WORKDIR to switch to a directory", "RUN")
+def _cd(ins, ctx):
+    return re.search(r"(^|&&|;)\s*cd\s", ins.args) is not None
+
+
+@engine.rule("DL3009", "Delete the apt-get lists after installing something", "RUN")
+def _apt_lists(ins, ctx):
+    text = _run_text(ins)
+    return "apt-get install" in text and "rm -rf /var/lib/apt/lists" not in text
+
+
+@engine.rule("DL3015", "Avoid additional packages by specifying --no-install-recommends", "RUN")
+def _apt_recommends(ins, ctx):
+    text = _run_text(ins)
+    return "apt-get install" in text and "--no-install-recommends" not in text
+
+
+@engine.rule("DL4006", "Set the SHELL -o pipefail option before RUN with a pipe in it", "RUN")
+def _pipefail(ins, ctx):
+    if ctx.stage is None or ctx.stage.pipefail or ins.args.startswith("["):
+        return False
+    return re.search(r"[^|]\|[^|]", ins.args) is not None
+
+
+@engine.rule("DL3000", "Use absolute WORKDIR", "WORKDIR")
+def _relative_workdir(ins, ctx):
+    path = ins.args.strip().strip("\"'")
+    return not (path.startswith("/") or path.startswith("$") or re.match(r"[A-Za-z]:[\\/]", path))
+
+
+@engine.rule("DL3025", "Use arguments JSON notation for CMD and ENTRYPOINT arguments", "CMD", "ENTRYPOINT")
+def _shell_form(ins, ctx):
+    return not ins.args.lstrip().startswith("[")
+
+
+@engine.rule("DL3022", "COPY --from should reference a previously defined FROM alias", "COPY")
+def _copy_from_unknown_stage(ins, ctx):
+    match = re.search(r"--from=(\S+)", ins.args)
+    if match is None:
+        return False
+    source = match.group(1).lower()
+    # Numeric indexes and external images are valid sources too
+    return not (source.isdigit() or source in ctx.aliases or ":" in source or "/" in source)
+
+
+@engine.rule("DL4000", "MAINTAINER is deprecated; use a LABEL instead", "MAINTAINER")
+def _maintainer(ins, ctx):
+    return True
+
+
+@engine.rule("SEC001", "Do not store secrets in ENV or ARG; they persist in the image", "ENV", "ARG", severity="error")
+def _secret_in_env(ins, ctx):
+    if "=" in ins.args:
+        names = re.findall(r"(?:^|\s)([A-Za-z_][A-Za-z0-9_]*)=", ins.args)
+    else:
+        names = ins.args.split()[:1]
+    return any(_SECRET_NAME.search(name) for name in names)
+
+
+@engine.final_check("DL3002", "Last USER should not be root")
+def _root_user(ctx):
+    if ctx.stages and ctx.stages[-1].user in ("root", "0"):
+        return ctx.stages[-1].user_line
+    return None
+
+
+@engine.final_check("SEC002", "No USER set in the final stage; the container runs as root")
+def _missing_user(ctx):
+    if ctx.stages and ctx.stages[-1].user is None:
+        return ctx.stages[-1].stage.line
+    return None
+
+
+def analyze_dockerfile(text: str, rule_engine: RuleEngine = engine) -> List[Issue]:
+    """
+    Parse and check a Dockerfile in process.
+
+    Args:
+        text (str): The Dockerfile content.
+        rule_engine (RuleEngine): Rules to apply; defaults to the built-in set.
+
+    Returns:
+        List[Issue]: Violations in file order, then whole-file findings.
+        Text without a ``FROM`` instruction (e.g. compose YAML) yields none.
+    """
+    parsed = parse_dockerfile(text)
+    if not parsed.stages:
+        return []
+    return rule_engine.analyze(parsed)
@@ -0,0 +1,302 @@
+import re
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from server.dockerfile_analyzer import parse_dockerfile
+
+# Give up on a minimal script past this many edits and report the region as one change
+MAX_EDIT_COST = 256
+_FROM_LINE = re.compile(r"^\s*FROM\s", re.I | re.M)
+
+# (tag, old_start, old_end, new_start, new_end) over units or lines; tag is "equal" or "change"
+Opcode = Tuple[str, int, int, int, int]
+
+
+def split_units(lines: List[str], by_instruction: bool) -> List[Tuple[int, int]]:
+    """
+    Split lines into diff units as ``(start, end)`` line offsets.
+
+    With ``by_instruction`` each Dockerfile instruction, including its
+    continuation lines and heredoc bodies, is one unit and every other line
+    (comments, blanks) is its own unit. Otherwise every line is a unit.
+    """
+    if not by_instruction:
+        return [(i, i + 1) for i in range(len(lines))]
+    spans = {ins.line - 1: ins.end_line for ins in parse_dockerfile("\n".join(lines)).instructions}
+    units, i = [], 0
+    while i < len(lines):
+        end = max(spans.get(i, i + 1), i + 1)
+        units.append((i, end))
+        i = end
+    return units
+
+
+def _match_unique(a: Sequence[int], a0: int, a1: int, b: Sequence[int], b0: int, b1: int) -> List[Tuple[int, int]]:
+    """Patience anchors: units unique on both sides, kept in increasing order on both (LIS)."""
+    counts: Dict[int, List[int]] = {}
+    for i in range(a0, a1):
+        entry = counts.get(a[i])
+        if entry is None:
+            counts[a[i]] = [1, i, -1]
+        else:
+            entry[0] += 1
+    for j in range(b0, b1):
+        entry = counts.get(b[j])
+        if entry is not None and entry[0] == 1:
+            # Mark seen once in b, or disqualify when seen again
+            entry[2] = j if entry[2] == -1 else -2
+    pairs = sorted((entry[1], entry[2]) for entry in counts.values() if entry[0] == 1 and entry[2] >= 0)
+    if not pairs:
+        return []
+    tails: List[int] = []
+    tail_index: List[int] = []
+    prev = [-1] * len(pairs)
+    for n, (_, j) in enumerate(pairs):
+        pos = bisect_left(tails, j)
+        if pos == len(tails):
+            tails.append(j)
+            tail_index.append(n)
+        else:
+            tails[pos] = j
+            tail_index[pos] = n
+        prev[n] = tail_index[pos - 1] if pos else -1
+    anchors = []
+    n = tail_index[-1]
+    while n != -1:
+        anchors.append(pairs[n])
+        n = prev[n]
+    anchors.reverse()
+    return anchors
+
+
+def _bisect(a: Sequence[int], a0: int, a1: int, b: Sequence[int], b0: int, b1: int) -> Tuple[int, int]:
+    """
+    Find the middle snake of Myers' algorithm in linear space.
+
+    Returns:
+        Tuple[int, int]: A split point ``(x, y)`` such that diffing both halves
+        separately yields a shortest edit script, or ``(-1, -1)`` when the two
+        ranges have nothing in common or the edit cost exceeds ``MAX_EDIT_COST``.
+    """
+    n, m = a1 - a0, b1 - b0
+    max_d = (n + m + 1) // 2
+    offset = max_d
+    size = 2 * max_d + 2
+    v1 = [-1] * size
+    v2 = [-1] * size
+    v1[offset + 1] = 0
+    v2[offset + 1] = 0
+    delta = n - m
+    front = delta % 2 != 0
+    k1start = k1end = k2start = k2end = 0
+    for d in range(min(max_d, MAX_EDIT_COST)):
+        for k1 in range(-d + k1start, d + 1 - k1end, 2):
+            k1_offset = offset + k1
+            if k1 == -d or (k1 != d and v1[k1_offset - 1] < v1[k1_offset + 1]):
+                x1 = v1[k1_offset + 1]
+            else:
+                x1 = v1[k1_offset - 1] + 1
+            y1 = x1 - k1
+            while x1 < n and y1 < m and a[a0 + x1] == b[b0 + y1]:
+                x1 += 1
+                y1 += 1
+            v1[k1_offset] = x1
+            if x1 > n:
+                k1end += 2
+            elif y1 > m:
+                k1start += 2
+            elif front:
+                k2_offset = offset + delta - k1
+                if 0 <= k2_offset < size and v2[k2_offset] != -1 and x1 >= n - v2[k2_offset]:
+                    return x1, y1
+        for k2 in range(-d + k2start, d + 1 - k2end, 2):
+            k2_offset = offset + k2
+            if k2 == -d or (k2 != d and v2[k2_offset - 1] < v2[k2_offset + 1]):
+                x2 = v2[k2_offset + 1]
+            else:
+                x2 = v2[k2_offset - 1] + 1
+            y2 = x2 - k2
+            while x2 < n and y2 < m and a[a1 - 1 - x2] == b[b1 - 1 - y2]:
+                x2 += 1
+                y2 += 1
+            v2[k2_offset] = x2
+            if x2 > n:
+                k2end += 2
+            elif y2 > m:
+                k2start += 2
+            elif not front:
+                k1_offset = offset + delta - k2
+                if 0 <= k1_offset < size and v1[k1_offset] != -1:
+                    x1 = v1[k1_offset]
+                    y1 = offset + x1 - k1_offset
+                    if x1 >= n - x2:
+                        return x1, y1
+    return -1, -1
+
+
+def _diff(a: Sequence[int], a0: int, a1: int, b: Sequence[int], b0: int, b1: int, patience: bool = True) -> Iterator[Opcode]:
+    """Yield opcodes for ``a[a0:a1]`` against ``b[b0:b1]`` in order."""
+    start_a, start_b = a0, b0
+    while a0 < a1 and b0 < b1 and a[a0] == b[b0]:
+        a0 += 1
+        b0 += 1
+    if a0 > start_a:
+        yield ("equal", start_a, a0, start_b, b0)
+    end_a, end_b = a1, b1
+    while a1 > a0 and b1 > b0 and a[a1 - 1] == b[b1 - 1]:
+        a1 -= 1
+        b1 -= 1
+    if a0 == a1 or b0 == b1:
+        if a0 < a1 or b0 < b1:
+            yield ("change", a0, a1, b0, b1)
+    else:
+        anchors = _match_unique(a, a0, a1, b, b0, b1) if patience else []
+        if anchors:
+            i, j = a0, b0
+            for ai, bj in anchors:
+                if ai > i or bj > j:
+                    yield from _diff(a, i, ai, b, j, bj)
+                yield ("equal", ai, ai + 1, bj, bj + 1)
+                i, j = ai + 1, bj + 1
+            if a1 > i or b1 > j:
+                yield from _diff(a, i, a1, b, j, b1)
+        else:
+            x, y = _bisect(a, a0, a1, b, b0, b1)
+            if x < 0:
+                yield ("change", a0, a1, b0, b1)
+            else:
+                yield from _diff(a, a0, a0 + x, b, b0, b0 + y, patience=False)
+                yield from _diff(a, a0 + x, a1, b, b0 + y, b1, patience=False)
+    if a1 < end_a:
+        yield ("equal", a1, end_a, b1, end_b)
+
+
+def _merged(opcodes: Iterator[Opcode]) -> Iterator[Opcode]:
+    """Coalesce adjacent opcodes with the same tag."""
+    pending = None
+    for op in opcodes:
+        if op[1] == op[2] and op[3] == op[4]:
+            continue
+        if pending is not None and pending[0] == op[0]:
+            pending = (op[0], pending[1], op[2], pending[3], op[4])
+            continue
+        if pending is not None:
+            yield pending
+        pending = op
+    if pending is not None:
+        yield pending
+
+
+def iter_opcodes(old_lines: List[str], new_lines: List[str], by_instruction: bool = True) -> Iterator[Opcode]:
+    """
+    Diff two texts given as lines and yield line-level opcodes.
+
+    Units (instructions, or lines) are compared with patience diff, falling
+    back to linear-space Myers where no unique anchors exist. Memory stays
+    linear in the input size.
+    """
+    old_units = split_units(old_lines, by_instruction)
+    new_units = split_units(new_lines, by_instruction)
+    ids: Dict[str, int] = {}
+    if by_instruction:
+        a = [ids.setdefault("\n".join(old_lines[s:e]), len(ids)) for s, e in old_units]
+        b = [ids.setdefault("\n".join(new_lines[s:e]), len(ids)) for s, e in new_units]
+    else:
+        a = [ids.setdefault(line, len(ids)) for line in old_lines]
+        b = [ids.setdefault(line, len(ids)) for line in new_lines]
+    ids.clear()
+    for tag, i1, i2, j1, j2 in _merged(_diff(a, 0, len(a), b, 0, len(b))):
+        yield (
+            tag,
+            old_units[i1][0] if i1 < len(old_units) else len(old_lines),
+            old_units[i2 - 1][1] if i2 > i1 else (old_units[i1][0] if i1 < len(old_units) else len(old_lines)),
+            new_units[j1][0] if j1 < len(new_units) else len(new_lines),
+            new_units[j2 - 1][1] if j2 > j1 else (new_units[j1][0] if j1 < len(new_units) else len(new_lines)),
+        )
+
+
+def _hunk(old_lines: List[str], new_lines: List[str], ops: List[Opcode]) -> Dict[str, Any]:
+    lines = []
+    for tag, i1, i2, j1, j2 in ops:
+        if tag == "equal":
+            lines.extend(" " + line for line in old_lines[i1:i2])
+        else:
+            lines.extend("-" + line for line in old_lines[i1:i2])
+            lines.extend("+" + line for line in new_lines[j1:j2])
+    old_start, new_start = ops[0][1], ops[0][3]
+    old_count, new_count = ops[-1][2] - old_start, ops[-1][4] - new_start
+    return {
+        # 1-based like unified diff; an empty range starts at the line before it
+        "old_start": old_start + 1 if old_count else old_start,
+        "old_lines": old_count,
+        "new_start": new_start + 1 if new_count else new_start,
+        "new_lines": new_count,
+        "lines": lines,
+    }
+
+
+def iter_hunks(old_text: str, new_text: str, context: int = 3) -> Iterator[Dict[str, Any]]:
+    """
+    Yield unified-diff style hunks from ``old_text`` to ``new_text`` as soon as each is complete.
+
+    Dockerfiles are diffed by instruction, so a changed instruction is
+    replaced as a whole; other text (compose YAML) is diffed by line.
+
+    Args:
+        old_text (str): The original text.
+        new_text (str): The changed text.
+        context (int): Unchanged lines kept around each change.
+
+    Yields:
+        dict: ``old_start``/``old_lines``/``new_start``/``new_lines`` (1-based
+        line ranges) and ``lines`` prefixed with ``" "``, ``"-"`` or ``"+"``.
+    """
+    old_lines = old_text.splitlines()
+    new_lines = new_text.splitlines()
+    by_instruction = _FROM_LINE.search(old_text) is not None
+    ops: List[Opcode] = []
+    for op in iter_opcodes(old_lines, new_lines, by_instruction):
+        tag, i1, i2, j1, j2 = op
+        if tag == "change":
+            ops.append(op)
+            continue
+        if not ops:
+            # Leading context for the next change
+            keep = min(context, i2 - i1)
+            ops.append(("equal", i2 - keep, i2, j2 - keep, j2))
+            continue
+        if ops[-1][0] == "equal":
+            ops[-1] = ("equal", max(i1, i2 - context), i2, max(j1, j2 - context), j2)
+            continue
+        if i2 - i1 <= 2 * context:
+            ops.append(op)
+            continue
+        ops.append(("equal", i1, i1 + context, j1, j1 + context))
+        yield _hunk(old_lines, new_lines, ops)
+        ops = [("equal", i2 - context, i2, j2 - context, j2)]
+    if any(op[0] == "change" for op in ops):
+        tag, i1, i2, j1, j2 = ops[-1]
+        if tag == "equal":
+            ops[-1] = ("equal", i1, min(i2, i1 + context), j1, min(j2, j1 + context))
+        yield _hunk(old_lines, new_lines, ops)
+
+
+def diff_json(old_text: str, new_text: str, context: int = 3,
+              on_hunk: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+    """
+    Build the ``DockerFixResult.diff_json`` document.
+
+    Args:
+        on_hunk (Optional[Callable]): Called with each hunk as soon as it is produced.
+
+    Returns:
+        dict: ``hunks`` from ``iter_hunks`` plus ``added``/``removed`` line counts.
+    """
+    hunks = []
+    for hunk in iter_hunks(old_text, new_text, context):
+        if on_hunk is not None:
+            on_hunk(hunk)
+        hunks.append(hunk)
+    added = sum(1 for h in hunks for line in h["lines"] if line.startswith("+"))
+    removed = sum(1 for h in hunks for line in h["lines"] if line.startswith("-"))
+    return {"format": "hunks", "hunks": hunks, "added": added, "removed": removed}
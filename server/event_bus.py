@@ -0,0 +1,89 @@
+import asyncio
+import os
+from typing import Any, Dict, Optional, Set
+
+import logfire
+
+
+class Subscription:
+    """
+    A single subscriber's bounded event queue for one task.
+
+    Attributes:
+        task_id (str): The task the subscriber follows.
+        queue (asyncio.Queue): Pending events, bounded by the bus queue size.
+        dropped (bool): True once the bus gave up on this subscriber for falling behind.
+    """
+    def __init__(self, task_id: str, maxsize: int):
+        self.task_id = task_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = False
+
+
+class EventBus:
+    """
+    In-process async pub/sub bus fanning out task events to SSE subscribers.
+
+    ``publish`` never blocks: a subscriber whose queue is full is dropped and
+    told so, and is expected to reconnect with ``Last-Event-ID`` to replay what
+    it missed from the task history.
+
+    Args:
+        queue_size (int): Maximum number of undelivered events per subscriber.
+    """
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.published = 0
+        self.dropped_subscribers = 0
+
+    def subscribe(self, task_id: str) -> Subscription:
+        self._loop = asyncio.get_running_loop()
+        sub = Subscription(task_id, self.queue_size)
+        self._subscribers.setdefault(task_id, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        subs = self._subscribers.get(sub.task_id)
+        if subs is None:
+            return
+        subs.discard(sub)
+        if not subs:
+            del self._subscribers[sub.task_id]
+
+    def publish(self, task_id: str, event: Dict[str, Any]):
+        """Deliver ``event`` to every subscriber of ``task_id``; safe to call from worker threads."""
+        if task_id not in self._subscribers:
+            return
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            if self._loop is not None:
+                self._loop.call_soon_threadsafe(self._publish, task_id, event)
+            return
+        self._publish(task_id, event)
+
+    def _publish(self, task_id: str, event: Dict[str, Any]):
+        self.published += 1
+        for sub in list(self._subscribers.get(task_id, ())):
+            try:
+                sub.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                sub.dropped = True
+                self.unsubscribe(sub)
+                self.dropped_subscribers += 1
+                logfire.error("sse_subscriber_dropped", task_id=task_id)
+
+    def subscriber_count(self) -> int:
+        return sum(len(subs) for subs in self._subscribers.values())
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "subscribers": self.subscriber_count(),
+            "published": self.published,
+            "dropped_subscribers": self.dropped_subscribers,
+        }
+
+
+event_bus = EventBus(queue_size=int(os.getenv("A2A_SSE_QUEUE_SIZE", "100")))
@@ -1,71 +1,256 @@
+import asyncio
 import inspect
 import json
+import os
+import time
+import typing
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+import logfire
+
+from server import metrics
+
+# Maximum number of calls from one batch executed at the same time
+BATCH_CONCURRENCY = int(os.getenv("A2A_JSONRPC_BATCH_CONCURRENCY", "16"))
+# Maximum number of calls accepted in one batch
+MAX_BATCH_SIZE = int(os.getenv("A2A_JSONRPC_MAX_BATCH", "100"))
+
+# JSON type names used in -32602 messages
+_JSON_TYPE_NAMES = {str: "string", int: "integer", float: "number", bool: "boolean", dict: "object", list: "array"}
+
+
+class InvalidParams(Exception):
+    """Raised when call parameters do not match a method's schema (JSON-RPC -32602)."""
+
+
+class ParamSpec:
+    """
+    Compiled schema for one method parameter.
+
+    Attributes:
+        name (str): Parameter name.
+        types (Optional[Tuple[type, ...]]): Accepted JSON types, or None for any.
+        nullable (bool): Whether ``null`` is accepted.
+        required (bool): Whether the parameter has no default.
+    """
+    __slots__ = ("name", "types", "nullable", "required")
+
+    def __init__(self, parameter: inspect.Parameter, annotation: Any):
+        self.name = parameter.name
+        self.required = parameter.default is inspect.Parameter.empty
+        self.nullable = parameter.default is None
+        self.types = None
+        if typing.get_origin(annotation) is Union:
+            args = typing.get_args(annotation)
+            self.nullable = self.nullable or type(None) in args
+            args = tuple(a for a in args if a is not type(None))
+            annotation = args[0] if len(args) == 1 else Any
+        annotation = typing.get_origin(annotation) or annotation
+        if annotation in _JSON_TYPE_NAMES:
+            # JSON numbers without a fraction arrive as int
+            self.types = (int, float) if annotation is float else (annotation,)
+
+    def check(self, value: Any):
+        if value is None:
+            if not self.nullable:
+                raise InvalidParams(f"Invalid params: '{self.name}' must not be null")
+            return
+        if self.types is None:
+            return
+        # bool is a subclass of int but never a valid JSON integer
+        if not isinstance(value, self.types) or (isinstance(value, bool) and bool not in self.types):
+            raise InvalidParams(f"Invalid params: '{self.name}' must be {_JSON_TYPE_NAMES[self.types[0]]}")
+
+
+class MethodSpec:
+    """
+    A registered JSON-RPC method with its parameter schema compiled from the
+    function signature.
+
+    Args:
+        name (str): JSON-RPC method name.
+        func (Callable): Sync or async handler returning a result dict.
+    """
+    def __init__(self, name: str, func: Callable):
+        self.name = name
+        self.func = func
+        self.is_async = inspect.iscoroutinefunction(func)
+        hints = typing.get_type_hints(func)
+        signature = inspect.signature(func)
+        self.params: List[ParamSpec] = []
+        # Handlers taking *args/**kwargs get their params passed through unchecked
+        self.passthrough = False
+        for parameter in signature.parameters.values():
+            if parameter.kind in (inspect.Parameter.VAR_POSITIONAL, inspect.Parameter.VAR_KEYWORD):
+                self.passthrough = True
+                continue
+            self.params.append(ParamSpec(parameter, hints.get(parameter.name, Any)))
+        self._by_name = {p.name: p for p in self.params}
+
+    def bind(self, params: Any) -> Tuple[list, dict]:
+        """
+        Validate ``params`` and return the ``(args, kwargs)`` to call the handler with.
+
+        Raises:
+            InvalidParams: If the params do not match the schema.
+        """
+        if params is None:
+            params = {}
+        if self.passthrough:
+            if isinstance(params, list):
+                return params, {}
+            if isinstance(params, dict):
+                return [], params
+            raise InvalidParams("Invalid params: expected an object or array")
+        if isinstance(params, list):
+            if len(params) > len(self.params):
+                raise InvalidParams(f"Invalid params: expected at most {len(self.params)} positional params")
+            params = dict(zip((p.name for p in self.params), params))
+        elif not isinstance(params, dict):
+            raise InvalidParams("Invalid params: expected an object or array")
+        for name in params:
+            if name not in self._by_name:
+                raise InvalidParams(f"Invalid params: unexpected param '{name}'")
+        for spec in self.params:
+            if spec.name in params:
+                spec.check(params[spec.name])
+            elif spec.required:
+                raise InvalidParams(f"Invalid params: missing required param '{spec.name}'")
+        return [], params
+
+    async def call(self, params: Any) -> Any:
+        args, kwargs = self.bind(params)
+        if self.is_async:
+            return await self.func(*args, **kwargs)
+        return self.func(*args, **kwargs)
+
+
+class MethodRegistry:
+    """
+    JSON-RPC method table. Handlers are registered once, at import time, with
+    the ``register`` decorator, which compiles their parameter schema.
+    """
+    def __init__(self):
+        self._methods: Dict[str, MethodSpec] = {}
+
+    def register(self, name: Optional[str] = None):
+        def decorator(func: Callable) -> Callable:
+            method_name = name or func.__name__
+            self._methods[method_name] = MethodSpec(method_name, func)
+            return func
+        return decorator
+
+    def get(self, name: Any) -> Optional[MethodSpec]:
+        return self._methods.get(name) if isinstance(name, str) else None
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._methods
+
+    def names(self) -> List[str]:
+        return list(self._methods)
+
+
+methods = MethodRegistry()
+jsonrpc_method = methods.register
 
 
 def get_jsonrpc_method_map():
     """
     Return a mapping of supported JSON-RPC method names to their corresponding
-    functions. Methods are imported locally to avoid circular imports.
+    functions.
 
     Returns:
         dict: Mapping of method names to callables.
     """
-    # Import locally to avoid circular import
-    from server.agent import (
-        tasks_send, tasks_get, tasks_cancel, tasks_pushNotification_set,
-        tasks_pushNotification_get, tasks_resubscribe, chunked_upload_stub
-    )
-    return {
-        "tasks_send": tasks_send,
-        "tasks_get": tasks_get,
-        "tasks_cancel": tasks_cancel,
-        "tasks_pushNotification_set": tasks_pushNotification_set,
-        "tasks_pushNotification_get": tasks_pushNotification_get,
-        "tasks_resubscribe": tasks_resubscribe,
-        "chunked_upload_stub": chunked_upload_stub,
-    }
+    return {name: methods.get(name).func for name in methods.names()}
+
+
+def _error(req_id: Any, code: int, message: str) -> Dict[str, Any]:
+    return {"jsonrpc": "2.0", "id": req_id, "error": {"code": code, "message": message}}
+
+
+async def _dispatch_one(req: Any, registry: MethodRegistry) -> Optional[Dict[str, Any]]:
+    """
+    Run one JSON-RPC call.
+
+    Returns:
+        Optional[dict]: The response object, or None for a notification
+        (a request without an ``id``), which gets no response.
+    """
+    if not isinstance(req, dict):
+        return _error(None, -32600, "Invalid Request")
+    started = time.perf_counter()
+    is_notification = "id" not in req
+    req_id = req.get("id")
+    method = req.get("method")
+    if req.get("jsonrpc") != "2.0" or not isinstance(method, str):
+        # Not a valid Request object, so it cannot be a notification either
+        metrics.jsonrpc_requests.inc("unknown", "error")
+        return _error(req_id, -32600, "Invalid Request")
+    spec = registry.get(method)
+    try:
+        if spec is None:
+            response = _error(req_id, -32601, f"Method {method} not found")
+        else:
+            result = await spec.call(req.get("params"))
+            if isinstance(result, dict) and "error" in result:
+                response = {"jsonrpc": "2.0", "id": req_id, "error": result["error"]}
+            else:
+                response = {"jsonrpc": "2.0", "id": req_id, "result": result}
+    except InvalidParams as e:
+        logfire.error("jsonrpc_invalid_params", method=method, error=str(e))
+        response = _error(req_id, -32602, str(e))
+    except Exception as e:
+        response = _error(req_id, -32603, str(e))
+    # Unknown methods share one label so arbitrary names cannot grow the series
+    label = method if spec is not None else "unknown"
+    metrics.jsonrpc_duration.observe(time.perf_counter() - started, label)
+    metrics.jsonrpc_requests.inc(label, "error" if "error" in response else "ok")
+    return None if is_notification else response
+
+
+async def _dispatch_batch(batch: List[Any], registry: MethodRegistry) -> Union[List[Dict[str, Any]], Dict[str, Any], None]:
+    if not batch:
+        return _error(None, -32600, "Invalid Request: empty batch")
+    if len(batch) > MAX_BATCH_SIZE:
+        return _error(None, -32600, f"Invalid Request: batch exceeds {MAX_BATCH_SIZE} calls")
+    limit = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def run(req: Any) -> Optional[Dict[str, Any]]:
+        async with limit:
+            return await _dispatch_one(req, registry)
+
+    responses = await asyncio.gather(*(run(req) for req in batch))
+    logfire.info("jsonrpc_batch", calls=len(batch), responses=sum(r is not None for r in responses))
+    # A batch made only of notifications gets no response at all
+    return [r for r in responses if r is not None] or None
 
 
 async def jsonrpc_async_dispatch(raw_body: bytes):
     """
-    Dispatch a JSON-RPC request asynchronously to the appropriate agent method.
+    Dispatch a JSON-RPC request or batch asynchronously to the agent methods.
+
+    Params are validated against the schema each method registered with
+    ``jsonrpc_method`` before the handler runs; by-name (object) and
+    positional (array) params are both accepted, and mismatches return -32602.
+    Calls without ``"jsonrpc": "2.0"`` or a string ``method`` return -32600.
+
+    A batch (JSON array) runs its calls concurrently, at most
+    ``BATCH_CONCURRENCY`` at a time, and returns the responses in request
+    order. Notifications (requests without an ``id``) are executed but get
+    no response.
 
     Args:
         raw_body (bytes): The raw HTTP request body containing JSON-RPC data.
 
     Returns:
-        dict: A JSON-RPC 2.0 response object, either with 'result' or 'error'.
-
-    Handles both async and sync agent methods and provides robust error handling
-    for FastAPI/A2A integration.
+        dict | list | None: A JSON-RPC 2.0 response object, a list of them for
+        a batch, or None when there is nothing to send back.
     """
     try:
         req = json.loads(raw_body.decode("utf-8"))
-        method = req.get("method")
-        params = req.get("params", {})
-        req_id = req.get("id")
-        methods = get_jsonrpc_method_map()
-        if method not in methods:
-            return {
-                "jsonrpc": "2.0",
-                "id": req_id,
-                "error": {
-                    "code": -32601,
-                    "message": f"Method {method} not found"
-                }
-            }
-        func = methods[method]
-        # Support both async and sync functions
-        if inspect.iscoroutinefunction(func):
-            result = await func(**params)
-        else:
-            result = func(**params)
-        if "error" in result:
-            return {"jsonrpc": "2.0", "id": req_id, "error": result["error"]}
-        return {"jsonrpc": "2.0", "id": req_id, "result": result}
-    except Exception as e:
-        return {
-            "jsonrpc": "2.0",
-            "id": req.get("id") if 'req' in locals() else None,
-            "error": {"code": -32603, "message": str(e)}
-        }
+    except ValueError as e:
+        return _error(None, -32700, f"Parse error: {e}")
+    if isinstance(req, list):
+        return await _dispatch_batch(req, methods)
+    return await _dispatch_one(req, methods)
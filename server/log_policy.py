@@ -0,0 +1,212 @@
+import asyncio
+import os
+import random
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import logfire
+
+_LEVELS = {"debug": 10, "info": 20, "warn": 30, "error": 40}
+
+
+def parse_sample_rates(spec: str) -> Dict[str, float]:
+    """Parse ``"event=rate,event=rate"`` into a dict of sampling rates."""
+    rates = {}
+    for item in spec.split(","):
+        event, sep, rate = item.partition("=")
+        if sep and event.strip():
+            rates[event.strip()] = min(max(float(rate), 0.0), 1.0)
+    return rates
+
+
+class LogPolicy:
+    """
+    Cheap, bounded front end for hot-path logfire events.
+
+    Events below ``level`` are dropped before any formatting happens, and each
+    event name can be sampled with its own rate. Fields are truncated to
+    ``max_field_chars`` (strings) and ``max_items`` (lists and dicts), and
+    request headers are reduced to an allow-list. Once ``start`` has been
+    called, accepted events go through a bounded queue and are emitted by a
+    background task; when the queue is full they are dropped and counted.
+
+    Args:
+        level (str): Minimum level emitted: ``debug``, ``info``, ``warn`` or ``error``.
+        sample_rates (Optional[Dict[str, float]]): Fraction of each event name to keep.
+        default_rate (float): Fraction kept for events without their own rate.
+        max_field_chars (int): Longest string field logged before truncation.
+        max_items (int): Most list items or dict keys logged per field.
+        header_allowlist (Iterable[str]): Request headers that may be logged.
+        queue_size (int): Maximum number of events waiting to be emitted.
+    """
+    def __init__(self, level: str = "info", sample_rates: Optional[Dict[str, float]] = None,
+                 default_rate: float = 1.0, max_field_chars: int = 512, max_items: int = 50,
+                 header_allowlist: Iterable[str] = ("user-agent", "content-type", "content-length", "accept"),
+                 queue_size: int = 10000):
+        self.level = _LEVELS.get(level.lower(), _LEVELS["info"])
+        self.sample_rates = sample_rates or {}
+        self.default_rate = default_rate
+        self.max_field_chars = max_field_chars
+        self.max_items = max_items
+        self.header_allowlist = frozenset(h.lower() for h in header_allowlist)
+        self.queue_size = queue_size
+        self.started = False
+        self._queue: Optional[asyncio.Queue] = None
+        self._drain: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.emitted = 0
+        self.sampled_out = 0
+        self.dropped = 0
+
+    def start(self):
+        """Start emitting through the background queue; must be called from a running event loop."""
+        if self.started:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._drain = asyncio.create_task(self._run(), name="log-policy-drain")
+        self.started = True
+
+    async def stop(self):
+        """Emit what is still queued, then stop the background task."""
+        if not self.started:
+            return
+        self.started = False
+        await self._queue.join()
+        self._drain.cancel()
+        await asyncio.gather(self._drain, return_exceptions=True)
+        self._drain = None
+
+    async def _run(self):
+        while True:
+            level, event, fields = await self._queue.get()
+            try:
+                self._emit(level, event, fields)
+            finally:
+                self._queue.task_done()
+
+    def _emit(self, level: str, event: str, fields: Dict[str, Any]):
+        try:
+            getattr(logfire, level)(event, **fields)
+            self.emitted += 1
+        except Exception:
+            # Logging must never break request handling
+            pass
+
+    def enabled(self, level: str) -> bool:
+        return _LEVELS[level] >= self.level
+
+    def sampled(self, event: str) -> bool:
+        rate = self.sample_rates.get(event, self.default_rate)
+        return rate >= 1.0 or random.random() < rate
+
+    def truncate(self, value: Any, depth: int = 0) -> Any:
+        """Bound the size of a field value so logging cost does not grow with payload size."""
+        if isinstance(value, str):
+            if len(value) > self.max_field_chars:
+                return f"{value[:self.max_field_chars]}...[{len(value)} chars]"
+            return value
+        if depth >= 3 and isinstance(value, (dict, list, tuple)):
+            return f"<{type(value).__name__} of {len(value)}>"
+        if isinstance(value, dict):
+            items = list(value.items())
+            truncated = {str(k): self.truncate(v, depth + 1) for k, v in items[:self.max_items]}
+            if len(items) > self.max_items:
+                truncated["..."] = f"{len(items) - self.max_items} more"
+            return truncated
+        if isinstance(value, (list, tuple)):
+            truncated = [self.truncate(v, depth + 1) for v in value[:self.max_items]]
+            if len(value) > self.max_items:
+                truncated.append(f"...{len(value) - self.max_items} more")
+            return truncated
+        return value
+
+    def headers(self, headers: Iterable[Tuple[Any, Any]]) -> Dict[str, str]:
+        """
+        Keep only allow-listed headers.
+
+        Accepts ASGI raw ``(bytes, bytes)`` pairs or ``(str, str)`` items, so
+        nothing outside the allow-list is ever decoded.
+        """
+        kept = {}
+        for name, value in headers:
+            if isinstance(name, bytes):
+                name = name.decode("latin-1").lower()
+                if name in self.header_allowlist:
+                    kept[name] = self.truncate(value.decode("latin-1"))
+            elif name.lower() in self.header_allowlist:
+                kept[name.lower()] = self.truncate(value)
+        return kept
+
+    def should_log(self, level: str, event: str) -> bool:
+        """
+        Apply level gating and sampling.
+
+        Callers that need to build expensive fields check this first and then
+        call ``emit``.
+        """
+        if not self.enabled(level):
+            return False
+        if not self.sampled(event):
+            self.sampled_out += 1
+            return False
+        return True
+
+    def emit(self, level: str, event: str, **fields: Any):
+        """Truncate and queue an event that already passed ``should_log``."""
+        if not self.started:
+            self._emit(level, event, {k: self.truncate(v) for k, v in fields.items()})
+            return
+        try:
+            in_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            in_loop = False
+        if in_loop and self._queue.full():
+            # Count the drop before paying for truncation
+            self.dropped += 1
+            return
+        fields = {k: self.truncate(v) for k, v in fields.items()}
+        if in_loop:
+            self._enqueue((level, event, fields))
+        else:
+            # Sync handlers may run in FastAPI's threadpool
+            self._loop.call_soon_threadsafe(self._enqueue, (level, event, fields))
+
+    def _enqueue(self, item: Tuple[str, str, Dict[str, Any]]):
+        try:
+            self._queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    def log(self, level: str, event: str, **fields: Any):
+        if self.should_log(level, event):
+            self.emit(level, event, **fields)
+
+    def debug(self, event: str, **fields: Any):
+        self.log("debug", event, **fields)
+
+    def info(self, event: str, **fields: Any):
+        self.log("info", event, **fields)
+
+    def warn(self, event: str, **fields: Any):
+        self.log("warn", event, **fields)
+
+    def error(self, event: str, **fields: Any):
+        self.log("error", event, **fields)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "emitted": self.emitted,
+            "sampled_out": self.sampled_out,
+            "dropped": self.dropped,
+            "queued": self._queue.qsize() if self._queue else 0,
+        }
+
+
+log_policy = LogPolicy(
+    level=os.getenv("A2A_LOG_LEVEL", "info"),
+    sample_rates=parse_sample_rates(os.getenv("A2A_LOG_SAMPLE", "http_request=0.1,web_search_cache_hit=0.1")),
+    default_rate=float(os.getenv("A2A_LOG_SAMPLE_DEFAULT", "1.0")),
+    max_field_chars=int(os.getenv("A2A_LOG_MAX_FIELD", "512")),
+    header_allowlist=[h.strip() for h in os.getenv("A2A_LOG_HEADERS", "user-agent,content-type,content-length,accept").split(",") if h.strip()],
+    queue_size=int(os.getenv("A2A_LOG_QUEUE_SIZE", "10000")),
+)
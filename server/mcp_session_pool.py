@@ -0,0 +1,217 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import logfire
+
+
+class MCPSession:
+    """
+    A single warm MCP stdio server together with the agent bound to it.
+
+    Attributes:
+        index (int): Slot index of the session in the pool.
+        server (Any): The running MCP server (e.g. MCPServerStdio).
+        agent (Any): The pydantic_ai Agent that uses only this server.
+        last_checked (float): Monotonic time of the last successful health check.
+        alive (bool): False once the session has been retired or has crashed.
+    """
+    def __init__(self, index: int, server: Any, agent: Any):
+        self.index = index
+        self.server = server
+        self.agent = agent
+        self.last_checked = 0.0
+        self.alive = True
+        self.retired = asyncio.Event()
+
+    def retire(self):
+        """Mark the session as unusable and ask its supervisor to respawn it."""
+        self.alive = False
+        self.retired.set()
+
+
+class MCPSessionPool:
+    """
+    Fixed-size pool of long-lived MCP stdio sessions.
+
+    Each slot is owned by a supervisor task that starts the MCP server, keeps it
+    open until the session is retired, and then respawns it. Entering and exiting
+    the server context in the same task keeps the underlying anyio streams happy.
+    Callers borrow a session with ``checkout()`` and hand it back automatically.
+
+    Args:
+        factory (Callable[[], Tuple[Any, Any]]): Returns a new ``(server, agent)`` pair.
+        size (int): Number of sessions to keep warm. ``0`` disables the pool.
+        health_interval (float): Seconds after which an idle session is re-checked.
+        health_timeout (float): Timeout for a single health check.
+        checkout_timeout (float): How long a caller waits for a free session.
+        respawn_backoff (float): Initial delay before respawning a crashed session.
+        max_respawn_backoff (float): Upper bound for the respawn delay.
+    """
+    def __init__(
+        self,
+        factory: Callable[[], Tuple[Any, Any]],
+        size: int = 2,
+        health_interval: float = 30.0,
+        health_timeout: float = 5.0,
+        checkout_timeout: float = 30.0,
+        respawn_backoff: float = 1.0,
+        max_respawn_backoff: float = 30.0,
+    ):
+        self.factory = factory
+        self.size = size
+        self.health_interval = health_interval
+        self.health_timeout = health_timeout
+        self.checkout_timeout = checkout_timeout
+        self.respawn_backoff = respawn_backoff
+        self.max_respawn_backoff = max_respawn_backoff
+        self.started = False
+        self._closing = False
+        self._idle: Optional[asyncio.Queue] = None
+        self._sessions: Dict[int, MCPSession] = {}
+        self._supervisors: List[asyncio.Task] = []
+        self._health_task: Optional[asyncio.Task] = None
+        self.checkouts = 0
+        self.respawns = 0
+        self.health_failures = 0
+
+    async def start(self):
+        """Spawn the supervisor tasks. Sessions become available as they finish starting."""
+        if self.started or self.size <= 0:
+            return
+        self._closing = False
+        self._idle = asyncio.Queue()
+        self._supervisors = [
+            asyncio.create_task(self._supervise(index), name=f"mcp-session-{index}")
+            for index in range(self.size)
+        ]
+        self._health_task = asyncio.create_task(self._health_loop(), name="mcp-session-health")
+        self.started = True
+        logfire.info("mcp_pool_started", size=self.size)
+
+    async def stop(self, timeout: float = 10.0):
+        """Retire every session and wait for the supervisors to shut their servers down."""
+        if not self.started:
+            return
+        self._closing = True
+        self.started = False
+        if self._health_task:
+            self._health_task.cancel()
+        for session in list(self._sessions.values()):
+            session.retire()
+        done, pending = await asyncio.wait(self._supervisors, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        self._supervisors = []
+        self._sessions.clear()
+        logfire.info("mcp_pool_stopped", respawns=self.respawns, checkouts=self.checkouts)
+
+    async def _supervise(self, index: int):
+        backoff = self.respawn_backoff
+        while not self._closing:
+            session = None
+            try:
+                server, agent = self.factory()
+                session = MCPSession(index, server, agent)
+                async with server:
+                    session.last_checked = time.monotonic()
+                    self._sessions[index] = session
+                    self._idle.put_nowait(session)
+                    logfire.info("mcp_session_started", index=index)
+                    backoff = self.respawn_backoff
+                    await session.retired.wait()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logfire.error("mcp_session_crashed", index=index, error=str(e), error_type=type(e).__name__)
+            finally:
+                if session is not None:
+                    session.alive = False
+                    if self._sessions.get(index) is session:
+                        del self._sessions[index]
+            if self._closing:
+                break
+            self.respawns += 1
+            logfire.info("mcp_session_respawning", index=index, delay=backoff)
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, self.max_respawn_backoff)
+
+    async def _check(self, session: MCPSession) -> bool:
+        try:
+            await asyncio.wait_for(session.server.list_tools(), timeout=self.health_timeout)
+        except Exception as e:
+            self.health_failures += 1
+            logfire.error("mcp_session_unhealthy", index=session.index, error=str(e), error_type=type(e).__name__)
+            session.retire()
+            return False
+        session.last_checked = time.monotonic()
+        return True
+
+    async def _health_loop(self):
+        # Only idle sessions are probed; borrowed ones are checked when they come back stale.
+        while True:
+            await asyncio.sleep(self.health_interval)
+            for _ in range(self._idle.qsize()):
+                try:
+                    session = self._idle.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                if not session.alive:
+                    continue
+                if time.monotonic() - session.last_checked >= self.health_interval:
+                    if not await self._check(session):
+                        continue
+                self._idle.put_nowait(session)
+
+    @asynccontextmanager
+    async def checkout(self):
+        """
+        Borrow a healthy session for the duration of the ``async with`` block.
+
+        Yields:
+            Any: The agent bound to the borrowed MCP session.
+
+        Raises:
+            RuntimeError: If the pool is not running or no session frees up in time.
+        """
+        if not self.started:
+            raise RuntimeError("MCP session pool is not running")
+        deadline = time.monotonic() + self.checkout_timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise RuntimeError("Timed out waiting for an MCP session")
+            try:
+                session = await asyncio.wait_for(self._idle.get(), timeout=remaining)
+            except asyncio.TimeoutError:
+                raise RuntimeError("Timed out waiting for an MCP session")
+            if not session.alive:
+                continue
+            if time.monotonic() - session.last_checked >= self.health_interval:
+                if not await self._check(session):
+                    continue
+            break
+        self.checkouts += 1
+        try:
+            yield session.agent
+        except BaseException:
+            # The failure may be unrelated to MCP (e.g. the LLM call), so probe before reuse.
+            session.last_checked = 0.0
+            raise
+        finally:
+            if session.alive and not self._closing:
+                self._idle.put_nowait(session)
+
+    def stats(self) -> Dict[str, int]:
+        """Return counters describing the pool for health and metrics endpoints."""
+        return {
+            "size": self.size,
+            "alive": sum(1 for s in self._sessions.values() if s.alive),
+            "idle": self._idle.qsize() if self._idle else 0,
+            "checkouts": self.checkouts,
+            "respawns": self.respawns,
+            "health_failures": self.health_failures,
+        }
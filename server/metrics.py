@@ -0,0 +1,247 @@
+import asyncio
+import math
+import os
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import logfire
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Request-scale latencies, in seconds
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """
+    Base class for a named metric family.
+
+    Updates are plain attribute and dict writes without locks. They are made
+    from the event loop thread only, where nothing can interleave with them.
+
+    Args:
+        name (str): Metric name.
+        help (str): Description for the ``# HELP`` line.
+        labelnames (Sequence[str]): Label names; values are passed positionally.
+    """
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        return "\n".join([f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"] + self.samples())
+
+
+class Counter(Metric):
+    """A monotonically increasing count per label set."""
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        # An unlabelled counter is exported as 0 before its first increment
+        self._values: Dict[Labels, float] = {} if self.labelnames else {(): 0}
+
+    def inc(self, *labels: str, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"
+                for labels, value in self._values.items()]
+
+
+class _Series:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, buckets: int):
+        self.counts = [0] * (buckets + 1)
+        self.sum = 0.0
+        self.count = 0
+
+
+class Histogram(Metric):
+    """
+    Observations counted into fixed buckets per label set.
+
+    Each observation is one binary search and three increments; cumulative
+    bucket counts are only computed when the metrics are scraped.
+
+    Args:
+        buckets (Sequence[float]): Ascending upper bounds; ``+Inf`` is implied.
+    """
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Labels, _Series] = {}
+
+    def observe(self, value: float, *labels: str):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = _Series(len(self.buckets))
+        series.counts[bisect_left(self.buckets, value)] += 1
+        series.sum += value
+        series.count += 1
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return series.count if series is not None else 0
+
+    def samples(self) -> List[str]:
+        lines = []
+        bounds = self.buckets + (math.inf,)
+        for labels, series in self._series.items():
+            cumulative = 0
+            for bound, count in zip(bounds, series.counts):
+                cumulative += count
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(series.sum)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {series.count}")
+        return lines
+
+
+class CallbackMetric(Metric):
+    """
+    A gauge or counter read from existing state when the metrics are scraped.
+
+    Args:
+        read (Callable): Returns a number, or ``{label value or tuple: number}`` when labelled.
+        type (str): ``gauge`` or ``counter``.
+    """
+    def __init__(self, name: str, help: str, read: Callable[[], Union[float, Dict[Any, float]]],
+                 labelnames: Sequence[str] = (), type: str = "gauge"):
+        super().__init__(name, help, labelnames)
+        self.read = read
+        self.type = type
+
+    def samples(self) -> List[str]:
+        value = self.read()
+        if not isinstance(value, dict):
+            return [f"{self.name} {_number(value)}"]
+        return [
+            f"{self.name}{_labels(self.labelnames, labels if isinstance(labels, tuple) else (labels,))} {_number(v)}"
+            for labels, v in value.items()
+        ]
+
+
+class MetricsRegistry:
+    """Metric families in registration order, rendered in the Prometheus text format."""
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def callback(self, name: str, help: str, read: Callable[[], Union[float, Dict[Any, float]]],
+                 labelnames: Sequence[str] = (), type: str = "gauge") -> CallbackMetric:
+        return self.register(CallbackMetric(name, help, read, labelnames, type))
+
+    def render(self) -> str:
+        """Render every metric; a failing callback is skipped instead of failing the scrape."""
+        blocks = []
+        for metric in self._metrics.values():
+            try:
+                blocks.append(metric.render())
+            except Exception as e:
+                logfire.error("metric_render_failed", metric=metric.name, error=str(e))
+        return "\n".join(blocks) + "\n"
+
+
+class LoopLagMonitor:
+    """
+    Measure event-loop lag: how late a sleep of ``interval`` seconds wakes up.
+
+    A blocked loop delays every request, so sustained lag points at
+    synchronous work on the loop.
+
+    Args:
+        histogram (Histogram): Receives each lag sample.
+        interval (float): Seconds between samples.
+    """
+    def __init__(self, histogram: Histogram, interval: float = 0.5):
+        self.histogram = histogram
+        self.interval = interval
+        self.last = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.create_task(self._run(), name="loop-lag-monitor")
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.last = max(loop.time() - expected, 0.0)
+            self.histogram.observe(self.last)
+
+
+registry = MetricsRegistry()
+
+jsonrpc_duration = registry.histogram(
+    "a2a_jsonrpc_request_duration_seconds", "JSON-RPC call latency by method.", ("method",)
+)
+jsonrpc_requests = registry.counter(
+    "a2a_jsonrpc_requests_total", "JSON-RPC calls by method and outcome (ok or error).", ("method", "outcome")
+)
+web_search_duration = registry.histogram(
+    "a2a_web_search_duration_seconds", "web_search latency; cache is hit or miss.", ("cache",)
+)
+web_search_errors = registry.counter("a2a_web_search_errors_total", "web_search calls that raised.")
+loop_lag = registry.histogram(
+    "a2a_event_loop_lag_seconds", "How late the event loop ran a timer.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+)
+loop_lag_monitor = LoopLagMonitor(loop_lag, interval=float(os.getenv("A2A_LOOP_LAG_INTERVAL", "0.5")))
+registry.callback("a2a_event_loop_lag_last_seconds", "Most recent event-loop lag sample.", lambda: loop_lag_monitor.last)
+
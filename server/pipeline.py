@@ -0,0 +1,471 @@
+import asyncio
+import hashlib
+import os
+import time
+import traceback
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+import logfire
+from shared.models import ComposeServiceResult, DockerConfig, DockerFixResult, Artifact, Part
+from server.brave_mcp_client import web_search
+from server.compose_analyzer import ComposeService, analyze_service, parse_compose
+from server.dockerfile_analyzer import Issue, ParsedDockerfile, analyze_dockerfile, image_tag, parse_dockerfile
+from server.dockerfile_diff import diff_json
+from server.search_cache import TTLLRUCache
+
+BEST_PRACTICES_QUERY = "Dockerfile security best practices"
+# Best-practice searches in flight at once for one docker-compose file
+COMPOSE_WORKERS = int(os.getenv("A2A_COMPOSE_WORKERS", "16"))
+# Seconds each stage may take, and the whole analysis
+RULES_TIMEOUT = float(os.getenv("A2A_STAGE_RULES_TIMEOUT", "5"))
+SEARCH_TIMEOUT = float(os.getenv("A2A_STAGE_SEARCH_TIMEOUT", "20"))
+DIFF_TIMEOUT = float(os.getenv("A2A_STAGE_DIFF_TIMEOUT", "5"))
+PIPELINE_TIMEOUT = float(os.getenv("A2A_PIPELINE_TIMEOUT", "30"))
+
+# Reported in issues_remaining when a stage runs out of time
+STAGE_MISSING = {
+    "rules": "rule findings are incomplete",
+    "search": "best practices are incomplete",
+    "diff": "diff_json is empty",
+}
+EMPTY_DIFF = {"format": "hunks", "hunks": [], "added": 0, "removed": 0}
+
+result_cache = TTLLRUCache(
+    max_entries=int(os.getenv("A2A_RESULT_CACHE_ENTRIES", "1024")),
+    max_bytes=int(os.getenv("A2A_RESULT_CACHE_BYTES", str(16 * 1024 * 1024))),
+    ttl=float(os.getenv("A2A_RESULT_CACHE_TTL", "3600")),
+)
+# Canonical hits whose result was rebuilt for differently formatted input
+result_cache_rebuilt = 0
+# Searches that outlived their stage, kept referenced until they finish
+_late_searches: Set[asyncio.Task] = set()
+
+
+def reset_result_cache():
+    """Empty the result cache and reset its counters."""
+    global result_cache_rebuilt
+    result_cache.clear()
+    result_cache_rebuilt = 0
+
+
+def keep_late_search(canonical: str, search: Awaitable[Optional[Any]]):
+    """
+    Let a search that outlived its stage finish in the background.
+
+    ``search`` returns the best practices, or None if the search failed. They
+    are cached under ``canonical`` without a result, so the next submission
+    of the same configuration skips the search.
+    """
+    async def finish():
+        best_practices = await search
+        if best_practices is not None and canonical not in result_cache:
+            result_cache.set(canonical, {"exact": None, "best_practices": best_practices})
+            logfire.info("late_search_cached", key=canonical)
+
+    task = asyncio.ensure_future(finish())
+    _late_searches.add(task)
+    task.add_done_callback(_late_searches.discard)
+
+
+def is_dockerfile(parsed: ParsedDockerfile) -> bool:
+    """True if the text starts like a Dockerfile; compose YAML with an inline Dockerfile does not."""
+    return bool(parsed.stages) and parsed.instructions[0].cmd in ("FROM", "ARG")
+
+
+def canonical_text(raw_text: str) -> str:
+    """
+    Normalize a configuration so formatting-only changes hash the same.
+
+    Dockerfiles are reduced to their parsed instructions with comments, blank
+    lines, continuations and repeated whitespace removed. Other text (compose
+    YAML) only loses comments, blank lines and trailing whitespace, since its
+    indentation is meaningful.
+    """
+    parsed = parse_dockerfile(raw_text)
+    if is_dockerfile(parsed):
+        return "\n".join(
+            " ".join([ins.cmd] + ins.args.split()) + "".join("\n" + body for body in ins.heredocs)
+            for ins in parsed.instructions
+        )
+    lines = (line.rstrip() for line in raw_text.splitlines())
+    return "\n".join(line for line in lines if line and not line.lstrip().startswith("#"))
+
+
+def content_keys(raw_text: str) -> Tuple[str, str]:
+    """Return ``(canonical, exact)`` sha256 keys of a configuration."""
+    canonical = hashlib.sha256("\x1f".join([BEST_PRACTICES_QUERY, canonical_text(raw_text)]).encode("utf-8")).hexdigest()
+    exact = hashlib.sha256(raw_text.encode("utf-8")).hexdigest()
+    return canonical, exact
+
+
+# Receives ``(kind, content)`` for each finding, best practice and diff hunk as it is produced
+PartSink = Callable[[str, Dict[str, Any]], None]
+
+
+def _discard(kind: str, content: Dict[str, Any]):
+    pass
+
+
+class StageRun:
+    """
+    Deadlines and durations of the stages of one analysis.
+
+    Each stage gets its own timeout, cut short by what is left of the overall
+    deadline. A stage that runs out of time is cancelled and recorded in
+    ``timed_out``; the analysis carries on with what the other stages produced.
+
+    Args:
+        timeout (Optional[float]): Seconds the whole analysis may take; defaults to ``PIPELINE_TIMEOUT``.
+    """
+    def __init__(self, timeout: Optional[float] = None):
+        self.deadline = time.monotonic() + (PIPELINE_TIMEOUT if timeout is None else timeout)
+        self.durations: Dict[str, float] = {}
+        self.timed_out: Dict[str, float] = {}
+
+    async def run(self, name: str, work: Awaitable[Any], timeout: float) -> Tuple[Any, bool]:
+        """
+        Await ``work`` within the stage's budget.
+
+        Returns:
+            Tuple[Any, bool]: The result, or None if the stage timed out, and
+            whether it finished.
+        """
+        budget = max(min(timeout, self.deadline - time.monotonic()), 0.0)
+        started = time.perf_counter()
+        try:
+            return await asyncio.wait_for(work, budget), True
+        except asyncio.TimeoutError:
+            self.timed_out[name] = budget
+            logfire.warn("pipeline_stage_timeout", stage=name, budget=budget)
+            return None, False
+        finally:
+            self.durations[name] = round(time.perf_counter() - started, 6)
+
+    def missing(self) -> List[str]:
+        """One ``issues_remaining`` entry per stage that timed out."""
+        return [f"Stage {name} timed out after {budget:.1f}s; {STAGE_MISSING[name]}"
+                for name, budget in self.timed_out.items()]
+
+
+def patch_text(raw_text: str, findings: List[str], best_practices: List[str]) -> str:
+    """Append findings and best practices to ``raw_text`` as comments."""
+    added = ["# Hardened by server agent"] + [f"# {finding}" for finding in findings] + [f"# {bp}" for bp in best_practices]
+    return raw_text + "\n" + "\n".join(added)
+
+
+async def diff_stage(stages: StageRun, raw_text: str, findings: List[str], best_practices: List[str],
+                     emit: PartSink = _discard) -> DockerFixResult:
+    """
+    Build the result with the diff computed off the event loop, within the diff deadline.
+
+    Hunks are handed back to the loop as they are produced. If the diff runs
+    out of time the patched text is still returned, with an empty diff.
+    """
+    loop = asyncio.get_running_loop()
+    patched = patch_text(raw_text, findings, best_practices)
+    live = True
+
+    def forward(hunk: Dict[str, Any]):
+        # Hunks queued before a timeout must not reach the sink afterwards
+        if live:
+            emit("hunk", hunk)
+
+    work = asyncio.to_thread(diff_json, raw_text, patched, 3, lambda hunk: loop.call_soon_threadsafe(forward, hunk))
+    diff, finished = await stages.run("diff", work, DIFF_TIMEOUT)
+    if not finished:
+        live = False
+        diff = dict(EMPTY_DIFF)
+    return DockerFixResult(
+        patched_text=patched,
+        diff_json=diff,
+        # Findings are annotated, not rewritten, so nothing counts as fixed
+        issues_fixed=[],
+        issues_remaining=findings,
+        best_practices=best_practices,
+    )
+
+
+async def search_best_practices(query: str = BEST_PRACTICES_QUERY) -> Tuple[List[str], bool]:
+    """
+    Look up current best practices via the Brave MCP agent.
+
+    Search failures are reported as the best-practice text instead of failing
+    the analysis.
+
+    Returns:
+        Tuple[List[str], bool]: The best practices, and whether the search failed.
+    """
+    try:
+        logfire.info("starting search for best practices", query=query)
+        brave_search_result_text = await web_search(query)
+        logfire.info("brave_web_search_agent_used", result=brave_search_result_text)
+        return [str(brave_search_result_text)], False
+    except RuntimeError as e:
+        logfire.error("brave_web_search_agent_failed", error=str(e), traceback=traceback.format_exc(), error_type=type(e).__name__)
+        return [f"MCP Error: {str(e)}"], True
+    except Exception as e:
+        logfire.error("brave_web_search_agent_failed", error=str(e), traceback=traceback.format_exc(), error_type=type(e).__name__)
+        return [f"Unexpected Error: {str(e)}"], True
+
+
+async def analyze_docker_config(docker_config: DockerConfig, emit: PartSink = _discard) -> DockerFixResult:
+    """
+    Analyze a Docker configuration and return the hardened result.
+
+    Runs the in-process rules and looks up current best practices
+    concurrently, then appends both to the input as comments and diffs it.
+    Rule findings are reported in ``issues_remaining`` since they are not
+    rewritten, and the search results in ``best_practices``; ``issues_fixed``
+    stays empty. Results stream out through ``emit`` as they are produced: rule
+    findings first (milliseconds), then best practices once the search
+    returns, then diff hunks. docker-compose input is analyzed per service
+    (see ``analyze_compose``).
+
+    Each stage (``rules``, ``search``, ``diff``) has its own deadline within
+    ``PIPELINE_TIMEOUT``. A stage that times out leaves its part of the
+    result empty and adds a note to ``issues_remaining``; the seconds spent
+    per stage are returned in ``stage_durations``.
+
+    Results are cached under a canonical content hash (see ``canonical_text``).
+    Byte-identical input gets the cached result as is; input that only differs
+    in formatting is re-checked by the rules, which is cheap, but reuses the
+    cached best practices. Identical submissions running at the same time
+    share one search through ``web_search``. A search that times out keeps
+    running in the background and its best practices are cached on their
+    own, for the next submission.
+
+    Args:
+        docker_config (DockerConfig): The Dockerfile or docker-compose YAML to analyze.
+        emit (PartSink): Receives ``("finding" | "best_practice" | "hunk", content)``.
+
+    Returns:
+        DockerFixResult: The patched text, diff and issue lists.
+    """
+    global result_cache_rebuilt
+    stages = StageRun()
+    raw_text = docker_config.raw_text
+    canonical, exact = content_keys(raw_text)
+    cached = result_cache.get(canonical)
+    if cached is not None and cached["exact"] == exact:
+        logfire.info("analysis_cache_hit", key=canonical)
+        result = DockerFixResult(**cached["result"], stage_durations={})
+        for kind, content in cached["parts"]:
+            emit(kind, content)
+        for hunk in result.diff_json["hunks"]:
+            emit("hunk", hunk)
+        return result
+    known = None
+    if cached is not None:
+        if "result" in cached:
+            result_cache_rebuilt += 1
+            logfire.info("analysis_cache_hit_rebuilt", key=canonical)
+        known = cached["best_practices"]
+    parts = []
+
+    def record(kind: str, content: Dict[str, Any]):
+        # Hunks are replayed from the cached diff; everything else is kept for replay
+        if kind != "hunk":
+            parts.append((kind, content))
+        emit(kind, content)
+
+    services = None if is_dockerfile(parse_dockerfile(raw_text)) else parse_compose(raw_text)
+    if services is not None:
+        result, best_practices, search_failed = await analyze_compose(raw_text, services, record, known, stages, canonical)
+    else:
+        result, best_practices, search_failed = await _analyze_dockerfile(raw_text, canonical, record, known, stages)
+    result.issues_remaining = result.issues_remaining + stages.missing()
+    result.stage_durations = stages.durations
+    logfire.info("pipeline_finished", stages=stages.durations, timed_out=list(stages.timed_out))
+    # Partial results are not cached, so the next submission gets another chance
+    if (cached is None or "result" not in cached) and not search_failed and not stages.timed_out:
+        result_cache.set(canonical, {
+            "exact": exact,
+            "result": result.model_dump(exclude={"stage_durations"}),
+            "parts": parts,
+            "best_practices": best_practices,
+        })
+    return result
+
+
+async def _analyze_dockerfile(raw_text: str, canonical: str, emit: PartSink, known: Optional[List[str]],
+                              stages: StageRun) -> Tuple[DockerFixResult, List[str], bool]:
+    async def rules() -> List[Issue]:
+        issues = await asyncio.to_thread(analyze_dockerfile, raw_text)
+        logfire.info("dockerfile_analyzed", issue_count=len(issues))
+        for issue in issues:
+            emit("finding", issue.to_dict())
+        return issues
+
+    searching = asyncio.ensure_future(search_best_practices()) if known is None else None
+
+    async def search() -> Tuple[List[str], bool]:
+        found = known, False
+        if searching is not None:
+            # A timeout only stops this analysis waiting; the search itself carries on
+            found = await asyncio.shield(searching)
+        for bp in found[0]:
+            emit("best_practice", {"text": bp})
+        return found
+
+    async def late() -> Optional[List[str]]:
+        best_practices, failed = await searching
+        return None if failed else best_practices
+
+    (issues, _), (found, searched) = await asyncio.gather(
+        stages.run("rules", rules(), RULES_TIMEOUT),
+        stages.run("search", search(), SEARCH_TIMEOUT),
+    )
+    if not searched and searching is not None:
+        keep_late_search(canonical, late())
+    best_practices, search_failed = found if searched else ([], True)
+    findings = [str(issue) for issue in issues or ()]
+    return await diff_stage(stages, raw_text, findings, best_practices, emit), best_practices, search_failed
+
+
+def service_query(service: ComposeService) -> str:
+    """Search query for a service: the image's own best practices, or the Dockerfile ones for built services."""
+    if service.build is not None or not service.image:
+        return BEST_PRACTICES_QUERY
+    return f"{image_tag(service.image)[0]} container security best practices"
+
+
+async def analyze_compose(raw_text: str, services: List[ComposeService], emit: PartSink = _discard,
+                          known: Optional[Dict[str, List[str]]] = None, stages: Optional[StageRun] = None,
+                          canonical: Optional[str] = None) -> Tuple[DockerFixResult, Dict[str, List[str]], bool]:
+    """
+    Analyze every service of a docker-compose file concurrently and merge the results.
+
+    The rules check each service's settings and inline Dockerfile while the
+    services' best practices are searched, with at most ``COMPOSE_WORKERS``
+    searches in flight. Services sharing an image share one search, so a
+    large file takes about as long as its slowest search rather than the sum.
+    When the search stage times out, services whose search finished keep
+    their best practices; the other searches carry on and, given
+    ``canonical``, the complete set is cached once they all succeed.
+
+    Args:
+        raw_text (str): The compose file.
+        services (List[ComposeService]): Its parsed services.
+        emit (PartSink): Receives findings and best practices, tagged with ``service``.
+        known (Optional[Dict[str, List[str]]]): Best practices per service from an earlier analysis.
+        stages (Optional[StageRun]): Deadlines and durations shared with the caller.
+        canonical (Optional[str]): Result cache key for best practices found after a timeout.
+
+    Returns:
+        Tuple[DockerFixResult, Dict[str, List[str]], bool]: The merged result
+        with per-service ``services``, the best practices per service, and
+        whether any search failed.
+    """
+    stages = stages if stages is not None else StageRun()
+    workers = asyncio.Semaphore(COMPOSE_WORKERS)
+    # Best practices and failure per service, filled in as searches finish
+    found: Dict[str, Tuple[List[str], bool]] = {}
+    searches: Dict[str, asyncio.Task] = {}
+
+    async def limited(query: str) -> Tuple[List[str], bool]:
+        async with workers:
+            return await search_best_practices(query)
+
+    def search(query: str) -> asyncio.Task:
+        # Services with the same query share one search, and one worker
+        task = searches.get(query)
+        if task is None:
+            task = searches[query] = asyncio.ensure_future(limited(query))
+        return task
+
+    async def search_one(service: ComposeService):
+        if known is not None and service.name in known:
+            best_practices, search_failed = known[service.name], False
+        else:
+            # Shielded so a timeout does not cancel a search other services or a later request can use
+            best_practices, search_failed = await asyncio.shield(search(service_query(service)))
+        found[service.name] = best_practices, search_failed
+        for bp in best_practices:
+            emit("best_practice", {"text": bp, "service": service.name})
+
+    async def rules() -> List[List[Issue]]:
+        per_service = await asyncio.to_thread(lambda: [analyze_service(service) for service in services])
+        for service, issues in zip(services, per_service):
+            for issue in issues:
+                emit("finding", dict(issue.to_dict(), service=service.name))
+        return per_service
+
+    (per_service, _), _ = await asyncio.gather(
+        stages.run("rules", rules(), RULES_TIMEOUT),
+        stages.run("search", asyncio.gather(*(search_one(service) for service in services)), SEARCH_TIMEOUT),
+    )
+    if "search" in stages.timed_out and canonical is not None:
+        async def late() -> Optional[Dict[str, List[str]]]:
+            by_query = dict(zip(searches, await asyncio.gather(*searches.values())))
+            complete = {}
+            for service in services:
+                if known is not None and service.name in known:
+                    complete[service.name] = known[service.name]
+                    continue
+                best_practices, failed = by_query.get(service_query(service), (None, True))
+                if failed:
+                    return None
+                complete[service.name] = best_practices
+            return complete
+
+        keep_late_search(canonical, late())
+    per_service = per_service or [[] for _ in services]
+    outcomes = [(issues,) + found.get(service.name, ([], True)) for service, issues in zip(services, per_service)]
+    logfire.info("compose_analyzed", services=len(services), issue_count=sum(len(o[0]) for o in outcomes))
+    findings = [f"{service.name}: {issue}" for service, (issues, _, _) in zip(services, outcomes) for issue in issues]
+    # Services built the same way get the same search result; list it once
+    best_practices = list(dict.fromkeys(bp for _, bps, _ in outcomes for bp in bps))
+    result = await diff_stage(stages, raw_text, findings, best_practices, emit)
+    result.services = [
+        ComposeServiceResult(service=service.name, image=service.image,
+                             issues_remaining=[str(issue) for issue in issues], best_practices=bps)
+        for service, (issues, bps, _) in zip(services, outcomes)
+    ]
+    return (result, {service.name: found[service.name][0] for service in services if service.name in found},
+            any(failed for _, _, failed in outcomes))
+
+
+def result_cache_stats() -> Dict[str, Any]:
+    stats = result_cache.stats()
+    stats["rebuilt"] = result_cache_rebuilt
+    return stats
+
+
+def result_artifact(result: DockerFixResult) -> Artifact:
+    """
+    Wrap a DockerFixResult in an A2A artifact with a single data part.
+
+    Per-service results are left out; they go in ``service_artifacts``.
+    Stage durations are recorded on the task's ``completed`` transition instead.
+
+    Args:
+        result (DockerFixResult): The analysis result.
+
+    Returns:
+        Artifact: Artifact named ``docker_fix_result``.
+    """
+    return Artifact(
+        artifact_id=str(uuid.uuid4()),
+        type="data",
+        parts=[Part(part_id=str(uuid.uuid4()), type="data", content=result.model_dump(exclude={"services", "stage_durations"}))],
+        metadata={"name": "docker_fix_result"},
+    )
+
+
+def service_artifacts(result: DockerFixResult) -> List[Artifact]:
+    """
+    One ``compose_service`` artifact per service of a docker-compose result.
+
+    Returns:
+        List[Artifact]: Artifacts in service order; empty for Dockerfiles.
+    """
+    return [
+        Artifact(
+            artifact_id=str(uuid.uuid4()),
+            type="data",
+            parts=[Part(part_id=str(uuid.uuid4()), type="data", content=service.model_dump())],
+            metadata={"name": "compose_service", "service": service.service},
+        )
+        for service in result.services or ()
+    ]
@@ -0,0 +1,204 @@
+import asyncio
+import os
+import random
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+from urllib.parse import urlsplit
+
+import httpx
+import logfire
+from shared.models import PushNotificationEndpoint, TaskStore
+from server.task_store import task_store
+from server.serialization import to_jsonable
+
+
+class PushDeliveryService:
+    """
+    Delivers task transitions and artifacts to registered push endpoints.
+
+    Events for the same task are collected for ``batch_window`` seconds and
+    posted together, in order, to the task's endpoint. Requests share one
+    pooled HTTP client and are capped per host. Failed deliveries are retried
+    with exponential backoff and jitter, then moved to a bounded dead-letter list.
+    On shutdown, deliveries still running after ``shutdown_grace`` seconds are
+    cancelled and their events dead-lettered as well.
+
+    Args:
+        task_store (TaskStore): Store providing the push endpoint of each task.
+        batch_window (float): Seconds to wait for more events before posting.
+        per_host_limit (int): Maximum concurrent requests to one host.
+        max_retries (int): Retries after the first failed attempt.
+        backoff_base (float): Initial retry delay in seconds.
+        backoff_max (float): Upper bound for the retry delay.
+        timeout (float): HTTP request timeout in seconds.
+        dead_letter_size (int): Number of failed batches kept for inspection.
+        shutdown_grace (float): Seconds ``stop`` waits for pending deliveries.
+        transport (Optional[httpx.AsyncBaseTransport]): Custom transport, e.g. for tests.
+    """
+    def __init__(self, task_store: TaskStore, batch_window: float = 0.05, per_host_limit: int = 10,
+                 max_retries: int = 5, backoff_base: float = 0.5, backoff_max: float = 30.0,
+                 timeout: float = 10.0, dead_letter_size: int = 1000, shutdown_grace: float = 5.0,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.task_store = task_store
+        self.batch_window = batch_window
+        self.per_host_limit = per_host_limit
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.shutdown_grace = shutdown_grace
+        self.transport = transport
+        self.started = False
+        self.dead_letters: Deque[Dict[str, Any]] = deque(maxlen=dead_letter_size)
+        self._client: Optional[httpx.AsyncClient] = None
+        self._pending: Dict[str, List[Dict[str, Any]]] = {}
+        self._first_enqueued: Dict[str, float] = {}
+        self._flushers: Dict[str, asyncio.Task] = {}
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+        self._latencies: Deque[float] = deque(maxlen=1000)
+        self.delivered = 0
+        self.failed = 0
+        self.retries = 0
+
+    async def start(self):
+        if self.started:
+            return
+        self._client = httpx.AsyncClient(
+            timeout=self.timeout,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+            transport=self.transport,
+        )
+        self.started = True
+
+    async def stop(self):
+        """
+        Flush what is pending, then close the HTTP client.
+
+        Deliveries get ``shutdown_grace`` seconds, which a retry backoff can
+        easily exceed; the rest are cancelled and dead-lettered.
+        """
+        if not self.started:
+            return
+        self.started = False
+        if self._flushers:
+            _, late = await asyncio.wait(list(self._flushers.values()), timeout=self.shutdown_grace)
+            for flusher in late:
+                flusher.cancel()
+            if late:
+                await asyncio.gather(*late, return_exceptions=True)
+        for task_id, events in self._pending.items():
+            endpoint = self.task_store.get_push_endpoint(task_id)
+            if endpoint is not None:
+                self._dead_letter(task_id, endpoint.endpoint, events, "not delivered before shutdown")
+        self._pending.clear()
+        self._first_enqueued.clear()
+        await self._client.aclose()
+        self._client = None
+
+    def on_event(self, task_id: str, event: Dict[str, Any]):
+        """TaskStore listener: queue the event if the task has a push endpoint."""
+        if not self.started or self.task_store.get_push_endpoint(task_id) is None:
+            return
+        payload = {"kind": event["kind"], "seq": event["seq"]}
+        if event["kind"] == "artifact":
+            payload["artifact"] = to_jsonable(event["artifact"])
+        elif event["kind"] == "part":
+            payload["artifact_id"] = event["artifact_id"]
+            payload["part"] = event["part"]
+        else:
+            payload["transition"] = event["transition"]
+        self._pending.setdefault(task_id, []).append(payload)
+        self._first_enqueued.setdefault(task_id, time.monotonic())
+        if task_id not in self._flushers:
+            self._flushers[task_id] = asyncio.create_task(self._flush(task_id))
+
+    async def _flush(self, task_id: str):
+        try:
+            while self._pending.get(task_id):
+                await asyncio.sleep(self.batch_window)
+                events = self._pending.pop(task_id)
+                enqueued_at = self._first_enqueued.pop(task_id)
+                await self._deliver(task_id, events, enqueued_at)
+        finally:
+            self._flushers.pop(task_id, None)
+
+    def _host_limit(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc
+        limit = self._host_limits.get(host)
+        if limit is None:
+            limit = self._host_limits[host] = asyncio.Semaphore(self.per_host_limit)
+        return limit
+
+    async def _deliver(self, task_id: str, events: List[Dict[str, Any]], enqueued_at: float):
+        endpoint = self.task_store.get_push_endpoint(task_id)
+        if endpoint is None:
+            return
+        headers = {"Authorization": f"Bearer {endpoint.token}"} if endpoint.token else {}
+        body = {"task_id": task_id, "events": events}
+        try:
+            error = await self._post(task_id, endpoint, headers, body, len(events), enqueued_at)
+        except asyncio.CancelledError:
+            self._dead_letter(task_id, endpoint.endpoint, events, "cancelled at shutdown")
+            raise
+        if error is not None:
+            self._dead_letter(task_id, endpoint.endpoint, events, error)
+
+    async def _post(self, task_id: str, endpoint: PushNotificationEndpoint, headers: Dict[str, str], body: Dict[str, Any],
+                    event_count: int, enqueued_at: float) -> Optional[str]:
+        """POST one batch with retries; returns None once delivered, else the last error."""
+        error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self.retries += 1
+                delay = min(self.backoff_base * 2 ** (attempt - 1), self.backoff_max)
+                await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+            try:
+                async with self._host_limit(endpoint.endpoint):
+                    resp = await self._client.post(endpoint.endpoint, json=body, headers=headers)
+                if resp.status_code < 500 and resp.status_code != 429:
+                    resp.raise_for_status()
+                    latency = time.monotonic() - enqueued_at
+                    self._latencies.append(latency)
+                    self.delivered += 1
+                    logfire.info("push_delivered", task_id=task_id, events=event_count, attempts=attempt + 1, latency=latency)
+                    return None
+                error = f"HTTP {resp.status_code}"
+            except httpx.HTTPStatusError as e:
+                # 4xx other than 429 will not succeed on retry
+                error = str(e)
+                break
+            except httpx.HTTPError as e:
+                error = str(e) or type(e).__name__
+        return error
+
+    def _dead_letter(self, task_id: str, endpoint: str, events: List[Dict[str, Any]], error: str):
+        self.failed += 1
+        self.dead_letters.append({"task_id": task_id, "endpoint": endpoint, "events": events, "error": error, "failed_at": time.time()})
+        logfire.error("push_delivery_failed", task_id=task_id, endpoint=endpoint, error=error)
+
+    def stats(self) -> Dict[str, Any]:
+        latencies = sorted(self._latencies)
+        def pct(p: float) -> float:
+            return latencies[min(int(p * len(latencies)), len(latencies) - 1)] if latencies else 0.0
+        return {
+            "delivered": self.delivered,
+            "failed": self.failed,
+            "retries": self.retries,
+            "pending_tasks": len(self._pending),
+            "dead_letters": len(self.dead_letters),
+            "latency_p50": pct(0.5),
+            "latency_p95": pct(0.95),
+            "latency_max": latencies[-1] if latencies else 0.0,
+        }
+
+
+push_delivery = PushDeliveryService(
+    task_store,
+    batch_window=float(os.getenv("A2A_PUSH_BATCH_WINDOW", "0.05")),
+    per_host_limit=int(os.getenv("A2A_PUSH_PER_HOST", "10")),
+    max_retries=int(os.getenv("A2A_PUSH_MAX_RETRIES", "5")),
+    timeout=float(os.getenv("A2A_PUSH_TIMEOUT", "10")),
+    shutdown_grace=float(os.getenv("A2A_PUSH_SHUTDOWN_GRACE", "5")),
+)
+task_store.add_listener(push_delivery.on_event)
@@ -0,0 +1,86 @@
+import asyncio
+import os
+from typing import Optional
+
+import logfire
+from shared.models import TaskStore
+from shared.task_retention import RetentionPolicy
+from server.task_store import task_store
+
+
+def _optional(name: str, cast):
+    value = os.getenv(name)
+    return cast(value) if value else None
+
+
+class RetentionSweeper:
+    """
+    Background task that periodically applies a RetentionPolicy to a TaskStore.
+
+    Evictions are done in bounded batches. Each batch's archive documents are
+    built on the event loop, then compressed and written by a worker thread;
+    a task is only forgotten once its archive write has succeeded.
+
+    Args:
+        store (TaskStore): The store to sweep.
+        policy (RetentionPolicy): Limits to enforce.
+        interval (float): Seconds between sweeps.
+        batch_size (int): Maximum evictions per batch.
+    """
+    def __init__(self, store: TaskStore, policy: RetentionPolicy, interval: float = 30.0, batch_size: int = 500):
+        self.store = store
+        self.policy = policy
+        self.interval = interval
+        self.batch_size = batch_size
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        p = self.policy
+        return any(v is not None for v in (p.max_tasks, p.max_bytes, p.terminal_ttl))
+
+    def start(self):
+        if self._task is None and self.enabled:
+            self._task = asyncio.create_task(self._run(), name="retention-sweeper")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def sweep(self) -> int:
+        total = 0
+        while True:
+            task_ids = self.store.plan_sweep(self.policy, limit=self.batch_size)
+            if task_ids and self.store.archive is not None:
+                documents = self.store.archive_documents(task_ids)
+                task_ids = await asyncio.to_thread(self.store.archive.put_many, documents)
+            evicted = self.store.drop(task_ids)
+            total += evicted
+            # A short batch means the policy is met, or archive writes failed and are retried next sweep
+            if evicted < self.batch_size:
+                return total
+            await asyncio.sleep(0)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                evicted = await self.sweep()
+            except Exception as e:
+                logfire.error("retention_sweep_failed", error=str(e))
+                continue
+            if evicted:
+                logfire.info("retention_sweep", evicted=evicted, **self.store.memory_stats())
+
+
+retention_sweeper = RetentionSweeper(
+    task_store,
+    RetentionPolicy(
+        max_tasks=_optional("A2A_TASK_MAX_TASKS", int),
+        max_bytes=_optional("A2A_TASK_MAX_BYTES", int),
+        terminal_ttl=_optional("A2A_TASK_TERMINAL_TTL", float),
+    ),
+    interval=float(os.getenv("A2A_TASK_SWEEP_INTERVAL", "30")),
+)
@@ -0,0 +1,135 @@
+import json
+import os
+import tempfile
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import logfire
+
+
+class TTLLRUCache:
+    """
+    Bounded in-memory cache with per-entry TTL and LRU eviction.
+
+    Entries are evicted when they expire, when ``max_entries`` is exceeded, or
+    when the total encoded size of all values exceeds ``max_bytes``. Values must
+    be JSON-serializable so the cache can optionally be persisted to disk.
+
+    Args:
+        max_entries (int): Maximum number of entries kept.
+        max_bytes (int): Maximum total size of the JSON-encoded values.
+        ttl (float): Seconds an entry stays valid after it is stored.
+        path (Optional[str]): File used by ``load()``/``save()``; ``None`` keeps the cache memory-only.
+    """
+    def __init__(self, max_entries: int = 256, max_bytes: int = 4 * 1024 * 1024,
+                 ttl: float = 3600.0, path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.path = path
+        # key -> (value, size in bytes, wall-clock expiry)
+        self._entries: "OrderedDict[str, Tuple[Any, int, float]]" = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        """True if ``key`` has an unexpired entry; does not count as a hit or miss."""
+        entry = self._entries.get(key)
+        return entry is not None and entry[2] > time.time()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for ``key`` or ``None`` on a miss or expired entry."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        value, size, expires_at = entry
+        if expires_at <= time.time():
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """Store ``value`` under ``key``; values larger than ``max_bytes`` are not cached."""
+        size = len(json.dumps(value).encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (value, size, time.time() + (self.ttl if ttl is None else ttl))
+        self.total_bytes += size
+        self._enforce_limits()
+
+    def _remove(self, key: str):
+        _, size, _ = self._entries.pop(key)
+        self.total_bytes -= size
+
+    def _enforce_limits(self):
+        while self._entries and (len(self._entries) > self.max_entries or self.total_bytes > self.max_bytes):
+            key = next(iter(self._entries))
+            self._remove(key)
+            self.evictions += 1
+
+    def clear(self):
+        """Drop every entry and reset the hit, miss and eviction counters."""
+        self._entries.clear()
+        self.total_bytes = 0
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def load(self):
+        """Load unexpired entries from ``path`` if persistence is enabled."""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except Exception as e:
+            logfire.error("cache_load_failed", path=self.path, error=str(e))
+            return
+        now = time.time()
+        for key, value, expires_at in data.get("entries", []):
+            if expires_at > now:
+                self.set(key, value, ttl=expires_at - now)
+        logfire.info("cache_loaded", path=self.path, entries=len(self._entries))
+
+    def save(self):
+        """Atomically write unexpired entries to ``path`` if persistence is enabled."""
+        if not self.path:
+            return
+        now = time.time()
+        entries = [[k, v, exp] for k, (v, _, exp) in self._entries.items() if exp > now]
+        directory = os.path.dirname(os.path.abspath(self.path))
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".cache-")
+            with os.fdopen(fd, "w") as f:
+                json.dump({"entries": entries}, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logfire.error("cache_save_failed", path=self.path, error=str(e))
+            return
+        logfire.info("cache_saved", path=self.path, entries=len(entries))
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current size."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.total_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
@@ -1,32 +1,172 @@
 import asyncio
-import json
+import os
+from typing import Any, Dict, List, Optional, Tuple
 from fastapi import APIRouter, Request
 from fastapi.responses import StreamingResponse, JSONResponse
 import logfire
+from shared.models import TERMINAL_STATES
+from server.event_bus import event_bus
+from server.task_store import task_store
+from server.serialization import dumps_str, to_jsonable
 
 router = APIRouter()
 
+HEARTBEAT_INTERVAL = float(os.getenv("A2A_SSE_HEARTBEAT", "15"))
 
-def event_generator(task_id: str):
+
+def parse_last_event_id(last_event_id: Optional[str]) -> Tuple[int, int, Optional[int]]:
+    """
+    Parse a ``Last-Event-ID`` of the form ``"<transitions>.<artifacts>.<parts>"``.
+
+    Event ids are cursors into the task history: the number of transitions,
+    artifacts and parts the client has already received. The parts count is
+    ``None`` for two-field ids, meaning every part of the received artifacts.
+    Invalid ids replay everything.
     """
-    Simulate a server-sent event (SSE) stream of status updates for a given task.
+    if not last_event_id:
+        return 0, 0, 0
+    try:
+        fields = [max(int(f), 0) for f in last_event_id.split(".")]
+    except ValueError:
+        return 0, 0, 0
+    fields += [0] * (2 - len(fields))
+    return fields[0], fields[1], fields[2] if len(fields) > 2 else None
+
+
+def missed_parts(artifacts: List[Dict[str, Any]], seen_artifacts: int,
+                 seen_parts: Optional[int]) -> Tuple[List[Tuple[int, str, Dict[str, Any]]], int]:
+    """
+    Find parts appended to already received artifacts after the client's cursor.
+
+    Returns:
+        Tuple[list, int]: ``(seq, artifact_id, part)`` for each missed part,
+        and the part count covered by the first ``seen_artifacts`` artifacts.
+    """
+    missed = []
+    seq = 0
+    for artifact in artifacts[:seen_artifacts]:
+        for part in artifact["parts"]:
+            seq += 1
+            if seen_parts is not None and seq > seen_parts:
+                missed.append((seq, artifact["artifact_id"], part))
+    return missed, seq
+
+
+def format_sse(data: Any, event: Optional[str] = None, event_id: Optional[str] = None) -> str:
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event is not None:
+        lines.append(f"event: {event}")
+    lines.append(f"data: {dumps_str(data)}")
+    return "\n".join(lines) + "\n\n"
+
+
+def _cursor(cursor: Tuple[int, int, int]) -> str:
+    return f"{cursor[0]}.{cursor[1]}.{cursor[2]}"
+
+
+def _state_frame(task_id: str, transition: Dict[str, Any], cursor: Tuple[int, int, int]) -> str:
+    return format_sse({"task_id": task_id, **transition}, event_id=_cursor(cursor))
+
+
+def _artifact_frame(task_id: str, artifact: Any, cursor: Tuple[int, int, int]) -> str:
+    return format_sse({"task_id": task_id, "artifact": to_jsonable(artifact)}, event="artifact", event_id=_cursor(cursor))
+
+
+def _part_frame(task_id: str, artifact_id: str, part: Dict[str, Any], cursor: Tuple[int, int, int]) -> str:
+    return format_sse({"task_id": task_id, "artifact_id": artifact_id, "part": part}, event="part", event_id=_cursor(cursor))
+
+
+async def event_generator(task_id: str, request: Optional[Request] = None, last_event_id: Optional[str] = None):
+    """
+    Stream the real state transitions and artifacts of a task as server-sent events.
+
+    History after ``last_event_id`` is replayed from the task store first, then
+    live events from the event bus are forwarded until the task reaches a
+    terminal state. A comment line is sent as a heartbeat while idle.
 
     Args:
         task_id (str): The ID of the task to stream updates for.
+        request (Optional[Request]): Used to stop streaming when the client disconnects.
+        last_event_id (Optional[str]): Cursor of the last event the client received.
 
     Yields:
-        str: SSE-formatted strings containing task state updates.
+        str: SSE-formatted frames: state updates (default event), ``artifact``
+        events, ``part`` events for parts appended to an artifact while the
+        task runs, and a final ``close`` (or ``dropped`` for slow consumers) event.
     """
-    states = ["submitted", "working", "completed"]
-    for state in states:
-        asyncio.sleep(1)
-        event = {"task_id": task_id, "state": state}
-        yield f"data: {json.dumps(event)}\n\n"
-    yield "event: close\ndata: null\n\n"
+    # Subscribe before reading history so no event falls between replay and live delivery.
+    sub = event_bus.subscribe(task_id)
+    try:
+        described = task_store.describe(task_id)
+        if described is None:
+            yield "event: close\ndata: null\n\n"
+            return
+        seen_transitions, seen_artifacts, seen_parts = parse_last_event_id(last_event_id)
+        transitions = described["transitions"]
+        artifacts = described["artifacts"]
+        missed, covered = missed_parts(artifacts, seen_artifacts, seen_parts)
+        seen_parts = covered if seen_parts is None else seen_parts
+        for seq in range(seen_transitions + 1, len(transitions) + 1):
+            yield _state_frame(task_id, transitions[seq - 1], (seq, seen_artifacts, seen_parts))
+        seen_transitions = max(seen_transitions, len(transitions))
+        for seq, artifact_id, part in missed:
+            seen_parts = seq
+            yield _part_frame(task_id, artifact_id, part, (seen_transitions, seen_artifacts, seen_parts))
+        seen_parts = max(seen_parts, covered)
+        for seq in range(seen_artifacts + 1, len(artifacts) + 1):
+            seen_parts += len(artifacts[seq - 1]["parts"])
+            yield _artifact_frame(task_id, artifacts[seq - 1], (seen_transitions, seq, seen_parts))
+        seen_artifacts = max(seen_artifacts, len(artifacts))
+        if transitions and transitions[-1]["state"] in TERMINAL_STATES:
+            yield "event: close\ndata: null\n\n"
+            return
+        while True:
+            if sub.dropped and sub.queue.empty():
+                yield "event: dropped\ndata: null\n\n"
+                return
+            try:
+                event = await asyncio.wait_for(sub.queue.get(), timeout=HEARTBEAT_INTERVAL)
+            except asyncio.TimeoutError:
+                if request is not None and await request.is_disconnected():
+                    return
+                yield ": keep-alive\n\n"
+                continue
+            if event["kind"] == "transition":
+                if event["seq"] <= seen_transitions:
+                    continue
+                seen_transitions = event["seq"]
+                yield _state_frame(task_id, event["transition"], (seen_transitions, seen_artifacts, seen_parts))
+                if event["transition"]["state"] in TERMINAL_STATES:
+                    yield "event: close\ndata: null\n\n"
+                    return
+            elif event["kind"] == "artifact":
+                if event["seq"] <= seen_artifacts:
+                    continue
+                seen_artifacts = event["seq"]
+                seen_parts = event["part_seq"]
+                yield _artifact_frame(task_id, event["artifact"], (seen_transitions, seen_artifacts, seen_parts))
+            elif event["kind"] == "part":
+                if event["seq"] <= seen_parts:
+                    continue
+                seen_parts = event["seq"]
+                yield _part_frame(task_id, event["artifact_id"], event["part"], (seen_transitions, seen_artifacts, seen_parts))
+    finally:
+        event_bus.unsubscribe(sub)
+
+
+def event_stream_response(task_id: str, request: Request) -> StreamingResponse:
+    """Build the SSE response for a task, honouring the ``Last-Event-ID`` header."""
+    return StreamingResponse(
+        event_generator(task_id, request, request.headers.get("last-event-id")),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.get("/stream/{task_id}")
-def stream_task_status(task_id: str, request: Request):
+async def stream_task_status(task_id: str, request: Request):
     """
     Stream status updates for a task using server-sent events (SSE).
 
@@ -38,10 +178,8 @@ def stream_task_status(task_id: str, request: Request):
         StreamingResponse: SSE stream of task status updates, or JSON error if the
         task is unknown.
     """
-    from server.task_store import task_store
-    import logfire
-    logfire.info("sse_all_task_ids", all_task_ids=list(task_store.tasks.keys()), requested_task_id=task_id)
-    if task_id not in task_store.tasks:
+    if task_id not in task_store:
         logfire.error("stream_invalid_task_id", task_id=task_id)
         return JSONResponse(content={"error": "Task id unknown"}, status_code=404)
-    return StreamingResponse(event_generator(task_id), media_type="text/event-stream")
+    logfire.info("stream_task_status", task_id=task_id)
+    return event_stream_response(task_id, request)
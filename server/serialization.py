@@ -0,0 +1,46 @@
+import json
+import os
+from typing import Any
+
+from pydantic import BaseModel
+from starlette.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+# orjson is used when installed unless A2A_FAST_JSON=false; otherwise the stdlib encoder
+FAST_JSON = orjson is not None and os.getenv("A2A_FAST_JSON", "true").lower() != "false"
+
+
+def to_jsonable(value: Any) -> Any:
+    """Convert a pydantic model to JSON-safe builtins; other values are returned as is."""
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    return value
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """Encode ``content`` as compact UTF-8 JSON, with orjson when available."""
+    if FAST_JSON:
+        return orjson.dumps(content, default=_default)
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=_default
+    ).encode("utf-8")
+
+
+def dumps_str(content: Any) -> str:
+    return dumps(content).decode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """``JSONResponse`` rendered with ``dumps``; pydantic models in the content are encoded directly."""
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
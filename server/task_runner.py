@@ -0,0 +1,235 @@
+import asyncio
+import os
+import traceback
+import uuid
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import logfire
+from shared.models import TERMINAL_STATES, Artifact, Part
+from server.task_store import task_store
+from server.pipeline import PartSink, analyze_docker_config, result_artifact, service_artifacts
+
+
+class TaskRunner:
+    """
+    Bounded asyncio worker pool that executes submitted tasks in the background.
+
+    ``submit`` only enqueues the task id, so JSON-RPC handlers return as soon as
+    the task is recorded. A fixed number of workers pull ids from the queue and
+    run ``handler`` for each one. Running tasks can be cancelled by id. An
+    exception escaping ``handler`` is logged and passed to ``on_error``.
+
+    Args:
+        handler (Callable[[str], Awaitable[None]]): Coroutine function run for each task id.
+        workers (int): Number of concurrent workers.
+        queue_size (int): Maximum number of tasks waiting for a worker.
+        shutdown_grace (float): Seconds ``stop`` lets running tasks finish before cancelling them.
+        on_error (Optional[Callable[[str, BaseException], None]]): Called with the task id
+            and the exception when ``handler`` raises.
+    """
+    def __init__(self, handler: Callable[[str], Awaitable[None]], workers: int = 8, queue_size: int = 1000,
+                 shutdown_grace: float = 0.0, on_error: Optional[Callable[[str, BaseException], None]] = None):
+        self.handler = handler
+        self.workers = workers
+        self.queue_size = queue_size
+        self.shutdown_grace = shutdown_grace
+        self.on_error = on_error
+        self.started = False
+        self.stopping = False
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._running: Dict[str, asyncio.Task] = {}
+
+    def start(self):
+        """Start the worker tasks; must be called from a running event loop."""
+        if self.started:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._workers = [
+            asyncio.create_task(self._work(), name=f"task-worker-{i}") for i in range(self.workers)
+        ]
+        self.started = True
+        logfire.info("task_runner_started", workers=self.workers, queue_size=self.queue_size)
+
+    async def stop(self):
+        """
+        Let running tasks finish for up to ``shutdown_grace`` seconds, then cancel
+        them and the workers.
+
+        Queued tasks are not started; they stay ``submitted`` and are resumed
+        after a restart when the task log is durable.
+        """
+        if not self.started:
+            return
+        self.started = False
+        self.stopping = True
+        if self._running and self.shutdown_grace > 0:
+            await asyncio.wait(list(self._running.values()), timeout=self.shutdown_grace)
+        for job in list(self._running.values()):
+            job.cancel()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self.stopping = False
+        logfire.info("task_runner_stopped")
+
+    def full(self) -> bool:
+        return self.started and self._queue.full()
+
+    def submit(self, task_id: str) -> bool:
+        """
+        Queue a task for execution.
+
+        Returns:
+            bool: False if the queue is full or the runner is shutting down.
+        """
+        if self.stopping:
+            return False
+        if not self.started:
+            self.start()
+        try:
+            self._queue.put_nowait(task_id)
+        except asyncio.QueueFull:
+            return False
+        return True
+
+    def cancel(self, task_id: str) -> bool:
+        """Cancel the task if it is currently running. Queued tasks are skipped by state."""
+        job = self._running.get(task_id)
+        if job is None:
+            return False
+        job.cancel()
+        return True
+
+    async def _work(self):
+        while True:
+            task_id = await self._queue.get()
+            if not self.started:
+                # Shutting down: leave queued tasks for the next start
+                self._queue.task_done()
+                return
+            job = asyncio.ensure_future(self.handler(task_id))
+            self._running[task_id] = job
+            try:
+                await asyncio.wait([job])
+            except asyncio.CancelledError:
+                job.cancel()
+                raise
+            finally:
+                self._running.pop(task_id, None)
+                self._queue.task_done()
+            if not job.cancelled() and job.exception() is not None:
+                self._handler_failed(task_id, job.exception())
+
+    def _handler_failed(self, task_id: str, error: BaseException):
+        logfire.error("task_handler_failed", task_id=task_id, error=str(error),
+                      traceback="".join(traceback.format_exception(error)))
+        if self.on_error is not None:
+            try:
+                self.on_error(task_id, error)
+            except Exception as e:
+                logfire.error("task_error_callback_failed", task_id=task_id, error=str(e))
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "workers": self.workers,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "running": len(self._running),
+        }
+
+
+async def run_task(task_id: str):
+    """
+    Execute one task: ``submitted -> working -> completed`` or ``failed``.
+
+    While the analysis runs, each finding, best practice and diff hunk is
+    appended as a part to a ``docker_fix_stream`` artifact, so subscribers see
+    results as they are produced. The complete result is then stored as a
+    ``docker_fix_result`` artifact, preceded by one ``compose_service``
+    artifact per service for docker-compose input, and the seconds spent in
+    each pipeline stage are recorded on the ``completed`` transition. Tasks
+    cancelled while queued or running are left in the ``cancelled`` state.
+
+    Args:
+        task_id (str): The id of a task in ``task_store``.
+    """
+    if task_store.get_state(task_id) != "submitted":
+        return
+    task = task_store.get_task(task_id)
+    task_store.transition(task_id, "working")
+    try:
+        result = await analyze_docker_config(task.docker_config, stream_parts(task_id))
+    except asyncio.CancelledError:
+        if task_store.get_state(task_id) not in TERMINAL_STATES:
+            task_store.transition(task_id, "cancelled")
+        raise
+    except Exception as e:
+        logfire.error("task_failed", task_id=task_id, error=str(e), traceback=traceback.format_exc())
+        if task_store.get_state(task_id) not in TERMINAL_STATES:
+            task_store.transition(task_id, "failed", error=str(e))
+        return
+    if task_store.get_state(task_id) in TERMINAL_STATES:
+        return
+    for artifact in service_artifacts(result):
+        task_store.add_artifact(task_id, artifact)
+    task_store.add_artifact(task_id, result_artifact(result))
+    task_store.transition(task_id, "completed", stages=result.stage_durations)
+    logfire.info("task_completed", task_id=task_id)
+
+
+def stream_parts(task_id: str) -> PartSink:
+    """
+    Open a ``docker_fix_stream`` artifact on the task and return a sink that appends to it.
+
+    Parts produced after the task reached a terminal state (e.g. it was
+    cancelled) are dropped.
+    """
+    artifact_id = str(uuid.uuid4())
+    task_store.add_artifact(task_id, Artifact(
+        artifact_id=artifact_id, type="data", parts=[], metadata={"name": "docker_fix_stream"}
+    ))
+
+    def emit(kind: str, content: Dict):
+        if task_store.get_state(task_id) in TERMINAL_STATES:
+            return
+        part = Part(part_id=str(uuid.uuid4()), type="data", content=dict(content, kind=kind))
+        task_store.append_part(task_id, artifact_id, part)
+
+    return emit
+
+
+def resume_unfinished_tasks() -> int:
+    """
+    Requeue tasks recovered in the ``submitted`` state after a restart.
+
+    Tasks that were ``working`` when the server stopped are marked ``failed``,
+    since their partial progress was lost.
+
+    Returns:
+        int: Number of tasks requeued.
+    """
+    requeued = 0
+    for task_id in task_store.unfinished_task_ids():
+        if task_store.get_state(task_id) == "working":
+            task_store.transition(task_id, "failed", error="Interrupted by server restart")
+        elif task_runner.submit(task_id):
+            requeued += 1
+    if requeued:
+        logfire.info("tasks_requeued", count=requeued)
+    return requeued
+
+
+def mark_failed(task_id: str, error: BaseException):
+    """``TaskRunner.on_error``: fail a task whose handler raised, unless it already finished."""
+    if task_id in task_store and task_store.get_state(task_id) not in TERMINAL_STATES:
+        task_store.transition(task_id, "failed", error=str(error) or type(error).__name__)
+
+
+task_runner = TaskRunner(
+    run_task,
+    workers=int(os.getenv("A2A_TASK_WORKERS", "8")),
+    queue_size=int(os.getenv("A2A_TASK_QUEUE_SIZE", "1000")),
+    shutdown_grace=float(os.getenv("A2A_TASK_SHUTDOWN_GRACE", "5")),
+    on_error=mark_failed,
+)
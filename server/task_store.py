@@ -1,4 +1,21 @@
 # Shared task store to avoid circular imports
+import os
 from shared.models import TaskStore
+from shared.task_log import AppendOnlyLogBackend
+from shared.task_retention import TaskArchive
+from server.event_bus import event_bus
 
-task_store = TaskStore()
+_log_dir = os.getenv("A2A_TASK_LOG_DIR")
+_archive_dir = os.getenv("A2A_TASK_ARCHIVE_DIR")
+task_store = TaskStore(
+    backend=AppendOnlyLogBackend(
+        _log_dir,
+        snapshot_every=int(os.getenv("A2A_TASK_SNAPSHOT_EVERY", "100000")),
+        fsync=os.getenv("A2A_TASK_LOG_FSYNC", "false").lower() == "true",
+    ) if _log_dir else None,
+    archive=TaskArchive(_archive_dir) if _archive_dir else None,
+)
+# Rebuild tasks persisted before a restart (no-op without A2A_TASK_LOG_DIR)
+task_store.recover()
+# Fan out transitions and artifacts to SSE subscribers
+task_store.add_listener(event_bus.publish)
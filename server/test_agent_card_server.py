@@ -19,3 +19,22 @@ def test_agent_card_fields():
     assert isinstance(card["skills"], list)
     assert isinstance(card["capabilities"], dict)
     assert isinstance(card["authentication"], dict)
+
+
+def test_agent_card_revalidates_with_etag():
+    from fastapi.testclient import TestClient
+
+    from server.agent import AGENT_CARD_ETAG, app, etag_matches
+
+    assert etag_matches(f'"other", W/{AGENT_CARD_ETAG}', AGENT_CARD_ETAG)
+    assert etag_matches("*", AGENT_CARD_ETAG) and not etag_matches('"other"', AGENT_CARD_ETAG)
+    client = TestClient(app)
+    first = client.get("/.well-known/agent.json")
+    assert first.status_code == 200 and first.headers["etag"] == AGENT_CARD_ETAG
+    assert "max-age=" in first.headers["cache-control"]
+    for if_none_match in (AGENT_CARD_ETAG, f"W/{AGENT_CARD_ETAG}"):
+        revalidated = client.get("/.well-known/agent.json", headers={"If-None-Match": if_none_match})
+        assert revalidated.status_code == 304 and revalidated.content == b""
+        assert revalidated.headers["etag"] == AGENT_CARD_ETAG
+    changed = client.get("/.well-known/agent.json", headers={"If-None-Match": '"stale"'})
+    assert changed.status_code == 200 and changed.json()["name"] == first.json()["name"]
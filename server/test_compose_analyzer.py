@@ -0,0 +1,64 @@
+from server.compose_analyzer import analyze_service, parse_compose
+
+COMPOSE = """\
+x-base: &base
+  privileged: true
+services:
+  web:
+    image: nginx:1.25
+    ports:
+      - "127.0.0.1:8080:80"
+      - "443:443"
+    volumes:
+      - /var/run/docker.sock:/var/run/docker.sock:ro
+      - data:/data
+  worker:
+    <<: *base
+    image: redis
+    user: "0:0"
+    cap_add: [NET_BIND_SERVICE, SYS_ADMIN]
+    network_mode: host
+  api:
+    build:
+      context: ./api
+      dockerfile_inline: |
+        FROM python:3.12
+        ADD . /app
+        USER app
+  safe:
+    image: postgres:16
+    user: postgres
+    ports:
+      - target: 5432
+        published: 5432
+        host_ip: 127.0.0.1
+volumes:
+  data: {}
+"""
+
+
+def findings(service):
+    return [(issue.rule, issue.line) for issue in analyze_service(service)]
+
+
+def test_services_are_parsed_with_lines():
+    services = {s.name: s for s in parse_compose(COMPOSE)}
+    assert list(services) == ["web", "worker", "api", "safe"]
+    assert services["web"].line == 4 and services["web"].line_of("ports") == 6
+    assert services["worker"].config["privileged"] is True
+    assert services["api"].build["context"] == "./api" and services["api"].image is None
+
+
+def test_runtime_settings_and_inline_dockerfiles_are_checked():
+    services = {s.name: s for s in parse_compose(COMPOSE)}
+    assert findings(services["web"]) == [("CMP004", 6), ("CMP005", 9)]
+    # Settings merged from an anchor are reported where the anchor sets them
+    assert findings(services["worker"]) == [("CMP001", 2), ("CMP008", 14), ("CMP003", 15), ("CMP002", 16), ("CMP006", 17)]
+    assert findings(services["api"]) == [("DL3020", 23)]
+    assert findings(services["safe"]) == []
+
+
+def test_non_compose_text_is_not_parsed():
+    assert parse_compose("FROM python:3.12\nRUN echo services\n") is None
+    assert parse_compose("services: [web]\n") is None
+    assert parse_compose("services:\n  web: [\n") is None
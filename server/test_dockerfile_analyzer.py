@@ -0,0 +1,93 @@
+import time
+
+from server.dockerfile_analyzer import RuleEngine, analyze_dockerfile, image_tag, parse_dockerfile
+
+
+def rules(text):
+    return [issue.rule for issue in analyze_dockerfile(text)]
+
+
+def test_parse_continuations_heredocs_and_stages():
+    text = (
+        "# escape=\\\n"
+        "FROM golang:1.22 AS build\n"
+        "RUN apt-get update && \\\n"
+        "    # comments inside continuations are dropped\n"
+        "    apt-get install -y git\n"
+        "RUN <<EOF\n"
+        "echo one\n"
+        "echo two\n"
+        "EOF\n"
+        "FROM alpine:3.19\n"
+        "COPY --from=build /out /app\n"
+    )
+    parsed = parse_dockerfile(text)
+    assert [i.cmd for i in parsed.instructions] == ["FROM", "RUN", "RUN", "FROM", "COPY"]
+    run = parsed.instructions[1]
+    assert run.args == "apt-get update && apt-get install -y git"
+    assert (run.line, run.end_line) == (3, 5)
+    assert parsed.instructions[2].heredocs == ["echo one\necho two"]
+    assert [(s.image, s.name) for s in parsed.stages] == [("golang:1.22", "build"), ("alpine:3.19", None)]
+    assert parsed.instructions[4].stage == 1
+
+
+def test_rules_report_violations_with_lines():
+    text = (
+        "FROM ubuntu:latest\n"
+        "MAINTAINER someone\n"
+        "ENV DB_PASSWORD=hunter2\n"
+        "ADD app.py /app/\n"
+        "RUN sudo apt-get install -y curl\n"
+        "USER root\n"
+        "CMD python app.py\n"
+    )
+    issues = analyze_dockerfile(text)
+    found = {(i.rule, i.line) for i in issues}
+    assert {("DL3007", 1), ("DL4000", 2), ("SEC001", 3), ("DL3020", 4), ("DL3004", 5),
+            ("DL3009", 5), ("DL3015", 5), ("DL3025", 7), ("DL3002", 6)} <= found
+
+
+def test_clean_multi_stage_dockerfile():
+    text = (
+        "FROM python:3.12-slim AS build\n"
+        "WORKDIR /src\n"
+        "COPY . .\n"
+        "FROM python:3.12-slim\n"
+        "COPY --from=build /src /app\n"
+        "RUN apt-get update && apt-get install -y --no-install-recommends tini \\\n"
+        "    && rm -rf /var/lib/apt/lists/*\n"
+        "USER app\n"
+        'CMD ["python", "/app/main.py"]\n'
+    )
+    assert rules(text) == []
+    assert "DL3022" in rules(text.replace("--from=build", "--from=builder"))
+    assert "SEC002" in rules(text.replace("USER app\n", ""))
+
+
+def test_rules_only_see_declared_instructions():
+    engine = RuleEngine()
+    seen = []
+
+    @engine.rule("T001", "test", "RUN")
+    def record(ins, ctx):
+        seen.append(ins.cmd)
+        return False
+
+    engine.analyze(parse_dockerfile("FROM a:1\nCOPY x y\nRUN true\nENV A=b\nRUN false\n"))
+    assert seen == ["RUN", "RUN"]
+
+
+def test_compose_yaml_is_skipped_and_large_files_are_fast():
+    assert analyze_dockerfile("services:\n  web:\n    image: nginx\n") == []
+    text = "FROM debian:12\n" + "RUN echo hello | tee -a /log \\\n    && true\n" * 500
+    started = time.perf_counter()
+    issues = analyze_dockerfile(text)
+    assert time.perf_counter() - started < 0.5
+    assert sum(1 for i in issues if i.rule == "DL4006") == 500
+
+
+def test_image_tag_splits_registry_ports_and_digests():
+    assert image_tag("python:3.12") == ("python", "3.12")
+    assert image_tag("registry:5000/app") == ("registry:5000/app", None)
+    assert image_tag("registry:5000/app:1.0") == ("registry:5000/app", "1.0")
+    assert image_tag("alpine@sha256:abc") == ("alpine@sha256:abc", "@digest")
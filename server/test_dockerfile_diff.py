@@ -0,0 +1,59 @@
+import random
+
+from server.dockerfile_diff import diff_json, iter_hunks
+
+
+def apply_hunks(old_text, hunks):
+    old = old_text.splitlines()
+    out, pos = [], 0
+    for hunk in hunks:
+        start = hunk["old_start"] - 1 if hunk["old_lines"] else hunk["old_start"]
+        out.extend(old[pos:start])
+        pos = start
+        for line in hunk["lines"]:
+            if line[0] == "+":
+                out.append(line[1:])
+                continue
+            assert old[pos] == line[1:]
+            if line[0] == " ":
+                out.append(line[1:])
+            pos += 1
+    return out + old[pos:]
+
+
+def test_instruction_diff_replaces_whole_instructions():
+    old = "FROM python:3.12\nRUN apt-get update && \\\n    apt-get install -y curl\nCMD [\"python\"]\n"
+    new = "FROM python:3.12\nRUN apt-get update && \\\n    apt-get install -y wget\nCMD [\"python\"]\n"
+    hunks = list(iter_hunks(old, new, context=0))
+    assert len(hunks) == 1
+    assert hunks[0]["old_start"] == 2 and hunks[0]["old_lines"] == 2
+    assert hunks[0]["lines"] == [
+        "-RUN apt-get update && \\", "-    apt-get install -y curl",
+        "+RUN apt-get update && \\", "+    apt-get install -y wget",
+    ]
+
+
+def test_separate_changes_become_separate_hunks():
+    old = "\n".join(f"  key{i}: {i}" for i in range(40))
+    new = old.replace("key5: 5", "key5: five").replace("key30: 30", "key30: thirty") + "\n  extra: 1"
+    result = diff_json(old, new)
+    assert [(h["old_start"], h["new_start"]) for h in result["hunks"]] == [(3, 3), (28, 28), (38, 38)]
+    assert result["added"] == 3 and result["removed"] == 2
+    assert apply_hunks(old, result["hunks"]) == new.splitlines()
+    assert diff_json(old, old)["hunks"] == []
+
+
+def test_random_edits_round_trip():
+    rng = random.Random(7)
+    vocab = ["FROM a:1", "RUN x \\", "  y", "RUN z", "# note", "", "COPY a b", "USER app"]
+    for _ in range(500):
+        old = [rng.choice(vocab) for _ in range(rng.randint(0, 25))]
+        new = list(old)
+        for _ in range(rng.randint(0, 5)):
+            if new and rng.random() < 0.5:
+                del new[rng.randrange(len(new))]
+            else:
+                new.insert(rng.randint(0, len(new)), rng.choice(vocab))
+        old_text, new_text = "\n".join(old), "\n".join(new)
+        hunks = list(iter_hunks(old_text, new_text, context=rng.choice([0, 1, 3])))
+        assert apply_hunks(old_text, hunks) == new_text.splitlines()
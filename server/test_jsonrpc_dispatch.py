@@ -0,0 +1,84 @@
+import asyncio
+from typing import Optional
+
+from server.jsonrpc_dispatch import MethodRegistry, _dispatch_batch, _dispatch_one
+
+METHODS = MethodRegistry()
+
+
+@METHODS.register("echo")
+async def slow_echo(value: str, delay: float = 0.0):
+    await asyncio.sleep(delay)
+    return {"value": value}
+
+
+@METHODS.register("fail")
+def fail(id: str, token: Optional[str] = None, count: int = 0):
+    return {"error": {"code": -32001, "message": "Task id unknown"}}
+
+
+def call(req):
+    return asyncio.run(_dispatch_one({"jsonrpc": "2.0", "id": 1, **req}, METHODS))
+
+
+def test_batch_returns_responses_in_request_order():
+    batch = [
+        {"jsonrpc": "2.0", "id": 1, "method": "echo", "params": {"value": "a", "delay": 0.02}},
+        {"jsonrpc": "2.0", "id": 2, "method": "echo", "params": {"value": "b"}},
+        {"jsonrpc": "2.0", "id": 3, "method": "fail", "params": {"id": "x"}},
+        {"jsonrpc": "2.0", "id": 4, "method": "missing"},
+        42,
+    ]
+    responses = asyncio.run(_dispatch_batch(batch, METHODS))
+    assert [r["id"] for r in responses] == [1, 2, 3, 4, None]
+    assert responses[0]["result"] == {"value": "a"}
+    assert responses[2]["error"]["code"] == -32001
+    assert responses[3]["error"]["code"] == -32601
+    assert responses[4]["error"]["code"] == -32600
+
+
+def test_notifications_get_no_response():
+    notification = {"jsonrpc": "2.0", "method": "echo", "params": {"value": "a"}}
+    assert asyncio.run(_dispatch_one(notification, METHODS)) is None
+    assert asyncio.run(_dispatch_batch([notification, notification], METHODS)) is None
+    responses = asyncio.run(_dispatch_batch([notification, {**notification, "id": 7}], METHODS))
+    assert [r["id"] for r in responses] == [7]
+    assert asyncio.run(_dispatch_batch([], METHODS))["error"]["code"] == -32600
+
+
+def test_params_are_validated_before_the_call():
+    assert call({"method": "echo", "params": ["a", 0]})["result"] == {"value": "a"}
+    assert call({"method": "fail", "params": {"id": "x", "token": None}})["error"]["code"] == -32001
+    for params in (
+        {},
+        {"value": 1},
+        {"value": "a", "extra": True},
+        ["a", 0, 1],
+        "a",
+    ):
+        assert call({"method": "echo", "params": params})["error"]["code"] == -32602, params
+    assert call({"method": "fail", "params": {"id": "x", "count": True}})["error"]["code"] == -32602
+    assert call({"method": "fail", "params": {"id": None}})["error"]["code"] == -32602
+
+
+@METHODS.register("listing")
+def listing():
+    return ["error", "ok"]
+
+
+def test_malformed_requests_are_invalid():
+    for req in (
+        {"jsonrpc": "2.0", "id": 1},
+        {"jsonrpc": "2.0", "id": 1, "method": 5},
+        {"jsonrpc": "2.0", "id": 1, "method": None},
+        {"jsonrpc": "1.0", "id": 1, "method": "echo", "params": {"value": "a"}},
+        {"id": 1, "method": "echo", "params": {"value": "a"}},
+        {"jsonrpc": "2.0", "method": ["echo"]},
+    ):
+        response = asyncio.run(_dispatch_one(req, METHODS))
+        assert response["error"] == {"code": -32600, "message": "Invalid Request"}, req
+        assert response["id"] == req.get("id")
+
+
+def test_non_dict_results_are_returned_as_results():
+    assert call({"method": "listing"})["result"] == ["error", "ok"]
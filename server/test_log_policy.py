@@ -0,0 +1,50 @@
+import asyncio
+
+from server.log_policy import LogPolicy, parse_sample_rates
+
+
+def test_level_sampling_and_truncation():
+    policy = LogPolicy(level="info", sample_rates={"noisy": 0.0}, max_field_chars=8, max_items=2)
+    assert not policy.should_log("debug", "anything")
+    assert not policy.should_log("info", "noisy")
+    assert policy.should_log("error", "anything")
+    assert policy.sampled_out == 1
+    assert policy.truncate("x" * 20) == "xxxxxxxx...[20 chars]"
+    assert policy.truncate([1, 2, 3]) == [1, 2, "...1 more"]
+    headers = policy.headers([(b"authorization", b"Bearer secret"), (b"Content-Type", b"text")])
+    assert headers == {"content-type": "text"}
+    assert parse_sample_rates("a=0.5, b=2,bad") == {"a": 0.5, "b": 1.0}
+
+
+def test_queue_is_bounded_and_drained(monkeypatch):
+    emitted = []
+    policy = LogPolicy(queue_size=2)
+    monkeypatch.setattr(policy, "_emit", lambda level, event, fields: emitted.append(event))
+
+    async def run():
+        policy.start()
+        for i in range(3):
+            policy.info(f"event-{i}")
+        await policy.stop()
+
+    asyncio.run(run())
+    assert emitted == ["event-0", "event-1"]
+    assert policy.dropped == 1
+
+
+def test_dropped_events_are_not_truncated(monkeypatch):
+    policy = LogPolicy(queue_size=1, sample_rates={"hot": 0.0})
+    truncated = []
+    truncate = policy.truncate
+    monkeypatch.setattr(policy, "truncate", lambda value, depth=0: truncated.append(value) or truncate(value, depth))
+
+    async def run():
+        policy.start()
+        policy.info("kept", payload="a")
+        policy.info("overflow", payload="b")
+        policy.info("hot", payload="c")
+        await policy.stop()
+
+    asyncio.run(run())
+    assert truncated == ["a"]
+    assert policy.dropped == 1 and policy.sampled_out == 1
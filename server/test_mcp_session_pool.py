@@ -0,0 +1,113 @@
+import asyncio
+
+import pytest
+
+from server.mcp_session_pool import MCPSessionPool
+
+
+class FakeServer:
+    """Stands in for MCPServerStdio: an async context manager with ``list_tools()``."""
+    def __init__(self, name: str, fail_start: bool = False):
+        self.name = name
+        self.fail_start = fail_start
+        self.healthy = True
+        self.entered = False
+        self.exited = False
+
+    async def __aenter__(self):
+        if self.fail_start:
+            raise OSError("spawn failed")
+        self.entered = True
+        return self
+
+    async def __aexit__(self, *exc):
+        self.exited = True
+
+    async def list_tools(self):
+        if not self.healthy:
+            raise BrokenPipeError("server died")
+        return []
+
+
+def make_pool(size=1, fail_first=False, **options):
+    servers = []
+
+    def factory():
+        server = FakeServer(f"s{len(servers)}", fail_start=fail_first and not servers)
+        servers.append(server)
+        return server, f"agent-{server.name}"
+
+    options = {"checkout_timeout": 1.0, "respawn_backoff": 0.01, "health_interval": 60, **options}
+    return MCPSessionPool(factory, size=size, **options), servers
+
+
+async def wait_idle(pool: MCPSessionPool, count: int):
+    while pool.stats()["idle"] < count:
+        await asyncio.sleep(0.005)
+
+
+def test_checkout_is_limited_to_the_pool_size():
+    async def main():
+        pool, _ = make_pool(size=2, checkout_timeout=0.05)
+        await pool.start()
+        await wait_idle(pool, 2)
+        async with pool.checkout() as first, pool.checkout() as second:
+            assert {first, second} == {"agent-s0", "agent-s1"}
+            with pytest.raises(RuntimeError, match="Timed out"):
+                async with pool.checkout():
+                    pass
+        assert pool.stats()["idle"] == 2
+        async with pool.checkout() as agent:
+            assert agent in ("agent-s0", "agent-s1")
+        await pool.stop()
+        return pool
+
+    pool = asyncio.run(main())
+    assert pool.checkouts == 3
+
+
+def test_broken_session_is_evicted_and_replaced():
+    async def main():
+        pool, servers = make_pool(size=1)
+        await pool.start()
+        await wait_idle(pool, 1)
+        with pytest.raises(ValueError):
+            async with pool.checkout():
+                servers[0].healthy = False
+                raise ValueError("llm call failed")
+        # The failed call forces a probe; the dead server is retired and respawned
+        async with pool.checkout() as agent:
+            assert agent == "agent-s1"
+        await pool.stop()
+        return pool, servers
+
+    pool, servers = asyncio.run(main())
+    assert servers[0].exited and servers[1].exited
+    assert pool.health_failures == 1 and pool.respawns == 1
+
+
+def test_session_that_fails_to_start_is_respawned():
+    async def main():
+        pool, servers = make_pool(size=1, fail_first=True)
+        await pool.start()
+        async with pool.checkout() as agent:
+            assert agent == "agent-s1"
+        await pool.stop()
+        return pool, servers
+
+    pool, servers = asyncio.run(main())
+    assert not servers[0].entered and pool.respawns == 1
+
+
+def test_stop_closes_every_session():
+    async def main():
+        pool, servers = make_pool(size=3)
+        await pool.start()
+        await wait_idle(pool, 3)
+        async with pool.checkout():
+            await pool.stop()
+        return pool, servers
+
+    pool, servers = asyncio.run(main())
+    assert len(servers) == 3 and all(s.entered and s.exited for s in servers)
+    assert pool.stats()["alive"] == 0 and not pool.started
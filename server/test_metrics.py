@@ -0,0 +1,44 @@
+import asyncio
+
+from server import metrics
+from server.jsonrpc_dispatch import MethodRegistry, _dispatch_one
+from server.metrics import MetricsRegistry
+
+METHODS = MethodRegistry()
+
+
+@METHODS.register("metrics/echo")
+async def echo(value: str):
+    return {"value": value}
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry()
+    latency = registry.histogram("latency_seconds", "Latency.", ("method",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(value, "a")
+    lines = registry.render().splitlines()
+    assert lines[:2] == ["# HELP latency_seconds Latency.", "# TYPE latency_seconds histogram"]
+    assert 'latency_seconds_bucket{method="a",le="0.1"} 2' in lines
+    assert 'latency_seconds_bucket{method="a",le="1.0"} 3' in lines
+    assert 'latency_seconds_bucket{method="a",le="+Inf"} 4' in lines
+    assert 'latency_seconds_count{method="a"} 4' in lines
+
+
+def test_failing_callback_does_not_break_the_scrape():
+    registry = MetricsRegistry()
+    registry.callback("broken", "Raises.", lambda: 1 / 0)
+    registry.callback("tasks", "Tasks.", lambda: {"working": 2}, ("state",))
+    text = registry.render()
+    assert "broken" not in text
+    assert 'tasks{state="working"} 2' in text
+
+
+def test_dispatch_counts_calls_by_method_and_outcome():
+    ok = metrics.jsonrpc_requests.value("metrics/echo", "ok")
+    unknown = metrics.jsonrpc_requests.value("unknown", "error")
+    asyncio.run(_dispatch_one({"jsonrpc": "2.0", "id": 1, "method": "metrics/echo", "params": {"value": "x"}}, METHODS))
+    asyncio.run(_dispatch_one({"jsonrpc": "2.0", "id": 2, "method": "metrics/nope"}, METHODS))
+    assert metrics.jsonrpc_requests.value("metrics/echo", "ok") == ok + 1
+    assert metrics.jsonrpc_requests.value("unknown", "error") == unknown + 1
+    assert metrics.jsonrpc_duration.count("metrics/echo") >= 1
@@ -0,0 +1,165 @@
+import asyncio
+import time
+
+import server.pipeline as pipeline
+from shared.models import DockerConfig
+
+
+def analyze(text):
+    return asyncio.run(pipeline.analyze_docker_config(DockerConfig(raw_text=text)))
+
+
+def test_repeated_and_reformatted_input_reuse_the_search(monkeypatch):
+    searches = []
+
+    async def fake_search(query):
+        searches.append(query)
+        return "Use non-root USER"
+
+    monkeypatch.setattr(pipeline, "web_search", fake_search)
+    pipeline.reset_result_cache()
+    text = "FROM python:3.12\nADD app.py /app/\n"
+    first = analyze(text)
+    again = analyze(text)
+    assert again.model_dump(exclude={"stage_durations"}) == first.model_dump(exclude={"stage_durations"})
+    assert set(first.stage_durations) == {"rules", "search", "diff"} and again.stage_durations == {}
+    reformatted = analyze("# build image\nFROM   python:3.12\n\nADD app.py \\\n    /app/\n")
+    assert len(searches) == 1
+    assert reformatted.patched_text.startswith("# build image\nFROM   python:3.12")
+    assert "DL3020: Use COPY instead of ADD for files and folders (line 4)" in reformatted.issues_remaining
+    analyze("FROM python:3.12\nCOPY app.py /app/\n")
+    assert len(searches) == 2
+    stats = pipeline.result_cache_stats()
+    assert stats["hits"] == 2 and stats["misses"] == 2 and stats["rebuilt"] == 1
+
+
+def test_failed_searches_are_not_cached(monkeypatch):
+    async def failing_search(query):
+        raise RuntimeError("down")
+
+    monkeypatch.setattr(pipeline, "web_search", failing_search)
+    pipeline.reset_result_cache()
+    assert analyze("FROM alpine:3.19\n").best_practices == ["MCP Error: down"]
+    assert len(pipeline.result_cache) == 0
+
+
+def test_canonical_text_keeps_yaml_indentation():
+    assert pipeline.canonical_text("FROM a:1\n# c\nRUN  echo \\\n  hi\n") == "FROM a:1\nRUN echo hi"
+    nested = "services:\n  web:\n    image: nginx\n"
+    flat = "services:\n  web:\n  image: nginx\n"
+    assert pipeline.canonical_text(nested) != pipeline.canonical_text(flat)
+    assert pipeline.canonical_text(nested + "# comment\n\n") == pipeline.canonical_text(nested)
+
+
+def test_findings_stream_before_the_search_returns(monkeypatch):
+    parts = []
+
+    async def fake_search(query):
+        # Rules and search run concurrently; the search only has to return after the findings
+        await asyncio.sleep(0.05)
+        parts.append(("search", None))
+        return "Pin base images"
+
+    monkeypatch.setattr(pipeline, "web_search", fake_search)
+    pipeline.reset_result_cache()
+    text = "FROM python\nADD app.py /app/\n"
+    result = asyncio.run(pipeline.analyze_docker_config(DockerConfig(raw_text=text), lambda k, c: parts.append((k, c))))
+    kinds = [kind for kind, _ in parts]
+    assert kinds.index("search") > kinds.index("finding")
+    assert kinds[-1] == "hunk" and ("best_practice", {"text": "Pin base images"}) in parts
+    assert [c for k, c in parts if k == "hunk"] == result.diff_json["hunks"]
+    cached = []
+    asyncio.run(pipeline.analyze_docker_config(DockerConfig(raw_text=text), lambda k, c: cached.append((k, c))))
+    assert cached == [p for p in parts if p[0] != "search"]
+
+
+def test_compose_services_are_searched_concurrently(monkeypatch):
+    queries = []
+
+    async def slow_search(query):
+        queries.append(query)
+        await asyncio.sleep(0.2)
+        return f"Harden {query.split()[0]}"
+
+    monkeypatch.setattr(pipeline, "web_search", slow_search)
+    pipeline.reset_result_cache()
+    text = "services:\n" + "".join(
+        f"  svc{n}:\n    image: img{n % 10}:1.0\n    privileged: true\n" for n in range(50)
+    )
+    started = time.perf_counter()
+    result = analyze(text)
+    assert time.perf_counter() - started < 1.5
+    assert len(queries) == 10
+    assert [s.service for s in result.services] == [f"svc{n}" for n in range(50)]
+    assert result.services[13].best_practices == ["Harden img3"]
+    assert result.services[13].issues_remaining == ["CMP001: Do not run services privileged; it disables container isolation (line 43)"]
+    assert "svc13: CMP001" in result.issues_remaining[13] and len(result.best_practices) == 10 and result.issues_fixed == []
+    artifacts = pipeline.service_artifacts(result)
+    assert artifacts[0].metadata == {"name": "compose_service", "service": "svc0"}
+    assert "services" not in pipeline.result_artifact(result).parts[0].content
+
+
+def test_timed_out_search_returns_partial_results(monkeypatch):
+    async def hanging_search(query):
+        await asyncio.sleep(10)
+
+    monkeypatch.setattr(pipeline, "web_search", hanging_search)
+    monkeypatch.setattr(pipeline, "SEARCH_TIMEOUT", 0.1)
+    pipeline.reset_result_cache()
+    started = time.perf_counter()
+    result = analyze("FROM python\nADD app.py /app/\n")
+    assert time.perf_counter() - started < 1
+    assert result.best_practices == []
+    assert result.issues_remaining[-1] == "Stage search timed out after 0.1s; best practices are incomplete"
+    assert any(issue.startswith("DL3020") for issue in result.issues_remaining)
+    assert result.diff_json["hunks"] and 0.1 <= result.stage_durations["search"] < 0.5
+    assert len(pipeline.result_cache) == 0
+
+
+def test_overall_deadline_bounds_compose_searches(monkeypatch):
+    async def search(query):
+        await asyncio.sleep(0.05 if query.startswith("fast") else 10)
+        return f"Harden {query.split()[0]}"
+
+    monkeypatch.setattr(pipeline, "web_search", search)
+    monkeypatch.setattr(pipeline, "PIPELINE_TIMEOUT", 0.2)
+    pipeline.reset_result_cache()
+    result = analyze("services:\n  a:\n    image: fast:1\n  b:\n    image: slow:1\n")
+    assert [s.best_practices for s in result.services] == [["Harden fast"], []]
+    # The search used up the overall deadline, so the diff was skipped but the patched text is kept
+    assert result.issues_remaining == [
+        "Stage search timed out after 0.2s; best practices are incomplete",
+        "Stage diff timed out after 0.0s; diff_json is empty",
+    ]
+    assert result.diff_json["hunks"] == [] and result.patched_text.endswith("# Harden fast")
+
+
+def test_timed_out_search_finishes_and_is_reused(monkeypatch):
+    searches = []
+
+    async def slow_search(query):
+        searches.append(query)
+        await asyncio.sleep(0.2)
+        return f"Harden {query.split()[0]}"
+
+    monkeypatch.setattr(pipeline, "web_search", slow_search)
+    monkeypatch.setattr(pipeline, "SEARCH_TIMEOUT", 0.05)
+    pipeline.reset_result_cache()
+    dockerfile = DockerConfig(raw_text="FROM python\nADD app.py /app/\n")
+    compose = DockerConfig(raw_text="services:\n  a:\n    image: nginx:1\n  b:\n    image: redis:7\n")
+
+    async def main():
+        timed_out = [await pipeline.analyze_docker_config(config) for config in (dockerfile, compose)]
+        await asyncio.sleep(0.3)
+        reused = [await pipeline.analyze_docker_config(config) for config in (dockerfile, compose)]
+        return timed_out, reused
+
+    (first, first_compose), (second, second_compose) = asyncio.run(main())
+    assert first.best_practices == [] and [s.best_practices for s in first_compose.services] == [[], []]
+    assert len(searches) == 3
+    assert second.best_practices == ["Harden Dockerfile"]
+    assert [s.best_practices for s in second_compose.services] == [["Harden nginx"], ["Harden redis"]]
+    assert not any("timed out" in issue for issue in second.issues_remaining + second_compose.issues_remaining)
+    assert pipeline.result_cache_stats()["rebuilt"] == 0
+    assert all("result" in pipeline.result_cache.get(key) for key in (
+        pipeline.content_keys(dockerfile.raw_text)[0], pipeline.content_keys(compose.raw_text)[0]))
@@ -0,0 +1,121 @@
+import asyncio
+import json
+import time
+
+import httpx
+
+from server.push_delivery import PushDeliveryService
+from shared.models import DockerConfig, PushNotificationEndpoint, Task, TaskStore
+
+
+def make_service(handler, tasks=("t",), host="hooks.example", **options):
+    store = TaskStore()
+    for task_id in tasks:
+        store.create_task(Task(id=task_id, state="submitted", docker_config=DockerConfig(raw_text="FROM x")))
+        store.set_push_endpoint(task_id, PushNotificationEndpoint(endpoint=f"http://{host}/{task_id}", token="tok"))
+    options = {"batch_window": 0.01, "backoff_base": 0.01, **options}
+    service = PushDeliveryService(store, transport=httpx.MockTransport(handler), **options)
+    store.add_listener(service.on_event)
+    return store, service
+
+
+async def drain(service: PushDeliveryService):
+    while service._flushers:
+        await asyncio.gather(*list(service._flushers.values()))
+
+
+def test_events_within_the_window_are_posted_as_one_batch():
+    bodies = []
+
+    def handler(request):
+        assert request.headers["Authorization"] == "Bearer tok"
+        bodies.append(json.loads(request.content))
+        return httpx.Response(200)
+
+    async def main():
+        store, service = make_service(handler)
+        await service.start()
+        store.transition("t", "working")
+        store.transition("t", "completed")
+        await drain(service)
+        await service.stop()
+        return service
+
+    service = asyncio.run(main())
+    assert len(bodies) == 1
+    assert [e["transition"]["state"] for e in bodies[0]["events"]] == ["working", "completed"]
+    assert [e["seq"] for e in bodies[0]["events"]] == [2, 3]
+    assert service.delivered == 1
+
+
+def test_requests_to_one_host_are_capped():
+    active = {"now": 0, "max": 0}
+
+    async def handler(request):
+        active["now"] += 1
+        active["max"] = max(active["max"], active["now"])
+        await asyncio.sleep(0.02)
+        active["now"] -= 1
+        return httpx.Response(200)
+
+    async def main():
+        task_ids = [f"t{n}" for n in range(8)]
+        store, service = make_service(handler, tasks=task_ids, per_host_limit=2)
+        await service.start()
+        for task_id in task_ids:
+            store.transition(task_id, "working")
+        await drain(service)
+        await service.stop()
+        return service
+
+    service = asyncio.run(main())
+    assert service.delivered == 8 and active["max"] == 2
+
+
+def test_server_errors_are_retried_then_dead_lettered():
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.path)
+        if request.url.path == "/flaky" and len([c for c in calls if c == "/flaky"]) == 1:
+            return httpx.Response(503)
+        if request.url.path == "/down":
+            return httpx.Response(500)
+        if request.url.path == "/gone":
+            return httpx.Response(404)
+        return httpx.Response(200)
+
+    async def main():
+        store, service = make_service(handler, tasks=("flaky", "down", "gone"), max_retries=2)
+        await service.start()
+        for task_id in ("flaky", "down", "gone"):
+            store.transition(task_id, "working")
+        await drain(service)
+        await service.stop()
+        return service
+
+    service = asyncio.run(main())
+    assert calls.count("/flaky") == 2 and calls.count("/down") == 3 and calls.count("/gone") == 1
+    assert service.delivered == 1 and service.retries == 3
+    errors = {d["task_id"]: d["error"] for d in service.dead_letters}
+    assert set(errors) == {"down", "gone"}
+    assert errors["down"] == "HTTP 500" and "404" in errors["gone"]
+
+
+def test_stop_dead_letters_deliveries_stuck_in_backoff():
+    def handler(request):
+        return httpx.Response(503)
+
+    async def main():
+        store, service = make_service(handler, backoff_base=60, shutdown_grace=0.1)
+        await service.start()
+        store.transition("t", "working")
+        await asyncio.sleep(0.05)
+        started = time.perf_counter()
+        await service.stop()
+        return service, time.perf_counter() - started
+
+    service, elapsed = asyncio.run(main())
+    assert elapsed < 1
+    assert [d["error"] for d in service.dead_letters] == ["cancelled at shutdown"]
+    assert [e["transition"]["state"] for e in service.dead_letters[0]["events"]] == ["working"]
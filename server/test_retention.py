@@ -0,0 +1,91 @@
+import asyncio
+import threading
+import time
+
+from server.retention import RetentionSweeper
+from shared.models import Artifact, DockerConfig, Part, Task, TaskStore
+from shared.task_retention import RetentionPolicy, TaskArchive
+
+
+def add_task(store: TaskStore, task_id: str, state: str = "completed", **details):
+    store.create_task(Task(id=task_id, state="submitted", docker_config=DockerConfig(raw_text=f"FROM {task_id}")))
+    store.transition(task_id, "working")
+    if state != "working":
+        store.transition(task_id, state, **details)
+
+
+def test_expired_tasks_are_evicted_but_running_tasks_are_kept():
+    store = TaskStore()
+    add_task(store, "old")
+    add_task(store, "running", state="working")
+    assert store.sweep(RetentionPolicy(terminal_ttl=60)) == 0
+    assert store.sweep(RetentionPolicy(terminal_ttl=60), now=time.time() + 61) == 1
+    assert "old" not in store and "running" in store
+    assert store.state_counts() == {"working": 1}
+
+
+def test_transitions_count_towards_the_size_budget():
+    store = TaskStore()
+    add_task(store, "a")
+    before = store.total_bytes
+    store.transition("a", "completed", error="x" * 1000)
+    assert store.total_bytes - before >= 1000
+    assert store.total_bytes == sum(store._estimate_size(record) for record in store._records.values())
+
+
+def test_oldest_finished_tasks_are_evicted_to_meet_the_byte_limit():
+    store = TaskStore()
+    for n in range(4):
+        add_task(store, f"t{n}", state="failed", error="e" * 500)
+    per_task = store.total_bytes // 4
+    evicted = store.sweep(RetentionPolicy(max_bytes=2 * per_task))
+    assert evicted == 2 and [task_id for task_id in ("t0", "t1", "t2", "t3") if task_id in store] == ["t2", "t3"]
+    assert store.total_bytes <= 2 * per_task and store.evicted == 2
+
+
+def test_evicted_tasks_round_trip_through_the_archive(tmp_path):
+    store = TaskStore(archive=TaskArchive(str(tmp_path)))
+    add_task(store, "abc123")
+    store.add_artifact("abc123", Artifact(
+        artifact_id="art", type="data", parts=[Part(part_id="p", type="data", content={"patched_text": "FROM x\nUSER app"})],
+        metadata={"name": "docker_fix_result"},
+    ))
+    expected = store.describe("abc123")
+    store.evict("abc123")
+    assert "abc123" not in store and store.archive.archived == 1
+    archived = store.load_archived("abc123")
+    assert archived["task"].model_dump() == expected["task"]
+    assert archived["history"].transitions == expected["transitions"]
+    assert [a.model_dump() for a in archived["history"].artifacts] == expected["artifacts"]
+    assert store.load_archived("missing") is None
+    assert store.archive.get("../abc123") is None
+
+
+def test_sweeper_evicts_in_batches():
+    store = TaskStore()
+    for n in range(5):
+        add_task(store, f"t{n}")
+    sweeper = RetentionSweeper(store, RetentionPolicy(max_tasks=0), batch_size=2)
+    assert asyncio.run(sweeper.sweep()) == 5
+    assert len(store) == 0
+
+
+def test_sweeper_archives_off_the_loop_and_keeps_tasks_it_could_not_write(tmp_path, monkeypatch):
+    store = TaskStore(archive=TaskArchive(str(tmp_path)))
+    for n in range(4):
+        add_task(store, f"t{n}")
+    put = store.archive.put
+    threads = []
+
+    def flaky_put(task_id, document):
+        threads.append(threading.get_ident())
+        if task_id == "t2":
+            raise OSError("disk full")
+        put(task_id, document)
+
+    monkeypatch.setattr(store.archive, "put", flaky_put)
+    sweeper = RetentionSweeper(store, RetentionPolicy(max_tasks=0), batch_size=10)
+    assert asyncio.run(sweeper.sweep()) == 3
+    assert threading.get_ident() not in threads
+    assert "t2" in store and store.state_counts() == {"completed": 1}
+    assert store.load_archived("t0")["task"].id == "t0"
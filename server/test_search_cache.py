@@ -0,0 +1,56 @@
+from server.search_cache import TTLLRUCache
+
+
+def test_hit_miss_and_lru_eviction():
+    cache = TTLLRUCache(max_entries=2, ttl=60)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    assert cache.get("a") == "1"
+    cache.set("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert cache.get("c") == "3"
+    stats = cache.stats()
+    assert stats["hits"] == 3
+    assert stats["misses"] == 1
+    assert stats["evictions"] == 1
+
+
+def test_byte_limit_and_ttl():
+    cache = TTLLRUCache(max_entries=10, max_bytes=20, ttl=60)
+    cache.set("a", "x" * 10)
+    cache.set("b", "y" * 10)
+    assert cache.get("a") is None
+    assert cache.total_bytes <= 20
+    cache.set("c", "z", ttl=-1)
+    assert cache.get("c") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_persistence_round_trip(tmp_path):
+    path = str(tmp_path / "cache.json")
+    cache = TTLLRUCache(path=path, ttl=60)
+    cache.set("q", "answer")
+    cache.save()
+    restored = TTLLRUCache(path=path, ttl=60)
+    restored.load()
+    assert restored.get("q") == "answer"
+
+
+def test_clear_resets_counters():
+    cache = TTLLRUCache(max_entries=1, ttl=60)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    cache.get("a")
+    cache.get("b")
+    cache.clear()
+    stats = cache.stats()
+    assert len(cache) == 0 and stats["hits"] == stats["misses"] == stats["evictions"] == 0
+
+
+def test_contains_ignores_expired_entries_and_counters():
+    cache = TTLLRUCache(ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=-1)
+    assert "a" in cache and "b" not in cache and "c" not in cache
+    assert cache.hits == 0 and cache.misses == 0
@@ -0,0 +1,31 @@
+import asyncio
+import json
+
+from shared.models import Artifact, DockerConfig, Part, Task
+from server.send_subscribe_sse import event_generator, parse_last_event_id
+from server.task_store import task_store
+
+
+def frames(task_id, last_event_id=None):
+    async def collect():
+        return [frame async for frame in event_generator(task_id, last_event_id=last_event_id)]
+    return asyncio.run(collect())
+
+
+def test_parts_replay_from_a_three_field_cursor():
+    task_store.create_task(Task(id="sse-parts", state="submitted", docker_config=DockerConfig(raw_text="FROM a:1")))
+    task_store.transition("sse-parts", "working")
+    task_store.add_artifact("sse-parts", Artifact(artifact_id="stream", type="data"))
+    for n in range(3):
+        task_store.append_part("sse-parts", "stream", Part(part_id=f"p{n}", type="data", content={"n": n}))
+    task_store.add_artifact("sse-parts", Artifact(artifact_id="result", type="data", parts=[
+        Part(part_id="r", type="data", content={})
+    ]))
+    task_store.transition("sse-parts", "completed")
+
+    assert parse_last_event_id("2.1") == (2, 1, None)
+    resumed = frames("sse-parts", "2.1.1")
+    assert [f.split("\n")[0] for f in resumed] == ["id: 3.1.1", "id: 3.1.2", "id: 3.1.3", "id: 3.2.4", "event: close"]
+    assert json.loads(resumed[1].split("data: ")[1])["part"]["part_id"] == "p1"
+    # Two-field cursors from older clients already have every part of the artifacts they saw
+    assert frames("sse-parts", "2.1")[1].startswith("id: 3.2.4")
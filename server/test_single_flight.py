@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+
+from server.brave_mcp_client import SingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    calls = []
+
+    async def search():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "result"
+
+    async def main():
+        return await asyncio.gather(*(flight.do("q", search) for _ in range(5)))
+
+    assert asyncio.run(main()) == ["result"] * 5
+    assert len(calls) == 1
+    assert flight.stats() == {"calls": 1, "coalesced": 4, "abandoned": 0, "in_flight": 0}
+
+
+def test_exception_reaches_every_waiter():
+    flight = SingleFlight()
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("down")
+
+    async def main():
+        return await asyncio.gather(*(flight.do("q", failing) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert [str(r) for r in results] == ["down"] * 3 and all(isinstance(r, RuntimeError) for r in results)
+
+
+def test_cancelled_waiter_detaches_while_others_wait():
+    flight = SingleFlight()
+
+    async def search():
+        await asyncio.sleep(0.05)
+        return "result"
+
+    async def main():
+        first = asyncio.create_task(flight.do("q", search))
+        second = asyncio.create_task(flight.do("q", search))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(main()) == "result"
+    assert flight.stats()["abandoned"] == 0
+
+
+def test_call_after_last_waiter_cancelled_starts_a_fresh_task():
+    flight = SingleFlight()
+    started = []
+
+    async def search():
+        started.append(1)
+        await asyncio.sleep(0.05)
+        return "result"
+
+    async def main():
+        first = asyncio.create_task(flight.do("q", search))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        # The abandoned task's done callback has not run yet; this call must not join it
+        return await flight.do("q", search)
+
+    assert asyncio.run(main()) == "result"
+    assert len(started) == 2
+    assert flight.stats()["abandoned"] == 1 and flight.stats()["in_flight"] == 0
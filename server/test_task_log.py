@@ -0,0 +1,135 @@
+import json
+import os
+import threading
+
+from shared.models import DockerConfig, PushNotificationEndpoint, SnapshotView, Task, TaskStore
+from shared.task_log import AppendOnlyLogBackend
+
+
+def open_store(directory, snapshot_every=1000) -> TaskStore:
+    store = TaskStore(backend=AppendOnlyLogBackend(str(directory), snapshot_every=snapshot_every))
+    store.recover()
+    return store
+
+
+def create(store: TaskStore, task_id: str):
+    store.create_task(Task(id=task_id, state="submitted", docker_config=DockerConfig(raw_text=f"FROM {task_id}")))
+
+
+def lsns(path) -> list:
+    with open(path) as f:
+        return [json.loads(line)["lsn"] for line in f]
+
+
+def test_torn_last_line_is_dropped_on_replay(tmp_path):
+    store = open_store(tmp_path)
+    create(store, "a")
+    store.transition("a", "working")
+    store.close()
+    log_path = tmp_path / AppendOnlyLogBackend.LOG_FILE
+    with open(log_path, "a") as f:
+        f.write('{"op":"transition","id":"a","transition":{"state":"comp')
+    store = open_store(tmp_path)
+    assert store.get_state("a") == "working"
+    store.transition("a", "completed")
+    store.close()
+    assert lsns(log_path) == [1, 2, 3]
+    assert open_store(tmp_path).get_state("a") == "completed"
+
+
+def test_recovery_from_snapshot_plus_log(tmp_path):
+    store = open_store(tmp_path, snapshot_every=3)
+    for task_id in ("a", "b"):
+        create(store, task_id)
+        store.transition(task_id, "working")
+    store.transition("a", "completed", stages={"rules": 0.1})
+    store.close()
+    # The first three records went into the snapshot; the rest are in the log tail
+    assert lsns(tmp_path / AppendOnlyLogBackend.LOG_FILE) == [4, 5]
+    recovered = open_store(tmp_path)
+    assert len(recovered) == 2
+    for task_id in ("a", "b"):
+        assert recovered.describe(task_id) == store.describe(task_id)
+    assert recovered.state_counts() == {"completed": 1, "working": 1}
+
+
+def test_lsn_continues_across_compaction_and_restart(tmp_path):
+    store = open_store(tmp_path, snapshot_every=2)
+    create(store, "a")
+    store.transition("a", "working")
+    create(store, "b")
+    store.backend.wait_for_compaction()
+    with open(tmp_path / AppendOnlyLogBackend.SNAPSHOT_FILE) as f:
+        assert json.loads(f.readline()) == {"op": "header", "lsn": 2}
+    store.close()
+    store = open_store(tmp_path, snapshot_every=100)
+    assert store.backend.lsn == 3
+    store.transition("b", "working")
+    store.close()
+    assert lsns(tmp_path / AppendOnlyLogBackend.LOG_FILE) == [3, 4]
+    assert not [name for name in os.listdir(tmp_path) if name.startswith("tasks.log.")]
+
+
+def test_rotated_segment_is_replayed_if_the_snapshot_was_not_written(tmp_path):
+    store = open_store(tmp_path)
+    create(store, "a")
+    store.transition("a", "working")
+    # Crash after rotating the log but before the background snapshot write
+    store.backend.flush()
+    store.backend._rotate()
+    store.transition("a", "completed")
+    store.close()
+    recovered = open_store(tmp_path)
+    assert [t["state"] for t in recovered.describe("a")["transitions"]] == ["submitted", "working", "completed"]
+    assert recovered.backend.lsn == 3
+
+
+def test_appends_are_written_in_batches_by_the_writer_thread(tmp_path, monkeypatch):
+    store = TaskStore(backend=AppendOnlyLogBackend(str(tmp_path), fsync=True))
+    fsyncs = []
+    fsync = os.fsync
+    monkeypatch.setattr(os, "fsync", lambda fd: fsyncs.append(threading.current_thread().name) or fsync(fd))
+    gate = threading.Event()
+    # Hold the writer so the appends below queue up behind it
+    store.backend._send(gate.wait)
+    create(store, "a")
+    for n in range(49):
+        store.transition("a", "working", step=n)
+    assert not (tmp_path / AppendOnlyLogBackend.LOG_FILE).exists()
+    gate.set()
+    store.backend.flush()
+    assert lsns(tmp_path / AppendOnlyLogBackend.LOG_FILE) == list(range(1, 51))
+    assert fsyncs == ["task-log-writer"]
+    store.close()
+
+
+def test_snapshot_view_keeps_the_state_it_was_taken_at(tmp_path):
+    store = TaskStore()
+    for task_id in ("a", "b", "c"):
+        create(store, task_id)
+    expected = {task_id: store.describe(task_id) for task_id in ("a", "b", "c")}
+    view = SnapshotView(store)
+    store._snapshot = view
+    store.transition("a", "working")
+    store.set_push_endpoint("a", PushNotificationEndpoint(endpoint="http://hook"))
+    store.evict("b")
+    create(store, "d")
+    entries = list(view)
+    assert [e["task"]["id"] for e in entries] == ["a", "b", "c"]
+    assert all({k: e[k] for k in ("task", "transitions", "artifacts")} == expected[e["task"]["id"]] for e in entries)
+    assert "push" not in entries[0]
+    assert view.finished and store.get_state("a") == "working"
+
+
+def test_compaction_under_concurrent_changes_recovers_every_record(tmp_path):
+    store = open_store(tmp_path, snapshot_every=5)
+    for n in range(20):
+        create(store, f"t{n}")
+        store.transition(f"t{n}", "working")
+        if n % 3 == 0:
+            store.transition(f"t{n}", "completed")
+    store.close()
+    recovered = open_store(tmp_path)
+    assert len(recovered) == 20
+    for n in range(20):
+        assert recovered.describe(f"t{n}") == store.describe(f"t{n}")
@@ -0,0 +1,96 @@
+import asyncio
+
+from server.task_runner import TaskRunner, mark_failed
+from server.task_store import task_store
+from shared.models import DockerConfig, Task
+
+
+def test_workers_cap_concurrency():
+    active = {"now": 0, "max": 0}
+
+    async def handler(task_id):
+        active["now"] += 1
+        active["max"] = max(active["max"], active["now"])
+        await asyncio.sleep(0.01)
+        active["now"] -= 1
+
+    async def main():
+        runner = TaskRunner(handler, workers=2)
+        runner.start()
+        for n in range(6):
+            assert runner.submit(f"t{n}")
+        await runner._queue.join()
+        await runner.stop()
+
+    asyncio.run(main())
+    assert active["max"] == 2
+
+
+def test_full_queue_rejects_submissions():
+    async def main():
+        gate = asyncio.Event()
+
+        async def handler(task_id):
+            await gate.wait()
+
+        runner = TaskRunner(handler, workers=1, queue_size=1)
+        runner.start()
+        assert runner.submit("running")
+        await asyncio.sleep(0)
+        assert runner.submit("queued") and runner.full()
+        assert not runner.submit("rejected")
+        gate.set()
+        await runner._queue.join()
+        assert not runner.full()
+        await runner.stop()
+
+    asyncio.run(main())
+
+
+def test_handler_exceptions_fail_the_task():
+    errors = []
+
+    async def handler(task_id):
+        raise ValueError(f"bad {task_id}")
+
+    async def main():
+        runner = TaskRunner(handler, workers=1, on_error=lambda task_id, e: errors.append((task_id, str(e))))
+        runner.start()
+        runner.submit("t1")
+        await runner._queue.join()
+        await asyncio.sleep(0)
+        await runner.stop()
+
+    asyncio.run(main())
+    assert errors == [("t1", "bad t1")]
+    task_store.create_task(Task(id="runner-fail", state="submitted", docker_config=DockerConfig(raw_text="FROM x")))
+    mark_failed("runner-fail", ValueError("bad"))
+    assert task_store.describe("runner-fail")["transitions"][-1]["error"] == "bad"
+
+
+def test_stop_lets_running_tasks_finish_then_cancels_the_rest():
+    finished, cancelled, started = [], [], []
+
+    async def handler(task_id):
+        started.append(task_id)
+        try:
+            await asyncio.sleep(0.05 if task_id == "quick" else 10)
+            finished.append(task_id)
+        except asyncio.CancelledError:
+            cancelled.append(task_id)
+            raise
+
+    async def main():
+        runner = TaskRunner(handler, workers=2, shutdown_grace=0.2)
+        runner.start()
+        for task_id in ("quick", "slow", "queued"):
+            runner.submit(task_id)
+        await asyncio.sleep(0.01)
+        stopping = asyncio.create_task(runner.stop())
+        await asyncio.sleep(0)
+        assert not runner.submit("late")
+        await stopping
+
+    asyncio.run(main())
+    assert finished == ["quick"] and cancelled == ["slow"]
+    assert "queued" not in started
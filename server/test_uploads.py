@@ -0,0 +1,110 @@
+import asyncio
+import hashlib
+
+import pytest
+
+from server.uploads import UPLOAD_INVALID, UPLOAD_QUOTA, UploadError, UploadManager
+
+
+async def chunks(*pieces):
+    for piece in pieces:
+        yield piece
+
+
+def write(manager, upload_id, offset, data, sha256=None):
+    return asyncio.run(manager.write_chunk(upload_id, offset, chunks(data[:3], data[3:]), sha256))
+
+
+def test_resume_and_finalize(tmp_path):
+    manager = UploadManager(str(tmp_path), max_chunk=8)
+    data = b"FROM alpine:3.19\nUSER app\n"
+    upload_id = manager.create(size=len(data), sha256=hashlib.sha256(data).hexdigest())["upload_id"]
+    assert write(manager, upload_id, 0, data[:8])["offset"] == 8
+    with pytest.raises(UploadError) as gap:
+        write(manager, upload_id, 16, data[16:24])
+    assert gap.value.data == {"offset": 8}
+    # A retransmission overlapping accepted bytes is fine
+    assert write(manager, upload_id, 4, data[4:12])["offset"] == 12
+    with pytest.raises(UploadError) as incomplete:
+        asyncio.run(manager.finalize(upload_id))
+    assert incomplete.value.code == UPLOAD_INVALID
+    offset = manager.status(upload_id)["offset"]
+    while offset < len(data):
+        offset = write(manager, upload_id, offset, data[offset:offset + 8])["offset"]
+    assert asyncio.run(manager.finalize(upload_id)) == data.decode()
+    assert len(manager) == 0 and not list(tmp_path.iterdir())
+
+
+def test_bad_chunk_never_corrupts_accepted_bytes(tmp_path):
+    manager = UploadManager(str(tmp_path))
+    upload_id = manager.create()["upload_id"]
+    write(manager, upload_id, 0, b"FROM a:1\n")
+    with pytest.raises(UploadError):
+        write(manager, upload_id, 0, b"XXXXXXXXXXXX", sha256="0" * 64)
+    assert manager.status(upload_id)["offset"] == 9
+    write(manager, upload_id, 9, b"USER app\n", sha256=hashlib.sha256(b"USER app\n").hexdigest())
+    assert asyncio.run(manager.finalize(upload_id)) == "FROM a:1\nUSER app\n"
+
+
+def test_quotas_and_expiry(tmp_path):
+    manager = UploadManager(str(tmp_path), max_bytes=16, max_chunk=8, max_sessions=1, ttl=60)
+    with pytest.raises(UploadError) as too_big:
+        manager.create(size=17)
+    assert too_big.value.code == UPLOAD_QUOTA
+    upload_id = manager.create()["upload_id"]
+    with pytest.raises(UploadError) as big_chunk:
+        write(manager, upload_id, 0, b"x" * 9)
+    assert big_chunk.value.status == 413
+    with pytest.raises(UploadError):
+        manager.create()
+    assert manager.sweep(now=manager._sessions[upload_id].updated_at + 61) == 1
+    assert manager.create()["offset"] == 0
+
+
+def test_upload_is_kept_until_its_text_is_committed(tmp_path):
+    manager = UploadManager(str(tmp_path))
+    upload_id = manager.create()["upload_id"]
+    write(manager, upload_id, 0, b"FROM a:1\n")
+    assert asyncio.run(manager.read(upload_id)) == "FROM a:1\n"
+    with pytest.raises(UploadError) as busy:
+        write(manager, upload_id, 9, b"USER app\n")
+    assert busy.value.status == 409
+    assert manager.sweep(now=manager._sessions[upload_id].updated_at + 7200) == 0
+    # A failed submit hands the upload back for another try
+    manager.release(upload_id)
+    write(manager, upload_id, 9, b"USER app\n")
+    assert asyncio.run(manager.read(upload_id)) == "FROM a:1\nUSER app\n"
+    manager.commit(upload_id)
+    assert len(manager) == 0 and manager.completed == 1 and not list(tmp_path.iterdir())
+
+
+def test_idle_uploads_are_swept_in_the_background(tmp_path):
+    manager = UploadManager(str(tmp_path), ttl=0.01, sweep_interval=0.02)
+
+    async def main():
+        manager.start()
+        manager.create()
+        await asyncio.sleep(0.1)
+        await manager.stop()
+
+    asyncio.run(main())
+    assert len(manager) == 0 and manager.expired == 1 and not list(tmp_path.iterdir())
+
+
+def test_failed_submit_keeps_the_upload(tmp_path, monkeypatch):
+    import server.agent as agent
+
+    manager = UploadManager(str(tmp_path))
+    upload_id = manager.create()["upload_id"]
+    write(manager, upload_id, 0, b"FROM a:1\n")
+    responses = [{"error": {"code": -32003, "message": "Task queue full, retry later"}}, {"result": {"task": {}}}]
+
+    async def tasks_send(raw_text):
+        return responses.pop(0)
+
+    monkeypatch.setattr(agent, "upload_manager", manager)
+    monkeypatch.setattr(agent, "tasks_send", tasks_send)
+    assert asyncio.run(agent.uploads_finalize(upload_id))["error"]["code"] == -32003
+    assert manager.status(upload_id)["offset"] == 9
+    assert "result" in asyncio.run(agent.uploads_finalize(upload_id))
+    assert len(manager) == 0
@@ -0,0 +1,348 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+import time
+import uuid
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import logfire
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
+from starlette.requests import ClientDisconnect
+
+router = APIRouter()
+
+
+class UploadError(Exception):
+    """
+    An upload request that cannot be served.
+
+    Attributes:
+        code (int): JSON-RPC error code.
+        status (int): HTTP status for the chunk endpoint.
+        data (Optional[dict]): Extra error data, e.g. the offset to resume from.
+    """
+    def __init__(self, code: int, message: str, status: int = 400, data: Optional[Dict[str, Any]] = None):
+        super().__init__(message)
+        self.code = code
+        self.status = status
+        self.data = data
+
+    def to_error(self) -> Dict[str, Any]:
+        error = {"code": self.code, "message": str(self)}
+        if self.data:
+            error["data"] = self.data
+        return error
+
+
+UPLOAD_UNKNOWN = -32004
+UPLOAD_QUOTA = -32005
+UPLOAD_INVALID = -32006
+
+
+class UploadSession:
+    """
+    One resumable upload spooled to a temp file.
+
+    Attributes:
+        id (str): Upload id.
+        path (str): Spool file.
+        size (Optional[int]): Declared total size, if the client sent one.
+        sha256 (Optional[str]): Declared checksum of the whole file, if any.
+        received (int): Bytes received contiguously from offset 0; the resume offset.
+        updated_at (float): Time of the last accepted chunk.
+        finalizing (bool): True between ``read`` and ``commit``/``release``; no chunks are accepted.
+    """
+    __slots__ = ("id", "path", "size", "sha256", "received", "created_at", "updated_at", "lock", "finalizing")
+
+    def __init__(self, id: str, path: str, size: Optional[int], sha256: Optional[str]):
+        self.id = id
+        self.path = path
+        self.size = size
+        self.sha256 = sha256
+        self.received = 0
+        self.created_at = self.updated_at = time.time()
+        self.lock = asyncio.Lock()
+        self.finalizing = False
+
+    def status(self) -> Dict[str, Any]:
+        return {"upload_id": self.id, "offset": self.received, "size": self.size}
+
+
+class UploadManager:
+    """
+    Chunked, resumable uploads for configurations too large to inline in ``tasks_send``.
+
+    A session is created first; chunks are then written at explicit byte
+    offsets and streamed straight to a spool file, so a request body is never
+    held in memory. A chunk may start anywhere up to the current ``received``
+    offset, which makes retransmitting after a dropped connection safe: the
+    client asks for the status and continues from ``offset``. Each chunk can
+    carry a SHA-256 that is checked before the offset advances, and the whole
+    file can be checked on finalize. Spool file I/O runs in worker threads,
+    and ``start`` runs a periodic sweep that discards idle uploads.
+
+    Args:
+        directory (str): Directory for spool files.
+        max_bytes (int): Largest upload accepted.
+        max_chunk (int): Largest single chunk accepted.
+        max_sessions (int): Uploads that may be open at once.
+        ttl (float): Seconds an idle upload is kept before it is discarded.
+        sweep_interval (float): Seconds between background sweeps once started.
+    """
+    def __init__(self, directory: str, max_bytes: int = 10 * 1024 * 1024, max_chunk: int = 1024 * 1024,
+                 max_sessions: int = 64, ttl: float = 3600.0, sweep_interval: float = 60.0):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_chunk = max_chunk
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.sweep_interval = sweep_interval
+        self._sessions: Dict[str, UploadSession] = {}
+        self._sweeper: Optional[asyncio.Task] = None
+        self.completed = 0
+        self.expired = 0
+        self.rejected_chunks = 0
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _get(self, upload_id: str) -> UploadSession:
+        session = self._sessions.get(upload_id)
+        if session is None:
+            raise UploadError(UPLOAD_UNKNOWN, "Upload id unknown", status=404)
+        return session
+
+    @staticmethod
+    def _remove_file(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _discard(self, session: UploadSession):
+        self._sessions.pop(session.id, None)
+        self._remove_file(session.path)
+
+    def _expire(self, now: Optional[float] = None) -> List[UploadSession]:
+        """Forget uploads idle for longer than ``ttl`` and return them; their files are left to the caller."""
+        now = time.time() if now is None else now
+        stale = [s for s in self._sessions.values()
+                 if now - s.updated_at > self.ttl and not s.lock.locked() and not s.finalizing]
+        for session in stale:
+            self._sessions.pop(session.id, None)
+        self.expired += len(stale)
+        return stale
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Discard uploads idle for longer than ``ttl``."""
+        stale = self._expire(now)
+        for session in stale:
+            self._remove_file(session.path)
+        return len(stale)
+
+    async def sweep_async(self, now: Optional[float] = None) -> int:
+        """Like ``sweep``, with the spool files removed in a worker thread."""
+        stale = self._expire(now)
+        if stale:
+            await asyncio.to_thread(lambda: [self._remove_file(s.path) for s in stale])
+        return len(stale)
+
+    def start(self):
+        """Start sweeping idle uploads every ``sweep_interval`` seconds."""
+        if self._sweeper is None:
+            self._sweeper = asyncio.create_task(self._run(), name="upload-sweeper")
+
+    async def stop(self):
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            await asyncio.gather(self._sweeper, return_exceptions=True)
+            self._sweeper = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                expired = await self.sweep_async()
+            except Exception as e:
+                logfire.error("upload_sweep_failed", error=str(e))
+                continue
+            if expired:
+                logfire.info("upload_sweep", expired=expired, open=len(self._sessions))
+
+    def create(self, size: Optional[int] = None, sha256: Optional[str] = None) -> Dict[str, Any]:
+        """Open an upload session and return its status with the chunk size limit."""
+        if size is not None and (size < 0 or size > self.max_bytes):
+            raise UploadError(UPLOAD_QUOTA, f"Upload exceeds {self.max_bytes} bytes", status=413)
+        if len(self._sessions) >= self.max_sessions:
+            self.sweep()
+            if len(self._sessions) >= self.max_sessions:
+                raise UploadError(UPLOAD_QUOTA, "Too many open uploads, retry later", status=429)
+        os.makedirs(self.directory, exist_ok=True)
+        fd, path = tempfile.mkstemp(dir=self.directory, prefix="upload-")
+        os.close(fd)
+        session = UploadSession(str(uuid.uuid4()), path, size, sha256.lower() if sha256 else None)
+        self._sessions[session.id] = session
+        logfire.info("upload_created", upload_id=session.id, size=size)
+        return dict(session.status(), max_chunk=self.max_chunk)
+
+    def status(self, upload_id: str) -> Dict[str, Any]:
+        return self._get(upload_id).status()
+
+    async def write_chunk(self, upload_id: str, offset: int, body: AsyncIterator[bytes],
+                          sha256: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Stream one chunk into the spool file at ``offset``.
+
+        Raises:
+            UploadError: Unknown upload, an offset past the resume point, a
+            chunk or upload over quota, or a checksum mismatch. The resume
+            offset is unchanged in every error case.
+        """
+        session = self._get(upload_id)
+        async with session.lock:
+            if session.finalizing:
+                raise UploadError(UPLOAD_INVALID, "Upload is being finalized", status=409)
+            if offset < 0 or offset > session.received:
+                self.rejected_chunks += 1
+                raise UploadError(UPLOAD_INVALID, "Chunk offset past the resume point", status=409,
+                                  data={"offset": session.received})
+            limit = self.max_bytes if session.size is None else session.size
+            digest = hashlib.sha256()
+            written = 0
+            f = await asyncio.to_thread(open, session.path, "r+b")
+            try:
+                async for piece in body:
+                    position = offset + written
+                    written += len(piece)
+                    if written > self.max_chunk or offset + written > limit:
+                        self.rejected_chunks += 1
+                        raise UploadError(UPLOAD_QUOTA, "Chunk exceeds the upload quota", status=413,
+                                          data={"offset": session.received})
+                    digest.update(piece)
+                    # Bytes below the resume point are already stored; only new bytes are written,
+                    # so a bad retransmission can never corrupt accepted data
+                    skip = max(session.received - position, 0)
+                    if skip < len(piece):
+                        await asyncio.to_thread(_write_at, f, position + skip, piece[skip:])
+            finally:
+                await asyncio.to_thread(f.close)
+            if sha256 and digest.hexdigest() != sha256.lower():
+                self.rejected_chunks += 1
+                raise UploadError(UPLOAD_INVALID, "Chunk checksum mismatch", data={"offset": session.received})
+            session.received = max(session.received, offset + written)
+            session.updated_at = time.time()
+            return session.status()
+
+    async def read(self, upload_id: str, sha256: Optional[str] = None) -> str:
+        """
+        Check a complete upload and return its text, keeping the session.
+
+        The session stops accepting chunks until ``commit`` closes it once the
+        text has been used, or ``release`` reopens it.
+
+        Raises:
+            UploadError: Unknown upload, missing bytes, checksum mismatch or
+            content that is not UTF-8 text. Failed checks keep the session so
+            the client can resume.
+        """
+        session = self._get(upload_id)
+        if session.lock.locked():
+            raise UploadError(UPLOAD_INVALID, "Upload has a chunk in progress", status=409)
+        if session.finalizing:
+            raise UploadError(UPLOAD_INVALID, "Upload is being finalized", status=409)
+        if session.size is not None and session.received != session.size:
+            raise UploadError(UPLOAD_INVALID, "Upload incomplete", status=409, data={"offset": session.received})
+        session.finalizing = True
+        try:
+            data = await asyncio.to_thread(_read_prefix, session.path, session.received)
+            expected = (sha256 or session.sha256 or "").lower()
+            if expected and hashlib.sha256(data).hexdigest() != expected:
+                raise UploadError(UPLOAD_INVALID, "Upload checksum mismatch", data={"offset": session.received})
+            try:
+                return data.decode("utf-8")
+            except UnicodeDecodeError:
+                self._discard(session)
+                raise UploadError(UPLOAD_INVALID, "Upload is not UTF-8 text")
+        except BaseException:
+            session.finalizing = False
+            raise
+
+    def commit(self, upload_id: str):
+        """Close an upload whose text from ``read`` has been used."""
+        session = self._sessions.get(upload_id)
+        if session is None:
+            return
+        self._discard(session)
+        self.completed += 1
+        logfire.info("upload_finalized", upload_id=upload_id, size=session.received)
+
+    def release(self, upload_id: str):
+        """Reopen an upload after ``read`` so it can be finalized again later."""
+        session = self._sessions.get(upload_id)
+        if session is not None:
+            session.finalizing = False
+
+    async def finalize(self, upload_id: str, sha256: Optional[str] = None) -> str:
+        """Check a complete upload and return its text; the session is closed."""
+        text = await self.read(upload_id, sha256)
+        self.commit(upload_id)
+        return text
+
+    def abort(self, upload_id: str) -> Dict[str, Any]:
+        session = self._get(upload_id)
+        self._discard(session)
+        return {"upload_id": upload_id, "aborted": True}
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "open": len(self._sessions),
+            "spooled_bytes": sum(s.received for s in self._sessions.values()),
+            "completed": self.completed,
+            "expired": self.expired,
+            "rejected_chunks": self.rejected_chunks,
+        }
+
+
+def _write_at(f, position: int, data: bytes):
+    f.seek(position)
+    f.write(data)
+
+
+def _read_prefix(path: str, size: int) -> bytes:
+    with open(path, "rb") as f:
+        return f.read(size)
+
+
+upload_manager = UploadManager(
+    os.getenv("A2A_UPLOAD_DIR") or os.path.join(tempfile.gettempdir(), "a2a_uploads"),
+    max_bytes=int(os.getenv("A2A_UPLOAD_MAX_BYTES", str(10 * 1024 * 1024))),
+    max_chunk=int(os.getenv("A2A_UPLOAD_MAX_CHUNK", str(1024 * 1024))),
+    max_sessions=int(os.getenv("A2A_UPLOAD_MAX_SESSIONS", "64")),
+    ttl=float(os.getenv("A2A_UPLOAD_TTL", "3600")),
+    sweep_interval=float(os.getenv("A2A_UPLOAD_SWEEP_INTERVAL", "60")),
+)
+
+
+@router.api_route("/upload/chunk", methods=["POST", "PUT", "PATCH"])
+async def upload_chunk(request: Request, upload_id: str, offset: int):
+    """
+    Write the raw request body as one chunk of an upload at ``offset``.
+
+    The optional ``X-Chunk-SHA256`` header is checked before the chunk is
+    accepted. Responds with the upload status, whose ``offset`` is where the
+    next chunk starts; errors carry the offset to resume from.
+    """
+    try:
+        result = await upload_manager.write_chunk(
+            upload_id, offset, request.stream(), request.headers.get("x-chunk-sha256")
+        )
+    except UploadError as e:
+        logfire.error("upload_chunk_rejected", upload_id=upload_id, offset=offset, error=str(e))
+        return JSONResponse(status_code=e.status, content={"error": e.to_error()})
+    except ClientDisconnect:
+        # Nothing was accepted; the client resumes from the status offset
+        logfire.info("upload_chunk_disconnected", upload_id=upload_id, offset=offset)
+        return JSONResponse(status_code=400, content={"error": {"code": UPLOAD_INVALID, "message": "Client disconnected"}})
+    return JSONResponse(content=result)
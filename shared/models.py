@@ -1,5 +1,15 @@
+import json
+import threading
+import time
+from collections import OrderedDict
 from pydantic import BaseModel, Field
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Callable, Iterator, Tuple
+from shared.task_log import TaskStoreBackend
+from shared.task_records import ArtifactRecord, PartRecord, TaskRecord, monotonic_to_wall
+from shared.task_retention import RetentionPolicy, TaskArchive
+
+# Task states after which no further transitions happen
+TERMINAL_STATES = ("completed", "failed", "cancelled")
 
 
 class Part(BaseModel):
@@ -71,15 +81,453 @@ class PushNotificationEndpoint(BaseModel):
     token: Optional[str] = None
 
 
+class SnapshotView:
+    """
+    Copy-on-write view of a ``TaskStore`` at one point in its log, iterated
+    by the compaction thread while the store keeps changing.
+
+    Creating the view only copies the task table's references. Before the
+    store changes a task that the view has not read yet, it calls ``freeze``
+    to copy that task's snapshot record as it still is; the thread reads
+    every other task straight from its live record.
+    """
+    def __init__(self, store: "TaskStore"):
+        self.store = store
+        self._order = list(store._records)
+        self._pending = dict(store._records)
+        self._frozen: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.finished = False
+
+    def freeze(self, task_id: str):
+        with self._lock:
+            record = self._pending.pop(task_id, None)
+            if record is not None:
+                self._frozen[task_id] = self.store._snapshot_record(task_id, record)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        try:
+            for task_id in self._order:
+                with self._lock:
+                    entry = self._frozen.pop(task_id, None)
+                    record = self._pending.pop(task_id, None)
+                    if record is not None:
+                        entry = self.store._snapshot_record(task_id, record)
+                if entry is not None:
+                    yield entry
+        finally:
+            with self._lock:
+                self.finished = True
+                self._pending.clear()
+                self._frozen.clear()
+
+
 class TaskStore:
     """
     In-memory store for managing tasks, their histories, and notification
     endpoints. Used by the FastAPI server to track A2A task state and delivery.
+
+    Listeners registered with ``add_listener`` are called with ``(task_id, event)``
+    for every transition, artifact and appended part. Events carry ``kind``
+    (``"transition"``, ``"artifact"`` or ``"part"``), the payload, and ``seq``:
+    the 1-based position of the entry in the task history. Parts are numbered
+    across all artifacts of the task; artifact events also carry ``part_seq``,
+    the part count including the artifact's own parts.
+
+    Every mutation is also written to ``backend``; with a durable backend the
+    store is rebuilt after a restart by calling ``recover``.
+
+    ``sweep`` enforces a ``RetentionPolicy`` by evicting finished tasks; evicted
+    tasks are written to ``archive`` when one is configured and can still be
+    read with ``load_archived``.
     """
-    def __init__(self):
-        self.tasks: Dict[str, 'Task'] = {}
-        self.history: Dict[str, TaskHistory] = {}
+    # Rough fixed cost of a task's bookkeeping on top of its text payloads
+    TASK_OVERHEAD_BYTES = 256
+    # Rough cost of one transition: its state code and timestamp, plus any details
+    TRANSITION_OVERHEAD_BYTES = 16
+
+    def __init__(self, backend: Optional[TaskStoreBackend] = None, archive: Optional[TaskArchive] = None):
+        # Tasks are held as slotted records; pydantic models are only built on read
+        self._records: Dict[str, TaskRecord] = {}
         self.push_endpoints: Dict[str, PushNotificationEndpoint] = {}
+        self._listeners: List[Callable[[str, Dict[str, Any]], None]] = []
+        self.backend = backend if backend is not None else TaskStoreBackend()
+        self.archive = archive
+        # Finished tasks ordered by completion time
+        self._finished: "OrderedDict[str, float]" = OrderedDict()
+        self.total_bytes = 0
+        self.evicted = 0
+        # Tasks per current state, kept up to date so scrapes do not walk every record
+        self._state_counts: Dict[str, int] = {}
+        # Snapshot being written by the backend, if any
+        self._snapshot: Optional[SnapshotView] = None
+
+    def add_listener(self, listener: Callable[[str, Dict[str, Any]], None]):
+        self._listeners.append(listener)
+
+    def _notify(self, task_id: str, event: Dict[str, Any]):
+        for listener in self._listeners:
+            listener(task_id, event)
+
+    def _record(self, record: Dict[str, Any]):
+        self.backend.append(record)
+        if self.backend.should_compact():
+            # The view costs one pass over the task ids; the backend reads the
+            # tasks themselves off the caller's thread
+            self._snapshot = SnapshotView(self)
+            self.backend.start_compaction(self._snapshot)
+
+    def _before_change(self, task_id: str):
+        """Let a snapshot in progress copy the task before it changes."""
+        snapshot = self._snapshot
+        if snapshot is not None:
+            if snapshot.finished:
+                self._snapshot = None
+            else:
+                snapshot.freeze(task_id)
+
+    def _document(self, record: TaskRecord) -> Dict[str, Any]:
+        return {
+            "task": record.task_dict(),
+            "transitions": record.log.entries(),
+            "artifacts": record.artifact_dicts(),
+        }
+
+    def _snapshot_record(self, task_id: str, record: TaskRecord) -> Dict[str, Any]:
+        snapshot = {"op": "task", **self._document(record)}
+        endpoint = self.push_endpoints.get(task_id)
+        if endpoint is not None:
+            snapshot["push"] = endpoint.model_dump()
+        return snapshot
+
+    def _restore(self, task: Dict[str, Any], transitions: List[Dict[str, Any]],
+                 artifacts: List[Dict[str, Any]]) -> TaskRecord:
+        record = TaskRecord(task["id"], task["docker_config"]["raw_text"])
+        for entry in transitions:
+            entry = dict(entry)
+            state = entry.pop("state")
+            record.log.append(state, entry.pop("timestamp", None), entry)
+        for artifact in artifacts:
+            record.add_artifact(ArtifactRecord.from_dict(artifact))
+        self._records[record.id] = record
+        return record
+
+    def recover(self) -> int:
+        """
+        Rebuild the store from the backend's snapshot and log tail.
+
+        Listeners are not notified and nothing is written back to the backend.
+
+        Returns:
+            int: Number of tasks in the store after recovery.
+        """
+        for entry in self.backend.load():
+            op = entry["op"]
+            if op == "task":
+                self._restore(entry["task"], entry["transitions"], entry["artifacts"])
+                if entry.get("push"):
+                    self.push_endpoints[entry["task"]["id"]] = PushNotificationEndpoint(**entry["push"])
+            elif op == "create":
+                self._restore(entry["task"], [entry["transition"]], [])
+            elif op == "transition":
+                transition = dict(entry["transition"])
+                state = transition.pop("state")
+                self._records[entry["id"]].log.append(state, transition.pop("timestamp", None), transition)
+            elif op == "artifact":
+                self._records[entry["id"]].add_artifact(ArtifactRecord.from_dict(entry["artifact"]))
+            elif op == "part":
+                self._records[entry["id"]].artifacts[-1].parts.append(PartRecord.from_dict(entry["part"]))
+            elif op == "push":
+                self.push_endpoints[entry["id"]] = PushNotificationEndpoint(**entry["endpoint"])
+            elif op == "evict":
+                self._forget(entry["id"])
+        finished = []
+        self._state_counts = {}
+        for task_id, record in self._records.items():
+            self._count_state(record.state, 1)
+            record.size = 0
+            self._track_size(record, self._estimate_size(record))
+            if record.state in TERMINAL_STATES:
+                finished.append((monotonic_to_wall(record.log.times[-1]), task_id))
+        for finished_at, task_id in sorted(finished):
+            self._finished[task_id] = finished_at
+        return len(self._records)
+
+    def close(self):
+        self.backend.close()
+
+    def _transition_size(self, details: Optional[Dict[str, Any]]) -> int:
+        size = self.TRANSITION_OVERHEAD_BYTES
+        if details:
+            size += len(json.dumps(details, default=str))
+        return size
+
+    def _estimate_size(self, record: TaskRecord) -> int:
+        size = self.TASK_OVERHEAD_BYTES + len(record.raw_text)
+        size += len(record.log) * self.TRANSITION_OVERHEAD_BYTES
+        for details in (record.log.details or {}).values():
+            size += len(json.dumps(details, default=str))
+        for artifact in record.artifacts or ():
+            size += len(json.dumps(artifact.to_dict(), default=str))
+        return size
+
+    def _count_state(self, state: str, delta: int):
+        self._state_counts[state] = self._state_counts.get(state, 0) + delta
+
+    def _track_size(self, record: TaskRecord, delta: int):
+        record.size += delta
+        self.total_bytes += delta
+
+    def _forget(self, task_id: str):
+        self._before_change(task_id)
+        record = self._records.pop(task_id, None)
+        self.push_endpoints.pop(task_id, None)
+        self._finished.pop(task_id, None)
+        if record is not None:
+            self.total_bytes -= record.size
+            self._count_state(record.state, -1)
+
+    def evict(self, task_id: str) -> bool:
+        """
+        Remove a task from memory, archiving it first when an archive is configured.
+
+        Returns:
+            bool: False if the archive write failed and the task was kept.
+        """
+        return self.evict_many([task_id]) == 1
+
+    def evict_many(self, task_ids: List[str]) -> int:
+        """Evict tasks synchronously; see ``archive_documents`` and ``drop`` for the split version."""
+        if self.archive is not None:
+            task_ids = self.archive.put_many(self.archive_documents(task_ids))
+        return self.drop(task_ids)
+
+    def archive_documents(self, task_ids: List[str]) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        Build the archive documents of tasks about to be evicted.
+
+        The documents are fresh copies, so they can be compressed and written
+        by another thread while the store keeps changing.
+        """
+        return [(task_id, self._document(self._records[task_id])) for task_id in task_ids if task_id in self._records]
+
+    def drop(self, task_ids: List[str]) -> int:
+        """
+        Forget tasks that have been archived (or need no archive).
+
+        Returns:
+            int: Number of tasks removed from memory.
+        """
+        dropped = 0
+        for task_id in task_ids:
+            if task_id not in self._records:
+                continue
+            self._forget(task_id)
+            self._record({"op": "evict", "id": task_id})
+            self.evicted += 1
+            dropped += 1
+        return dropped
+
+    def plan_sweep(self, policy: RetentionPolicy, now: Optional[float] = None, limit: Optional[int] = None) -> List[str]:
+        """
+        Pick the finished tasks that violate ``policy``, without evicting them.
+
+        Expired tasks go first, then the oldest finished tasks until the task
+        count and byte limits would be met. Tasks still in progress are never picked.
+
+        Args:
+            policy (RetentionPolicy): Limits to enforce.
+            now (Optional[float]): Current wall-clock time, for testing.
+            limit (Optional[int]): Maximum number of tasks picked.
+
+        Returns:
+            List[str]: Task ids, oldest-finished first.
+        """
+        now = time.time() if now is None else now
+        tasks, size = len(self._records), self.total_bytes
+        picked = []
+        for task_id, finished_at in self._finished.items():
+            if limit is not None and len(picked) >= limit:
+                break
+            expired = policy.terminal_ttl is not None and now - finished_at >= policy.terminal_ttl
+            too_many = policy.max_tasks is not None and tasks > policy.max_tasks
+            too_big = policy.max_bytes is not None and size > policy.max_bytes
+            if not (expired or too_many or too_big):
+                break
+            picked.append(task_id)
+            tasks -= 1
+            size -= self._records[task_id].size
+        return picked
+
+    def sweep(self, policy: RetentionPolicy, now: Optional[float] = None, limit: Optional[int] = None) -> int:
+        """
+        Evict finished tasks that violate ``policy`` (see ``plan_sweep``).
+
+        Archive writes happen in the caller's thread; ``RetentionSweeper``
+        moves them off the event loop instead.
+
+        Returns:
+            int: Number of tasks evicted.
+        """
+        return self.evict_many(self.plan_sweep(policy, now, limit))
+
+    def load_archived(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Read an evicted task from the archive.
+
+        Returns:
+            Optional[Dict[str, Any]]: ``{"task": Task, "history": TaskHistory}`` or None.
+        """
+        if self.archive is None:
+            return None
+        document = self.archive.get(task_id)
+        if document is None:
+            return None
+        return {
+            "task": Task(**document["task"]),
+            "history": TaskHistory(
+                transitions=document["transitions"],
+                artifacts=[Artifact(**a) for a in document["artifacts"]],
+            ),
+        }
+
+    def memory_stats(self) -> Dict[str, int]:
+        """Return gauges describing how much the store holds in memory."""
+        return {
+            "tasks": len(self._records),
+            "finished_tasks": len(self._finished),
+            "push_endpoints": len(self.push_endpoints),
+            "estimated_bytes": self.total_bytes,
+            "evicted": self.evicted,
+            "archived": self.archive.archived if self.archive is not None else 0,
+        }
+
+    def state_counts(self) -> Dict[str, int]:
+        """Return the number of tasks held in memory per current state."""
+        return {state: count for state, count in self._state_counts.items() if count}
+
+    def unfinished_task_ids(self) -> List[str]:
+        """Return ids of tasks that have not reached a terminal state."""
+        return [task_id for task_id, record in self._records.items() if record.state not in TERMINAL_STATES]
+
+    def __contains__(self, task_id: str) -> bool:
+        return task_id in self._records
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def create_task(self, task: 'Task'):
+        """Store a new task and record its initial state as the first transition."""
+        self._before_change(task.id)
+        record = TaskRecord(task.id, task.docker_config.raw_text)
+        record.log.append(task.state)
+        entry = record.log.entry(0)
+        self._records[task.id] = record
+        self._count_state(task.state, 1)
+        self._track_size(record, self.TASK_OVERHEAD_BYTES + len(record.raw_text) + self._transition_size(None))
+        self._record({"op": "create", "task": record.task_dict(), "transition": entry})
+        self._notify(task.id, {"kind": "transition", "seq": 1, "transition": entry})
+
+    def get_task(self, task_id: str) -> Optional['Task']:
+        record = self._records.get(task_id)
+        return Task(**record.task_dict()) if record is not None else None
+
+    def get_state(self, task_id: str) -> Optional[str]:
+        """Return the current state of a task without building a ``Task`` model."""
+        record = self._records.get(task_id)
+        return record.state if record is not None else None
+
+    def get_history(self, task_id: str) -> Optional[TaskHistory]:
+        record = self._records.get(task_id)
+        if record is None:
+            return None
+        return TaskHistory(transitions=record.log.entries(), artifacts=record.artifact_dicts())
+
+    def describe(self, task_id: str, history_length: int = 0) -> Optional[Dict[str, Any]]:
+        """
+        Return a task, its transitions and artifacts as plain dicts.
+
+        This is the ``tasks/get`` result shape, built straight from the record
+        without going through the pydantic models.
+
+        Args:
+            task_id (str): The task to describe.
+            history_length (int): Skip this many leading transitions.
+        """
+        record = self._records.get(task_id)
+        if record is None:
+            return None
+        return {
+            "task": record.task_dict(),
+            "transitions": record.log.entries(history_length),
+            "artifacts": record.artifact_dicts(),
+        }
+
+    def transition(self, task_id: str, state: str, **details: Any) -> Dict[str, Any]:
+        """
+        Move a task to ``state`` and append the transition to its history.
+
+        Args:
+            task_id (str): The task to update.
+            state (str): The new task state.
+            **details: Extra fields stored with the transition (e.g. ``error``).
+
+        Returns:
+            Dict[str, Any]: The recorded transition.
+        """
+        self._before_change(task_id)
+        record = self._records[task_id]
+        self._count_state(record.state, -1)
+        self._count_state(state, 1)
+        log = record.log
+        log.append(state, details=details)
+        self._track_size(record, self._transition_size(details))
+        entry = log.entry(len(log) - 1)
+        if state in TERMINAL_STATES:
+            self._finished[task_id] = entry["timestamp"]
+        self._record({"op": "transition", "id": task_id, "transition": entry})
+        self._notify(task_id, {"kind": "transition", "seq": len(log), "transition": entry})
+        return entry
+
+    def add_artifact(self, task_id: str, artifact: Artifact):
+        self._before_change(task_id)
+        record = self._records[task_id]
+        data = artifact.model_dump(mode="json")
+        record.add_artifact(ArtifactRecord.from_dict(data))
+        self._track_size(record, len(json.dumps(data, default=str)))
+        self._record({"op": "artifact", "id": task_id, "artifact": data})
+        self._notify(task_id, {"kind": "artifact", "seq": len(record.artifacts), "part_seq": record.part_count(),
+                               "artifact": artifact})
+
+    def append_part(self, task_id: str, artifact_id: str, part: Part) -> int:
+        """
+        Append a part to the task's latest artifact while the task is still producing it.
+
+        Returns:
+            int: The part's position across all parts of the task.
+
+        Raises:
+            ValueError: If ``artifact_id`` is not the task's latest artifact.
+        """
+        record = self._records[task_id]
+        if not record.artifacts or record.artifacts[-1].artifact_id != artifact_id:
+            raise ValueError("Parts can only be appended to the latest artifact")
+        self._before_change(task_id)
+        data = part.model_dump(mode="json")
+        record.artifacts[-1].parts.append(PartRecord.from_dict(data))
+        self._track_size(record, len(json.dumps(data, default=str)))
+        self._record({"op": "part", "id": task_id, "artifact_id": artifact_id, "part": data})
+        seq = record.part_count()
+        self._notify(task_id, {"kind": "part", "seq": seq, "artifact_id": artifact_id, "part": data})
+        return seq
+
+    def set_push_endpoint(self, task_id: str, endpoint: PushNotificationEndpoint):
+        self._before_change(task_id)
+        self.push_endpoints[task_id] = endpoint
+        self._record({"op": "push", "id": task_id, "endpoint": endpoint.model_dump()})
+
+    def get_push_endpoint(self, task_id: str) -> Optional[PushNotificationEndpoint]:
+        return self.push_endpoints.get(task_id)
 
 
 class DockerConfig(BaseModel):
@@ -134,6 +582,24 @@ class SendTaskResponse(BaseModel):
     task: 'Task'
 
 
+class ComposeServiceResult(BaseModel):
+    """
+    The analysis of one docker-compose service.
+
+    Attributes:
+        service (str): Service name.
+        image (Optional[str]): The service's image, if it sets one.
+        issues_fixed (List[str]): Findings rewritten in the patched text.
+        issues_remaining (List[str]): Rule findings for the service's settings and inline Dockerfile.
+        best_practices (List[str]): Best practices found for the service.
+    """
+    service: str = Field(..., description="Service name.")
+    image: Optional[str] = Field(default=None, description="The service's image, if any.")
+    issues_fixed: List[str] = Field(default_factory=list, description="Findings rewritten in the patched text.")
+    issues_remaining: List[str] = Field(default_factory=list, description="Rule findings for the service.")
+    best_practices: List[str] = Field(default_factory=list, description="Best practices found for the service.")
+
+
 class DockerFixResult(BaseModel):
     """
     Represents the result of a Dockerfile security fix operation.
@@ -143,6 +609,9 @@ class DockerFixResult(BaseModel):
         diff_json (dict): Structured diff between input and output.
         issues_fixed (Optional[List[str]]): List of security issues fixed.
         issues_remaining (Optional[List[str]]): List of issues not fixed.
+        best_practices (Optional[List[str]]): Best practices found by the web search, appended as comments.
+        services (Optional[List[ComposeServiceResult]]): Per-service results for docker-compose input.
+        stage_durations (Optional[Dict[str, float]]): Seconds spent in each analysis stage.
     """
     patched_text: str = Field(
         ..., description="The hardened Dockerfile or docker-compose YAML."
@@ -156,3 +625,12 @@ class DockerFixResult(BaseModel):
     issues_remaining: Optional[List[str]] = Field(
         default=None, description="List of issues not fixed."
     )
+    best_practices: Optional[List[str]] = Field(
+        default=None, description="Best practices found by the web search."
+    )
+    services: Optional[List[ComposeServiceResult]] = Field(
+        default=None, description="Per-service results for docker-compose input."
+    )
+    stage_durations: Optional[Dict[str, float]] = Field(
+        default=None, description="Seconds spent in each analysis stage."
+    )
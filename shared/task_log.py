@@ -0,0 +1,289 @@
+import glob
+import json
+import os
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import logfire
+
+
+class TaskStoreBackend:
+    """
+    Storage backend interface for ``TaskStore``.
+
+    The default implementation keeps nothing, so the store is purely in memory.
+    Backends receive one record per mutation via ``append`` and return the
+    records needed to rebuild the store from ``load``.
+    """
+    def load(self) -> Iterator[Dict[str, Any]]:
+        return iter(())
+
+    def append(self, record: Dict[str, Any]):
+        pass
+
+    def should_compact(self) -> bool:
+        return False
+
+    def compact(self, records: Iterable[Dict[str, Any]]):
+        pass
+
+    def start_compaction(self, records: Iterable[Dict[str, Any]]):
+        """
+        Compact from ``records``, a view of the store as of the last append.
+
+        Backends may iterate it in the background; ``TaskStore`` hands over a
+        copy-on-write view that stays consistent while the store changes.
+        """
+        self.compact(records)
+
+    def close(self):
+        pass
+
+
+class AppendOnlyLogBackend(TaskStoreBackend):
+    """
+    Durable ``TaskStore`` backend built on an append-only JSON-lines log.
+
+    Every task creation, transition, artifact and push endpoint is appended to
+    ``tasks.log``. After ``snapshot_every`` records the store is compacted into
+    ``tasks.snapshot`` (one record per task), so recovery reads one snapshot
+    line per task plus a short log tail. Log records carry a log sequence
+    number (``lsn``) and the snapshot header stores the last one it covers, so
+    a crash between compaction steps never replays a record twice.
+
+    Appends are serialized by the caller and handed to a writer thread,
+    which writes whatever has queued up in one go, then flushes (and fsyncs)
+    once per batch. ``flush`` waits for everything appended so far to reach
+    the file.
+
+    Compaction first rotates the log into a closed segment
+    (``tasks.log.<lsn>``), in order with the queued appends, so appends
+    continue in a fresh log. The snapshot is then written and fsynced on a
+    background thread and the segments it covers are deleted. Until then
+    recovery reads the segments too.
+
+    Args:
+        directory (str): Directory holding the snapshot and log files.
+        snapshot_every (int): Number of log records that triggers compaction.
+        fsync (bool): Call ``os.fsync`` after each batch of appends for crash durability.
+    """
+    SNAPSHOT_FILE = "tasks.snapshot"
+    LOG_FILE = "tasks.log"
+
+    def __init__(self, directory: str, snapshot_every: int = 100000, fsync: bool = False):
+        self.directory = directory
+        self.snapshot_every = snapshot_every
+        self.fsync = fsync
+        os.makedirs(directory, exist_ok=True)
+        self.snapshot_path = os.path.join(directory, self.SNAPSHOT_FILE)
+        self.log_path = os.path.join(directory, self.LOG_FILE)
+        self.records_since_snapshot = 0
+        self.lsn = 0
+        self._log = None
+        # Written since the last flush; batches with only flush requests skip the fsync
+        self._dirty = False
+        # Serialized lines, flush events and rotations for the writer thread
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._compactor: Optional[ThreadPoolExecutor] = None
+        self._compaction: Optional[Future] = None
+
+    def _segments(self) -> List[str]:
+        """Rotated log segments, oldest first."""
+        paths = glob.glob(glob.escape(self.log_path) + ".*")
+        return sorted((p for p in paths if p.rsplit(".", 1)[1].isdigit()), key=lambda p: int(p.rsplit(".", 1)[1]))
+
+    def _read(self, path: str, repair: bool = False) -> Iterator[Dict[str, Any]]:
+        if not os.path.exists(path):
+            return
+        good_offset = 0
+        torn = False
+        with open(path, "rb") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    torn = True
+                    break
+                if not line.endswith(b"\n"):
+                    torn = True
+                    break
+                good_offset += len(line)
+                yield record
+        if torn and repair:
+            # Drop a torn final write from a crash so new appends start on a clean line.
+            with open(path, "r+b") as f:
+                f.truncate(good_offset)
+
+    def load(self) -> Iterator[Dict[str, Any]]:
+        snapshot_lsn = 0
+        for record in self._read(self.snapshot_path):
+            if record.get("op") == "header":
+                snapshot_lsn = record["lsn"]
+                continue
+            yield record
+        self.lsn = snapshot_lsn
+        for path in self._segments() + [self.log_path]:
+            for record in self._read(path, repair=path == self.log_path):
+                lsn = record.pop("lsn", 0)
+                if lsn <= self.lsn:
+                    continue
+                self.lsn = lsn
+                self.records_since_snapshot += 1
+                yield record
+
+    def _open_log(self):
+        if self._log is None:
+            self._log = open(self.log_path, "a", encoding="utf-8")
+        return self._log
+
+    def append(self, record: Dict[str, Any]):
+        # Serialize here: the record's dicts may be handed to listeners and changed later
+        self.lsn += 1
+        self._send(json.dumps({**record, "lsn": self.lsn}, separators=(",", ":")) + "\n")
+        self.records_since_snapshot += 1
+
+    def _send(self, item: Any):
+        if self._writer is None:
+            self._writer = threading.Thread(target=self._write_loop, name="task-log-writer", daemon=True)
+            self._writer.start()
+        self._queue.put(item)
+
+    def _sync(self):
+        if self._log is not None and self._dirty:
+            self._log.flush()
+            if self.fsync:
+                os.fsync(self._log.fileno())
+            self._dirty = False
+
+    def _write_loop(self):
+        while True:
+            items = [self._queue.get()]
+            while True:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            waiters = []
+            stop = False
+            for item in items:
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                elif item is None:
+                    stop = True
+                else:
+                    self._write_item(item)
+            self._write_item(self._sync)
+            for waiter in waiters:
+                waiter.set()
+            if stop:
+                return
+
+    def _write_item(self, item: Any):
+        try:
+            if isinstance(item, str):
+                self._open_log().write(item)
+                self._dirty = True
+            else:
+                item()
+        except Exception as e:
+            logfire.error("task_log_write_failed", error=str(e), error_type=type(e).__name__)
+
+    def flush(self):
+        """Block until every record appended so far has been written (and fsynced, if enabled)."""
+        if self._writer is None:
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait()
+
+    def should_compact(self) -> bool:
+        # One compaction at a time; records keep going to the log meanwhile
+        if self._compaction is not None and not self._compaction.done():
+            return False
+        return self.records_since_snapshot >= self.snapshot_every
+
+    def _rotate(self, lsn: Optional[int] = None) -> int:
+        """
+        Close the log as segment ``tasks.log.<lsn>`` and start a new one; returns the lsn it ends at.
+
+        Runs on the writer thread; call ``flush`` first to run it anywhere else.
+        """
+        lsn = self.lsn if lsn is None else lsn
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+        if os.path.exists(self.log_path):
+            os.replace(self.log_path, f"{self.log_path}.{lsn}")
+        return lsn
+
+    def _write_snapshot(self, records: Iterable[Dict[str, Any]], lsn: int):
+        """Atomically replace the snapshot with ``records`` and drop the segments it covers."""
+        tmp_path = self.snapshot_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"op": "header", "lsn": lsn}) + "\n")
+            for record in records:
+                f.write(json.dumps(record, separators=(",", ":")) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+        for path in self._segments():
+            if int(path.rsplit(".", 1)[1]) <= lsn:
+                os.remove(path)
+
+    def _write_snapshot_logged(self, records: Iterable[Dict[str, Any]], lsn: int, rotated: threading.Event):
+        rotated.wait()
+        try:
+            self._write_snapshot(records, lsn)
+        except Exception as e:
+            # The segments are kept, so nothing is lost; the next compaction tries again
+            logfire.error("task_log_compaction_failed", error=str(e), lsn=lsn)
+
+    def compact(self, records: Iterable[Dict[str, Any]]):
+        """Write a snapshot of ``records`` and truncate the log, synchronously."""
+        self.flush()
+        self._write_snapshot(records, self._rotate())
+        self.records_since_snapshot = 0
+
+    def start_compaction(self, records: Iterable[Dict[str, Any]]):
+        """
+        Queue a log rotation behind the pending appends, then write the
+        snapshot of ``records`` on a background thread once it has happened.
+        """
+        lsn = self.lsn
+        rotated = threading.Event()
+
+        def rotate():
+            try:
+                # Everything queued before the rotation belongs in the old segment
+                self._sync()
+                self._rotate(lsn)
+            finally:
+                rotated.set()
+
+        self._send(rotate)
+        self.records_since_snapshot = 0
+        if self._compactor is None:
+            self._compactor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="task-log-compaction")
+        self._compaction = self._compactor.submit(self._write_snapshot_logged, records, lsn, rotated)
+
+    def wait_for_compaction(self):
+        """Block until a background compaction has finished."""
+        if self._compaction is not None:
+            self._compaction.result()
+
+    def close(self):
+        self.flush()
+        self.wait_for_compaction()
+        if self._compactor is not None:
+            self._compactor.shutdown()
+            self._compactor = None
+        if self._writer is not None:
+            self._queue.put(None)
+            self._writer.join()
+            self._writer = None
+        if self._log is not None:
+            self._log.close()
+            self._log = None
@@ -0,0 +1,173 @@
+import sys
+import time
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
+
+# Offset converting monotonic timestamps to wall-clock time for this process
+_WALL_OFFSET = time.time() - time.monotonic()
+
+
+class StateTable:
+    """
+    Interns task state names as small integer codes.
+
+    The A2A states are registered up front; unknown states get the next code
+    (up to 255, the range of the transition log's byte array).
+    """
+    def __init__(self, names: Tuple[str, ...]):
+        self.names: List[str] = []
+        self.codes: Dict[str, int] = {}
+        for name in names:
+            self.code(name)
+
+    def code(self, name: str) -> int:
+        code = self.codes.get(name)
+        if code is None:
+            if len(self.names) >= 256:
+                raise ValueError(f"Too many distinct task states to intern: {name}")
+            code = len(self.names)
+            name = sys.intern(name)
+            self.names.append(name)
+            self.codes[name] = code
+        return code
+
+    def name(self, code: int) -> str:
+        return self.names[code]
+
+
+STATES = StateTable(("submitted", "working", "completed", "failed", "cancelled"))
+
+
+def wall_to_monotonic(timestamp: float) -> float:
+    return timestamp - _WALL_OFFSET
+
+
+def monotonic_to_wall(timestamp: float) -> float:
+    return timestamp + _WALL_OFFSET
+
+
+class TransitionLog:
+    """
+    Array-backed log of state transitions.
+
+    States are stored as interned byte codes and timestamps as monotonic
+    doubles. Extra transition fields (e.g. ``error``) are rare and kept in a
+    sparse dict keyed by position.
+    """
+    __slots__ = ("states", "times", "details")
+
+    def __init__(self):
+        self.states = array("B")
+        self.times = array("d")
+        self.details: Optional[Dict[int, Dict[str, Any]]] = None
+
+    def __len__(self) -> int:
+        return len(self.states)
+
+    def append(self, state: str, timestamp: Optional[float] = None, details: Optional[Dict[str, Any]] = None):
+        """Record a transition; ``timestamp`` is wall-clock time (defaults to now)."""
+        if details:
+            if self.details is None:
+                self.details = {}
+            self.details[len(self.states)] = details
+        self.states.append(STATES.code(state))
+        self.times.append(time.monotonic() if timestamp is None else wall_to_monotonic(timestamp))
+
+    @property
+    def last_state(self) -> str:
+        return STATES.name(self.states[-1])
+
+    def entry(self, index: int) -> Dict[str, Any]:
+        """Return transition ``index`` in the API form ``{"state", "timestamp", **details}``."""
+        entry = {"state": STATES.name(self.states[index]), "timestamp": monotonic_to_wall(self.times[index])}
+        if self.details and index in self.details:
+            entry.update(self.details[index])
+        return entry
+
+    def entries(self, start: int = 0) -> List[Dict[str, Any]]:
+        return [self.entry(i) for i in range(start, len(self.states))]
+
+
+class PartRecord:
+    __slots__ = ("part_id", "type", "content", "encoding")
+
+    def __init__(self, part_id: str, type: str, content: Any, encoding: Optional[str] = None):
+        self.part_id = part_id
+        self.type = type
+        self.content = content
+        self.encoding = encoding
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "PartRecord":
+        return cls(data["part_id"], data["type"], data["content"], data.get("encoding"))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"part_id": self.part_id, "type": self.type, "content": self.content, "encoding": self.encoding}
+
+
+class ArtifactRecord:
+    __slots__ = ("artifact_id", "type", "parts", "metadata")
+
+    def __init__(self, artifact_id: str, type: str, parts: List[PartRecord], metadata: Optional[Dict[str, Any]] = None):
+        self.artifact_id = artifact_id
+        self.type = type
+        self.parts = parts
+        self.metadata = metadata
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ArtifactRecord":
+        return cls(
+            data["artifact_id"], data["type"],
+            [PartRecord.from_dict(p) for p in data.get("parts", [])],
+            data.get("metadata"),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "artifact_id": self.artifact_id,
+            "type": self.type,
+            "parts": [p.to_dict() for p in self.parts],
+            "metadata": self.metadata,
+        }
+
+
+class TaskRecord:
+    """
+    Slotted in-memory form of a task and its history, used inside TaskStore.
+
+    The pydantic ``Task``/``TaskHistory``/``Artifact`` models are only built
+    from records at the API boundary.
+
+    Attributes:
+        id (str): Task identifier.
+        raw_text (str): The submitted Dockerfile or compose YAML.
+        log (TransitionLog): State transitions; the last one is the current state.
+        artifacts (Optional[List[ArtifactRecord]]): Produced artifacts, ``None`` until the first one.
+        size (int): Estimated memory footprint used by retention limits.
+    """
+    __slots__ = ("id", "raw_text", "log", "artifacts", "size")
+
+    def __init__(self, id: str, raw_text: str):
+        self.id = id
+        self.raw_text = raw_text
+        self.log = TransitionLog()
+        self.artifacts: Optional[List[ArtifactRecord]] = None
+        self.size = 0
+
+    @property
+    def state(self) -> str:
+        return self.log.last_state
+
+    def add_artifact(self, artifact: ArtifactRecord):
+        if self.artifacts is None:
+            self.artifacts = []
+        self.artifacts.append(artifact)
+
+    def part_count(self) -> int:
+        return sum(len(a.parts) for a in self.artifacts) if self.artifacts else 0
+
+    def task_dict(self) -> Dict[str, Any]:
+        return {"id": self.id, "state": self.state, "docker_config": {"raw_text": self.raw_text}}
+
+    def artifact_dicts(self) -> List[Dict[str, Any]]:
+        return [a.to_dict() for a in self.artifacts] if self.artifacts else []
@@ -0,0 +1,87 @@
+import gzip
+import json
+import os
+import tempfile
+from typing import Any, Dict, List, Optional, Tuple
+
+import logfire
+
+
+class RetentionPolicy:
+    """
+    Limits applied to a ``TaskStore`` by its sweeper.
+
+    Only tasks in a terminal state are ever evicted, oldest-finished first.
+
+    Attributes:
+        max_tasks (Optional[int]): Maximum number of tasks kept in memory.
+        max_bytes (Optional[int]): Maximum estimated size of all tasks in memory.
+        terminal_ttl (Optional[float]): Seconds a finished task stays in memory.
+    """
+    def __init__(self, max_tasks: Optional[int] = None, max_bytes: Optional[int] = None,
+                 terminal_ttl: Optional[float] = None):
+        self.max_tasks = max_tasks
+        self.max_bytes = max_bytes
+        self.terminal_ttl = terminal_ttl
+
+
+class TaskArchive:
+    """
+    Compressed on-disk archive for tasks evicted from memory.
+
+    Each task is stored as a gzip-compressed JSON document in a directory
+    sharded by the first two characters of its id.
+
+    Args:
+        directory (str): Root directory of the archive.
+    """
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.archived = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, task_id: str) -> str:
+        return os.path.join(self.directory, task_id[:2], f"{task_id}.json.gz")
+
+    def put(self, task_id: str, document: Dict[str, Any]):
+        path = self._path(task_id)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".archive-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(gzip.compress(json.dumps(document, separators=(",", ":")).encode("utf-8")))
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self.archived += 1
+
+    def put_many(self, documents: List[Tuple[str, Dict[str, Any]]]) -> List[str]:
+        """
+        Archive several tasks, typically from a worker thread.
+
+        A write that fails is logged and skipped, so its task stays in memory.
+
+        Returns:
+            List[str]: Ids of the tasks that were written.
+        """
+        written = []
+        for task_id, document in documents:
+            try:
+                self.put(task_id, document)
+            except (OSError, TypeError, ValueError) as e:
+                logfire.error("task_archive_failed", task_id=task_id, error=str(e), error_type=type(e).__name__)
+                continue
+            written.append(task_id)
+        return written
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        # Task ids are used in file paths, so reject anything that could escape the archive.
+        if not task_id or os.sep in task_id or task_id.startswith("."):
+            return None
+        try:
+            with open(self._path(task_id), "rb") as f:
+                return json.loads(gzip.decompress(f.read()))
+        except FileNotFoundError:
+            return None
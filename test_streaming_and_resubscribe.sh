@@ -76,12 +76,35 @@ STREAM_URL=$(echo "$RESUBSCRIBE_RESP" | jq -r '.result.stream_url // .stream_url
 TRANSITIONS_COUNT=$(echo "$RESUBSCRIBE_RESP" | jq '.result.transitions | length')
 [[ "$TRANSITIONS_COUNT" -ge 1 ]] && pass "Resubscribe returns transitions" || fail "No transitions in resubscribe"
 
-# 4. Test chunked upload stub
-CHUNKED_RESP=$(curl -s -X POST "$API_URL" \
+# 4. Test chunked upload: create a session, send two chunks, finalize into a task
+UPLOAD_BODY=$'FROM python:3.12-slim\nUSER app\nCMD ["python", "app.py"]\n'
+UPLOAD_SIZE=$(printf '%s' "$UPLOAD_BODY" | wc -c | tr -d ' ')
+CREATE_RESP=$(curl -s -X POST "$API_URL" \
   -H "Authorization: Bearer $TOKEN" \
   -H "Content-Type: application/json" \
-  -d '{"jsonrpc":"2.0","id":3,"method":"chunked_upload_stub","params":{}}')
-echo "$CHUNKED_RESP" | grep -q 'not implemented' && pass "Chunked upload stub returns not implemented" || fail "Chunked upload stub did not return expected message"
+  -d '{"jsonrpc":"2.0","id":3,"method":"uploads_create","params":{"size":'$UPLOAD_SIZE'}}')
+echo "$CREATE_RESP"
+UPLOAD_ID=$(echo "$CREATE_RESP" | jq -r '.result.result.upload_id // empty')
+[[ -n "$UPLOAD_ID" ]] && pass "Upload created: $UPLOAD_ID" || fail "Could not create upload"
+FIRST=$(printf '%s' "$UPLOAD_BODY" | head -c 10)
+REST=$(printf '%s' "$UPLOAD_BODY" | tail -c +11)
+OFFSET=$(printf '%s' "$FIRST" | curl -s -X PUT "$API_URL/upload/chunk?upload_id=$UPLOAD_ID&offset=0" \
+  -H "Authorization: Bearer $TOKEN" --data-binary @- | jq -r '.offset')
+[[ "$OFFSET" == "10" ]] && pass "First chunk accepted" || fail "First chunk offset: $OFFSET"
+STATUS_OFFSET=$(curl -s -X POST "$API_URL" \
+  -H "Authorization: Bearer $TOKEN" \
+  -H "Content-Type: application/json" \
+  -d '{"jsonrpc":"2.0","id":4,"method":"uploads_status","params":{"upload_id":"'$UPLOAD_ID'"}}' | jq -r '.result.result.offset')
+[[ "$STATUS_OFFSET" == "10" ]] && pass "Upload status reports resume offset" || fail "Upload status offset: $STATUS_OFFSET"
+printf '%s\n' "$REST" | curl -s -X PUT "$API_URL/upload/chunk?upload_id=$UPLOAD_ID&offset=$OFFSET" \
+  -H "Authorization: Bearer $TOKEN" --data-binary @- > /dev/null
+FINALIZE_RESP=$(curl -s -X POST "$API_URL" \
+  -H "Authorization: Bearer $TOKEN" \
+  -H "Content-Type: application/json" \
+  -d '{"jsonrpc":"2.0","id":5,"method":"uploads_finalize","params":{"upload_id":"'$UPLOAD_ID'"}}')
+echo "$FINALIZE_RESP"
+UPLOAD_TASK_ID=$(echo "$FINALIZE_RESP" | jq -r '.result.result.task.id // empty')
+[[ -n "$UPLOAD_TASK_ID" ]] && pass "Finalized upload created task: $UPLOAD_TASK_ID" || fail "Finalize did not create a task"
 
 # 5. Test artifacts/parts structure in resubscribe (should always be present, may be empty)
 ARTIFACTS=$(echo "$RESUBSCRIBE_RESP" | jq '.result.artifacts // .artifacts')